@@ -0,0 +1,185 @@
+# benchmarks/auth_login.py
+"""
+Login throughput and latency of the auth service under concurrent load.
+
+Two implementations of POST /auth/login are driven in-process through httpx's ASGI
+transport, against the same SQLite users table:
+
+- legacy: the previous sync route, verifying bcrypt in FastAPI's request thread pool
+- pool:   the current async route (async session), hashing on the bounded process pool
+          with admission control (busy -> 503)
+
+For each, --requests logins are sent --concurrency at a time while a probe hits a
+trivial route every 10 ms; the probe's p99 shows how much the login burst stalls
+unrelated requests. A quarter of the users are stored with a lower bcrypt cost, and the
+run checks that the pool path re-hashed them to --rounds.
+
+Usage (from the repository root):
+    python -m benchmarks.auth_login
+    python -m benchmarks.auth_login --rounds 12 --requests 400 --concurrency 100 --max-pending 32
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+import httpx
+from fastapi import Depends, FastAPI, HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from shared.config.db import get_async_db
+from shared.config.settings import settings
+from shared.models.user import Base, User
+from services.auth.app.routes import auth as auth_routes
+from services.auth.app.schemas.user import UserLogin
+from services.auth.app.utils import hashing
+
+_PASSWORD = "correct horse battery staple"
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[int(fraction * (len(ordered) - 1))] if ordered else float("nan")
+
+
+def make_sessions(path: str, users: int, rounds: int) -> sessionmaker:
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
+    # One hash per cost is enough: bcrypt salts don't affect verification time
+    current = hashing._context(rounds).hash(_PASSWORD)
+    outdated = hashing._context(max(4, rounds - 2)).hash(_PASSWORD)
+    with SessionLocal() as db:
+        db.add_all(
+            User(username=f"user{i}", email=f"user{i}@example.com",
+                 hashed_password=outdated if i % 4 == 0 else current)
+            for i in range(users)
+        )
+        db.commit()
+    return SessionLocal
+
+
+def make_app(mode: str, SessionLocal: sessionmaker, rounds: int) -> FastAPI:
+    app = FastAPI()
+
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    if mode == "legacy":
+        context = hashing._context(rounds)
+
+        @app.post("/auth/login")
+        def login(user_data: UserLogin, db: Session = Depends(get_db)):
+            user = db.query(User).filter_by(email=user_data.email).first()
+            if not user or not context.verify(user_data.password, user.hashed_password):
+                raise HTTPException(status_code=401, detail="Invalid credentials")
+            return {"user_id": user.id}
+    else:
+        AsyncSessionLocal = async_sessionmaker(
+            bind=create_async_engine(SessionLocal.kw["bind"].url.set(drivername="sqlite+aiosqlite")),
+            expire_on_commit=False,
+        )
+
+        async def get_async_session():
+            async with AsyncSessionLocal() as db:
+                yield db
+
+        app.include_router(auth_routes.router, prefix="/auth")
+        app.dependency_overrides[get_async_db] = get_async_session
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+async def run_load(app: FastAPI, users: int, requests: int, concurrency: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    latencies, statuses, probes = [], {}, []
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/ping")
+                probes.append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(0.01)
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def login(i: int):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(
+                    "/auth/login", json={"email": f"user{i % users}@example.com", "password": _PASSWORD}
+                )
+                elapsed = (time.perf_counter() - started) * 1000
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                if response.status_code == 200:
+                    latencies.append(elapsed)
+
+        prober = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(requests)))
+        wall = time.perf_counter() - started
+        done.set()
+        await prober
+
+    return {
+        "ok": statuses.get(200, 0),
+        "rejected": statuses.get(503, 0),
+        "statuses": statuses,
+        "logins_per_s": statuses.get(200, 0) / wall,
+        "p50_ms": statistics.median(latencies) if latencies else float("nan"),
+        "p99_ms": percentile(latencies, 0.99),
+        "probe_p99_ms": percentile(probes, 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=settings.auth_bcrypt_rounds)
+    parser.add_argument("--users", type=int, default=40)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=settings.auth_hash_workers)
+    parser.add_argument("--max-pending", type=int, default=settings.auth_hash_max_pending)
+    args = parser.parse_args()
+
+    settings.auth_bcrypt_rounds = args.rounds
+    settings.auth_hash_workers = args.workers
+    settings.auth_hash_max_pending = args.max_pending
+    hashing.start_pool()
+
+    print(f"bcrypt cost {args.rounds}, {args.requests} logins, concurrency {args.concurrency}, "
+          f"max pending {args.max_pending}\n")
+    print(f"{'mode':<8} {'ok':>5} {'503':>5} {'logins/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'probe p99':>10}")
+    try:
+        with tempfile.TemporaryDirectory(prefix="thumbsy-auth-") as root:
+            for mode in ("legacy", "pool"):
+                SessionLocal = make_sessions(f"{root}/{mode}.db", args.users, args.rounds)
+                result = asyncio.run(run_load(make_app(mode, SessionLocal, args.rounds),
+                                              args.users, args.requests, args.concurrency))
+                print(f"{mode:<8} {result['ok']:>5} {result['rejected']:>5} {result['logins_per_s']:>9.1f} "
+                      f"{result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} {result['probe_p99_ms']:>10.1f}")
+                unexpected = set(result["statuses"]) - {200, 503}
+                assert not unexpected, f"{mode}: unexpected statuses {result['statuses']}"
+
+            # Every outdated hash that logged in successfully was upgraded
+            with SessionLocal() as db:
+                costs = {int(user.hashed_password.split("$")[2]) for user in db.query(User)}
+            print(f"\nstored bcrypt costs after the pool run: {sorted(costs)}")
+    finally:
+        hashing.shutdown_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# benchmarks/batch_stream.py
+"""
+Memory of batch ingestion: products inside the Celery message (POST /ingest/batch)
+versus a streamed NDJSON/gzip upload spooled in chunks (POST /ingest/batch/stream).
+
+For each feed size:
+- message: size of the task message body and the peak memory of building it, which
+  the API, the broker and the worker each pay for the whole feed
+- stream:  peak memory of the endpoint while the gzipped feed is uploaded (driven
+  in-process through httpx's ASGI transport), the largest task message, and the
+  worker-side peak of parsing and cleaning one chunk
+
+The broker is Celery's in-memory transport and the spool is the "local" backend in a
+temporary directory, so no Redis is needed. The run checks that the spooled chunks
+hold every record of the feed. Loading into Postgres/Elasticsearch is not measured.
+
+Usage (from the repository root):
+    python -m benchmarks.batch_stream
+    python -m benchmarks.batch_stream --sizes 10000 50000 200000 --chunk-size 1000
+"""
+
+import os
+import tempfile
+
+os.environ.setdefault("CELERY_BROKER_URL", "memory://")
+os.environ.setdefault("CELERY_RESULT_BACKEND", "cache+memory://")
+os.environ.setdefault("INGEST_SPOOL_BACKEND", "local")
+os.environ.setdefault("INGEST_SPOOL_PATH", tempfile.mkdtemp(prefix="thumbsy-spool-"))
+
+import argparse
+import asyncio
+import json
+import random
+import tracemalloc
+import zlib
+import httpx
+import orjson
+from fastapi import FastAPI
+from shared.config.settings import settings
+from services.ingestion.app.etl.spool import ChunkSpool
+from services.ingestion.app.etl.transformer import Transformer
+from services.ingestion.app.routes.ingest import router
+from services.ingestion.app.scheduler.tasks import ingest_batch_chunk_task
+
+_WORDS = "wireless bluetooth headphones kitchen knife ceramic pan toy puzzle gaming mouse usb cable".split()
+
+
+def make_record(i: int, rng: random.Random) -> dict:
+    return {
+        "title": " ".join(rng.choices(_WORDS, k=8)) + f" {i}",
+        "asin": f"B{i:09d}",
+        "price": f"${rng.uniform(5, 500):.2f}",
+        "rating": f"{rng.uniform(1, 5):.1f} out of 5 stars",
+        "total_reviews": f"{rng.randint(0, 50000):,} ratings",
+        "category": "Electronics > Headphones",
+        "description": " ".join(rng.choices(_WORDS, k=60)),
+    }
+
+
+async def gzipped_feed(size: int, piece: int = 64 * 1024):
+    """The feed as gzipped NDJSON, generated and compressed on the fly."""
+    rng = random.Random(7)
+    deflater = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    buffer = bytearray()
+    for i in range(size):
+        buffer += orjson.dumps(make_record(i, rng)) + b"\n"
+        if len(buffer) >= piece:
+            yield deflater.compress(bytes(buffer))
+            buffer.clear()
+    yield deflater.compress(bytes(buffer)) + deflater.flush()
+
+
+def measure_message(size: int) -> tuple[int, int]:
+    rng = random.Random(7)
+    tracemalloc.start()
+    products = [make_record(i, rng) for i in range(size)]
+    body = json.dumps([[products], {}, {}])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(body), peak
+
+
+async def measure_stream(size: int, sent: list) -> tuple[dict, int]:
+    app = FastAPI()
+    app.include_router(router, prefix="/ingest")
+    original_delay = ingest_batch_chunk_task.delay
+
+    def delay(ref):
+        sent.append(len(json.dumps([[ref], {}, {}])))
+        return original_delay(ref)
+
+    ingest_batch_chunk_task.delay = delay
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            tracemalloc.start()
+            response = await client.post(
+                "/ingest/batch/stream", content=gzipped_feed(size),
+                headers={"Content-Type": "application/x-ndjson", "Content-Encoding": "gzip"},
+            )
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    finally:
+        ingest_batch_chunk_task.delay = original_delay
+    response.raise_for_status()
+    return response.json(), peak
+
+
+def measure_worker(accepted: dict) -> tuple[int, int]:
+    """Records in the spooled chunks, and the peak of parsing + cleaning one chunk."""
+    spool, records, peak = ChunkSpool(), 0, 0
+    for index in range(accepted["chunks"]):
+        ref = {"backend": spool.backend, "batch_id": accepted["batch_id"], "index": index}
+        tracemalloc.start()
+        products = Transformer.clean_product_batch(list(spool.records(ref)))
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        records += len(products)
+        del products
+        spool.delete(ref)
+    return records, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000])
+    parser.add_argument("--chunk-size", type=int, default=settings.ingest_chunk_size)
+    args = parser.parse_args()
+    settings.ingest_chunk_size = args.chunk_size
+
+    # One-time imports and caches would otherwise land in the first measurement
+    # (orjson allocates its parser buffers on first use)
+    Transformer.clean_product_batch([orjson.loads(orjson.dumps(make_record(0, random.Random(0))))])
+
+    mb = 1024 * 1024
+    print(f"chunk size {args.chunk_size}\n")
+    print(f"{'records':>8} | {'message MB':>10} {'peak MB':>8} | {'stream peak MB':>14} "
+          f"{'max msg B':>9} {'chunks':>6} {'worker peak MB':>14}")
+    for size in args.sizes:
+        message_bytes, message_peak = measure_message(size)
+        sent = []
+        accepted, stream_peak = asyncio.run(measure_stream(size, sent))
+        records, worker_peak = measure_worker(accepted)
+        assert accepted["records"] == size and records == size, (accepted["records"], records, size)
+        print(f"{size:>8} | {message_bytes / mb:>10.1f} {message_peak / mb:>8.1f} | {stream_peak / mb:>14.1f} "
+              f"{max(sent):>9} {accepted['chunks']:>6} {worker_peak / mb:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# benchmarks/bulk_load.py
+"""
+Rows/sec of the legacy per-row loader (add -> commit -> refresh -> index) versus
+BulkLoader.load_products, for new rows and for a re-run where nothing changed.
+
+Usage (from the repository root):
+    python -m benchmarks.bulk_load --rows 5000
+    python -m benchmarks.bulk_load --rows 5000 --db-url postgresql://... --with-es
+
+Defaults to a throwaway SQLite file so it can run without Postgres. Against Postgres
+the "products" table is truncated before each run, so never point it at real data.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from shared.models.base import Base
+from shared.models.product import Product
+from services.ingestion.app.etl.loader import BulkLoader, PRODUCTS_INDEX
+
+
+def make_products(count: int) -> list[dict]:
+    rng = random.Random(42)
+    return [
+        {
+            "title": f"Benchmark Product {i}",
+            "asin": f"B{i:09d}",
+            "price": round(rng.uniform(5, 500), 2),
+            "category": rng.choice(["Electronics > Headphones", "Home > Kitchen", "Toys"]),
+            "rating": round(rng.uniform(1, 5), 1),
+            "total_reviews": rng.randint(0, 50000),
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_load(db, products: list[dict], es=None) -> int:
+    """The per-row loader the ingestion tasks used before BulkLoader."""
+    inserted = 0
+    for prod in products:
+        doc = BulkLoader.build_row(prod)
+        new_product = Product(**{k: v for k, v in doc.items() if hasattr(Product, k)})
+        db.add(new_product)
+        db.commit()
+        db.refresh(new_product)
+        if es is not None:
+            es.index(index=PRODUCTS_INDEX, id=new_product.id, body=doc)
+        inserted += 1
+    return inserted
+
+
+def make_engine(db_url: str | None):
+    if db_url:
+        return create_engine(db_url)
+    path = os.path.join(tempfile.mkdtemp(prefix="thumbsy-bench-"), "bench.db")
+    # SQLite has no "public" schema; map the model's schema away
+    return create_engine(f"sqlite:///{path}").execution_options(
+        schema_translate_map={"public": None}
+    )
+
+
+def reset_table(engine):
+    Base.metadata.create_all(bind=engine, tables=[Product.__table__])
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("TRUNCATE public.products RESTART IDENTITY"))
+        else:
+            conn.execute(Product.__table__.delete())
+
+
+def run(name: str, engine, fn, products: list[dict], reset: bool = True) -> float:
+    if reset:
+        reset_table(engine)
+    db = sessionmaker(bind=engine, expire_on_commit=False)()
+    try:
+        started = time.perf_counter()
+        fn(db, products)
+        elapsed = time.perf_counter() - started
+    finally:
+        db.close()
+    rate = len(products) / elapsed
+    print(f"{name:<16} {len(products):>8} rows  {elapsed:8.2f}s  {rate:10.0f} rows/sec")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--db-url", default=None, help="SQLAlchemy URL (default: temporary SQLite file)")
+    parser.add_argument("--with-es", action="store_true", help="Also index into the configured Elasticsearch")
+    args = parser.parse_args()
+
+    es = None
+    if args.with_es:
+        from shared.config.elasticsearch import es_client
+        es = es_client
+
+    engine = make_engine(args.db_url)
+    products = make_products(args.rows)
+
+    before = run("legacy", engine, lambda db, p: legacy_load(db, p, es=es), products)
+    after = run(
+        "bulk",
+        engine,
+        lambda db, p: BulkLoader.load_products(db, p, chunk_size=args.chunk_size, es=es),
+        products,
+    )
+    # Same products again: every row hashes the same and is skipped
+    rerun = run(
+        "bulk unchanged",
+        engine,
+        lambda db, p: BulkLoader.load_products(db, p, chunk_size=args.chunk_size, es=es),
+        products,
+        reset=False,
+    )
+    print(f"speedup  {after / before:.1f}x (new rows), {rerun / before:.1f}x (unchanged rows)")
+
+
+if __name__ == "__main__":
+    main()
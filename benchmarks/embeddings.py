@@ -0,0 +1,81 @@
+# benchmarks/embeddings.py
+"""
+Throughput and memory of the recommendation embedding pipeline (EmbeddingService.sync).
+
+For each size: a cold sync (everything embedded), a warm re-sync where 1% of products
+changed (only those are re-embedded), the size of the resulting store, and the peak
+memory traced during a separate, untimed cold sync. Store size is also projected to
+one million products.
+
+Usage (from the repository root):
+    python -m benchmarks.embeddings
+    python -m benchmarks.embeddings --sizes 100000 1000000 --model hashing
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+from services.recommendation.app.services.embeddings import EmbeddingService, get_model
+
+_WORDS = (
+    "wireless noise cancelling bluetooth headphones over ear earbuds charging case bass "
+    "stainless steel kitchen knife set chef ceramic pan nonstick cookware coffee grinder "
+    "kids toy building blocks puzzle educational gaming mouse keyboard mechanical rgb "
+    "usb c cable fast charger portable power bank laptop stand ergonomic desk lamp led"
+).split()
+
+
+def make_products(count: int, seed: int = 11) -> list[dict]:
+    rng = random.Random(seed)
+    categories = [f"Category {i} > Sub {j}" for i in range(20) for j in range(10)]
+    return [
+        {
+            "id": i,
+            "name": " ".join(rng.choices(_WORDS, k=rng.randint(4, 12))),
+            "category": rng.choice(categories),
+            "description": " ".join(rng.choices(_WORDS, k=rng.randint(10, 40))),
+        }
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--model", default=None, help="embedding model (default: EMBEDDING_MODEL)")
+    parser.add_argument("--changed", type=float, default=0.01, help="fraction changed before the warm run")
+    args = parser.parse_args()
+
+    model = get_model(args.model)
+    print(f"model {model.key}, dim {model.dim}\n")
+    print(f"{'products':>10} {'cold/s':>10} {'warm/s':>10} {'re-embedded':>12} "
+          f"{'store MB':>9} {'MB per 1M':>10} {'peak MB':>8}")
+    for size in sorted(args.sizes):
+        products = make_products(size)
+        service = EmbeddingService(model)
+
+        started = time.perf_counter()
+        service.sync(products)
+        cold = time.perf_counter() - started
+
+        # Separate run: tracing slows allocation-heavy code down too much to time it
+        tracemalloc.start()
+        EmbeddingService(model).sync(products)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        rng = random.Random(size)
+        for product in rng.sample(products, int(size * args.changed)):
+            product["description"] += " refreshed"
+        started = time.perf_counter()
+        warm_result = service.sync(products)
+        warm = time.perf_counter() - started
+
+        store_mb = service.store.nbytes / 2**20
+        print(f"{size:>10} {size / cold:>10.0f} {size / warm:>10.0f} {warm_result['embedded']:>12} "
+              f"{store_mb:>9.1f} {store_mb * 1_000_000 / size:>10.0f} {peak / 2**20:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+# benchmarks/ingestion_pipeline.py
+"""
+End-to-end ingestion throughput with no Amazon, Postgres or Elasticsearch: the
+recorded pages in benchmarks/fixtures are replayed through WebScraper, Transformer
+and BulkLoader, the same steps as an ingest_amazon_search chord.
+
+Stand-ins:
+- Amazon: an in-process HTTP server (SCRAPER_AMAZON_BASE_URL points at it). Search
+  pages replay the search fixture; /dp/<asin> replays one of the product fixtures,
+  so any number of ASINs can be scraped
+- Postgres: a throwaway SQLite file (or --db-url; its "products" table is truncated)
+- Elasticsearch: an in-process server answering _bulk (and the index settings calls
+  made around large loads) with every item created
+Redis is optional: without it the loader prints a connection error when it bumps the
+search cache generation after each load, which doesn't affect the run.
+
+Each run searches --search-pages pages, scrapes --products ASINs in chunks of
+ingest_asin_chunk_size (one scrape_asins task each), then loads everything once (the
+load_products callback). The run fails unless the table and the fake _bulk endpoint
+both received every product.
+
+Reported: products/sec over the whole run, per-stage latency percentiles (the ETL
+stages of shared/utils/metrics.py: fetch, parse, transform, db, index, plus the
+search/scrape/load phases), and peak RSS of the process. The servers share the
+process (and the GIL) with the pipeline, so fetch latencies include some of their
+work; compare runs made on the same machine.
+
+Machine-readable results:
+    python -m benchmarks.ingestion_pipeline --output baseline.json
+    ... change things ...
+    python -m benchmarks.ingestion_pipeline --compare baseline.json
+--compare exits non-zero when products/sec drops, or peak RSS grows, by more than
+--tolerance (default 15%; raise --runs on noisy machines); stage percentiles beyond
+it are flagged but don't fail.
+
+Usage (from the repository root):
+    python -m benchmarks.ingestion_pipeline
+    python -m benchmarks.ingestion_pipeline --products 2000 --runs 5 --pad-kb 300 --latency-ms 20
+"""
+
+import os
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import orjson
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Replays the recorded Amazon pages (set on the class: pages, latency)."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, as against the real site
+    search_page = b""
+    product_pages = []
+    latency = 0.0
+
+    def do_GET(self):
+        if self.latency:
+            threading.Event().wait(self.latency)
+        if self.path.startswith("/s?"):
+            body = self.search_page
+        elif self.path.startswith("/dp/"):
+            asin = self.path[len("/dp/"):].split("?")[0].encode()
+            body = self.product_pages[zlib.crc32(asin) % len(self.product_pages)]
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeElasticsearchHandler(BaseHTTPRequestHandler):
+    """Accepts _bulk requests (counting documents) and acknowledges everything else."""
+
+    protocol_version = "HTTP/1.1"
+    documents = 0
+    lock = threading.Lock()
+
+    def _reply(self, payload: bytes):
+        self.send_response(200)
+        # elasticsearch-py refuses to talk to a server without this header
+        self.send_header("X-Elastic-Product", "Elasticsearch")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _handle(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if not self.path.split("?")[0].endswith("/_bulk"):
+            self._reply(b'{"acknowledged":true}')
+            return
+        # Action and source lines alternate; only "index" actions are sent
+        actions = [orjson.loads(line) for line in body.splitlines()[::2] if line.strip()]
+        items = [
+            {"index": {"_index": action["index"]["_index"], "_id": action["index"]["_id"],
+                       "status": 201, "result": "created"}}
+            for action in actions
+        ]
+        with self.lock:
+            FakeElasticsearchHandler.documents += len(items)
+        self._reply(orjson.dumps({"took": 1, "errors": False, "items": items}))
+
+    do_GET = do_POST = do_PUT = do_HEAD = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _start(handler) -> ThreadingHTTPServer:
+    server = _Server(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, name=handler.__name__, daemon=True).start()
+    return server
+
+
+# Settings are read at import time, so the fixture server has to be listening before
+# anything imports them
+_amazon = _start(FixtureHandler)
+os.environ["SCRAPER_AMAZON_BASE_URL"] = f"http://127.0.0.1:{_amazon.server_address[1]}"
+os.environ.setdefault("SCRAPER_RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("SCRAPER_CACHE_ENABLED", "false")
+
+import argparse
+import datetime
+import json
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from elasticsearch import Elasticsearch
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+from shared.config.settings import settings
+from shared.models.product import Product
+from shared.utils.metrics import collect_stages, stage
+from services.ingestion.app.etl.loader import BulkLoader
+from services.ingestion.app.etl.transformer import Transformer
+from services.ingestion.app.etl.web_scraper import WebScraper
+from benchmarks.bulk_load import make_engine, reset_table
+from benchmarks.parse import load_fixtures, pad
+
+QUERY = "wireless headphones"
+PERCENTILES = (50, 90, 99)
+
+
+def set_pages(pad_kb: int, latency_ms: float):
+    fixtures = load_fixtures()
+    FixtureHandler.search_page = pad(fixtures["search_wireless_headphones.html"], pad_kb).encode()
+    FixtureHandler.product_pages = [
+        pad(html, pad_kb).encode() for name, html in sorted(fixtures.items())
+        if name.startswith("product_") and "captcha" not in name
+    ]
+    FixtureHandler.latency = latency_ms / 1000
+
+
+def run_pipeline(engine, es, products: int, search_pages: int) -> dict:
+    """One ingest_amazon_search equivalent; returns its products, time and stage samples."""
+    reset_table(engine)
+    FakeElasticsearchHandler.documents = 0
+    # Synthetic ASINs (the fixture's are few); each maps to a recorded product page
+    asins = [f"B{i:09d}" for i in range(products)]
+    size = settings.ingest_asin_chunk_size
+
+    with collect_stages(samples=True) as breakdown:
+        started = time.perf_counter()
+        with stage("search"):
+            found = WebScraper.scrape_amazon_search(query=QUERY, pages=search_pages)
+        cleaned = []
+        for start in range(0, len(asins), size):
+            with stage("scrape"):
+                raw = WebScraper.scrape_amazon_by_asins(asins[start:start + size])
+                cleaned.extend(Transformer.clean_product_batch(raw))
+        db = sessionmaker(bind=engine, expire_on_commit=False)()
+        try:
+            with stage("load"):
+                result = BulkLoader.load_products(db, cleaned, es=es)
+            stored = db.scalar(select(func.count()).select_from(Product))
+        finally:
+            db.close()
+        elapsed = time.perf_counter() - started
+
+    assert found, "the search fixture yielded no ASINs"
+    assert len(cleaned) == products, f"scraped {len(cleaned)} of {products} products"
+    assert not result["errors"], result["errors"][:3]
+    assert stored == products, f"{stored} rows stored, expected {products}"
+    assert FakeElasticsearchHandler.documents == products, \
+        f"{FakeElasticsearchHandler.documents} documents indexed, expected {products}"
+    return {"products": products, "seconds": elapsed, "breakdown": breakdown}
+
+
+def summarize(runs: list[dict]) -> dict:
+    samples = {}
+    for run in runs:
+        for name, (_, _, durations) in run["breakdown"].items():
+            samples.setdefault(name, []).extend(durations)
+
+    stages = {}
+    for name, durations in sorted(samples.items()):
+        durations.sort()
+        stages[name] = {
+            "calls": len(durations),
+            **{f"p{p}_ms": round(_percentile(durations, p) * 1000, 3) for p in PERCENTILES},
+            "max_ms": round(durations[-1] * 1000, 3),
+            "total_s": round(sum(durations), 4),
+        }
+    rates = [run["products"] / run["seconds"] for run in runs]
+    return {
+        "products_per_sec": round(statistics.median(rates), 1),
+        "products_per_sec_runs": [round(rate, 1) for rate in rates],
+        # ru_maxrss is in KB on Linux (bytes on macOS)
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                             / (1024 * 1024 if sys.platform == "darwin" else 1024), 1),
+        "stages": stages,
+    }
+
+
+def _percentile(ordered: list[float], p: float) -> float:
+    index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report: dict):
+    results = report["results"]
+    print(f"{results['products_per_sec']:.1f} products/sec (runs: {results['products_per_sec_runs']}), "
+          f"peak RSS {results['peak_rss_mb']:.1f} MB\n")
+    print(f"{'stage':<10} {'calls':>7} " + " ".join(f"{f'p{p} ms':>9}" for p in PERCENTILES)
+          + f" {'max ms':>9} {'total s':>8}")
+    for name, row in results["stages"].items():
+        print(f"{name:<10} {row['calls']:>7} " + " ".join(f"{row[f'p{p}_ms']:>9.2f}" for p in PERCENTILES)
+              + f" {row['max_ms']:>9.2f} {row['total_s']:>8.3f}")
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> bool:
+    """Print the changes against 'baseline'; False on a gated regression."""
+    current, before = report["results"], baseline["results"]
+    print(f"\nagainst {baseline.get('commit') or 'baseline'} (tolerance {tolerance:.0%}):")
+    ok = True
+
+    def line(label: str, old: float, new: float, higher_is_better: bool, gated: bool):
+        nonlocal ok
+        change = (new - old) / old if old else 0.0
+        worse = -change if higher_is_better else change
+        flag = ""
+        if worse > tolerance:
+            flag = "REGRESSION" if gated else "slower"
+            ok = ok and not gated
+        print(f"  {label:<22} {old:>10.2f} -> {new:>10.2f}  {change:+7.1%}  {flag}")
+
+    line("products/sec", before["products_per_sec"], current["products_per_sec"], True, True)
+    line("peak RSS MB", before["peak_rss_mb"], current["peak_rss_mb"], False, True)
+    for name, row in current["stages"].items():
+        old = before["stages"].get(name)
+        if old is None:
+            continue
+        for p in (50, 99):
+            key = f"p{p}_ms"
+            line(f"{name} p{p} ms", old[key], row[key], False, False)
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--search-pages", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--pad-kb", type=int, default=100, help="filler added to each page (see benchmarks/parse.py)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated server latency per page")
+    parser.add_argument("--db-url", default=None, help="SQLAlchemy URL (default: temporary SQLite file)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+
+    set_pages(args.pad_kb, args.latency_ms)
+    elastic = _start(FakeElasticsearchHandler)
+    es = Elasticsearch(f"http://127.0.0.1:{elastic.server_address[1]}")
+    engine = make_engine(args.db_url)
+
+    # Imports, parser caches and connection pools would otherwise land in the first run
+    run_pipeline(engine, es, min(args.products, 2 * settings.ingest_asin_chunk_size), 1)
+    runs = [run_pipeline(engine, es, args.products, args.search_pages) for _ in range(args.runs)]
+
+    report = {
+        "benchmark": "ingestion_pipeline",
+        "commit": _commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "products": args.products, "search_pages": args.search_pages, "runs": args.runs,
+            "pad_kb": args.pad_kb, "latency_ms": args.latency_ms,
+            "database": engine.dialect.name, "parser_backend": settings.scraper_parser_backend,
+            "asin_chunk_size": settings.ingest_asin_chunk_size, "scraper_concurrency": settings.scraper_concurrency,
+        },
+        "results": summarize(runs),
+    }
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nresults written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("parameters") != report["parameters"]:
+            print("\nwarning: the baseline was run with different parameters")
+        if not compare(report, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
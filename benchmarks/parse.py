@@ -0,0 +1,106 @@
+# benchmarks/parse.py
+"""
+Per-page parse time of each WebScraper extraction backend, with a parity check.
+
+Every saved page in benchmarks/fixtures is parsed by every available backend and the
+outputs are compared against the bs4 reference first; the run exits non-zero on any
+difference. Real Amazon pages are far larger than the fixtures, so each page is also
+padded with --pad-kb of inert markup (scripts, carousels) before timing.
+
+Usage (from the repository root):
+    python -m benchmarks.parse
+    python -m benchmarks.parse --pad-kb 1500 --repeat 20
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from services.ingestion.app.etl.extractors import available_backends, get_extractor
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+_FILLER_BLOCK = (
+    '<div class="a-carousel-card" data-a-carousel-options=\'{"ajax":{"id_list":[]}}\'>'
+    '<a class="a-link-normal" href="/dp/B000FILLER"><img alt="Related product" src="x.jpg">'
+    '<span class="a-truncate-full">Customers who viewed this item also viewed</span></a>'
+    '<span class="a-price"><span class="a-offscreen">$9.99</span></span></div>'
+    '<script type="text/javascript">P.when("A").execute(function(A){A.trigger("x",{"a":1});});</script>\n'
+)
+
+
+def load_fixtures() -> dict[str, str]:
+    pages = {}
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        if name.endswith(".html"):
+            with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+                pages[name] = f.read()
+    return pages
+
+
+def pad(html: str, kb: int) -> str:
+    """Insert filler after the real content, the way Amazon pages trail off into widgets."""
+    if kb <= 0:
+        return html
+    filler = _FILLER_BLOCK * (kb * 1024 // len(_FILLER_BLOCK) + 1)
+    index = html.rfind("</body>")
+    return html[:index] + filler + html[index:] if index != -1 else html + filler
+
+
+def parse(extractor, name: str, html: str):
+    if name.startswith("search_"):
+        return extractor.parse_search_asins(html)
+    return extractor.parse_product(html)
+
+
+def check_parity(backends: list, pages: dict[str, str]) -> bool:
+    reference = get_extractor("bs4")
+    ok = True
+    for name, html in pages.items():
+        expected = parse(reference, name, html)
+        for backend in backends:
+            got = parse(get_extractor(backend), name, html)
+            if got != expected:
+                ok = False
+                print(f"MISMATCH {backend} on {name}:\n  bs4:     {expected}\n  {backend}: {got}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pad-kb", type=int, default=800, help="filler added to each page (default 800 KB)")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    backends = available_backends()
+    fixtures = load_fixtures()
+    padded = {name: pad(html, args.pad_kb) for name, html in fixtures.items()}
+
+    if not (check_parity(backends, fixtures) and check_parity(backends, padded)):
+        sys.exit(1)
+    print(f"parity OK: {len(backends)} backends x {len(fixtures)} fixtures (raw and padded)\n")
+
+    print(f"{'backend':<8} {'page':<36} {'KB':>6} {'median ms':>10} {'max ms':>8}")
+    totals = {}
+    for backend in backends:
+        extractor = get_extractor(backend)
+        for name, html in padded.items():
+            samples = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                parse(extractor, name, html)
+                samples.append((time.perf_counter() - started) * 1000)
+            median = statistics.median(samples)
+            totals.setdefault(backend, []).append(median)
+            print(f"{backend:<8} {name:<36} {len(html) // 1024:>6} {median:>10.2f} {max(samples):>8.2f}")
+
+    print()
+    baseline = statistics.mean(totals["bs4"])
+    for backend, medians in totals.items():
+        mean = statistics.mean(medians)
+        print(f"{backend:<8} mean {mean:8.2f} ms/page  ({baseline / mean:.1f}x vs bs4)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# benchmarks/scrape_rate_limit.py
+"""
+How the cluster-wide scrape rate limiter (services/ingestion/app/etl/rate_limiter.py)
+settles against a site that blocks above a fixed request rate.
+
+A mock site answers 503 whenever it received more than --threshold requests in the
+last second. --workers simulated scraper workers, each with its own RateLimiter and
+Redis connection (all on one fakeredis server, as they would share one Redis), send
+requests as fast as their limiter lets them, classify responses with
+WebScraper's is_blocked() and report back.
+
+Printed per --window seconds: clean requests/s, blocked share and the bucket's rate.
+An unthrottled run is shown first for comparison. With AIMD the clean throughput
+should settle a little under the threshold with a small blocked share.
+
+Usage (from the repository root; needs fakeredis with Lua support, i.e. lupa):
+    python -m benchmarks.scrape_rate_limit
+    python -m benchmarks.scrape_rate_limit --threshold 40 --workers 16 --duration 60
+"""
+
+import argparse
+import asyncio
+import collections
+import time
+import httpx
+from fakeredis import FakeAsyncRedis, FakeServer
+from shared.config.settings import settings
+from services.ingestion.app.etl.rate_limiter import RateLimiter
+from services.ingestion.app.etl.web_scraper import AMAZON_PRODUCT_URL, is_blocked
+
+
+def make_site(threshold: int) -> httpx.MockTransport:
+    recent = collections.deque()
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        now = time.monotonic()
+        recent.append(now)
+        while recent and recent[0] < now - 1.0:
+            recent.popleft()
+        if len(recent) > threshold:
+            return httpx.Response(503, text="<html>Service Unavailable</html>")
+        return httpx.Response(200, text="<html><span id='productTitle'>Product</span></html>")
+
+    return httpx.MockTransport(handle)
+
+
+async def run(args, limited: bool) -> list[dict]:
+    server = FakeServer()
+    limiters = [RateLimiter(redis_client=FakeAsyncRedis(server=server), proxy="bench") for _ in range(args.workers)]
+    windows = collections.defaultdict(lambda: {"ok": 0, "blocked": 0, "rate": None})
+    started = time.monotonic()
+    url = AMAZON_PRODUCT_URL.format(asin="B000000000")
+
+    async with httpx.AsyncClient(transport=make_site(args.threshold)) as client:
+        async def worker(limiter: RateLimiter):
+            while (elapsed := time.monotonic() - started) < args.duration:
+                if limited:
+                    await limiter.acquire(url)
+                response = await client.get(url)
+                blocked = is_blocked(response)
+                window = windows[int((time.monotonic() - started) // args.window)]
+                window["blocked" if blocked else "ok"] += 1
+                if limited:
+                    window["rate"] = await limiter.report(url, blocked)
+                else:
+                    await asyncio.sleep(0.005)  # a real request's latency
+        await asyncio.gather(*(worker(limiter) for limiter in limiters))
+
+    return [windows[i] for i in sorted(windows) if i * args.window < args.duration]
+
+
+def report(title: str, windows: list[dict], window: float):
+    print(title)
+    print(f"{'t (s)':>6} {'clean/s':>8} {'blocked':>8} {'rate':>7}")
+    for i, stats in enumerate(windows):
+        total = stats["ok"] + stats["blocked"]
+        rate = f"{stats['rate']:.1f}" if stats["rate"] is not None else "-"
+        print(f"{i * window:>6.0f} {stats['ok'] / window:>8.1f} {stats['blocked'] / max(1, total):>8.1%} {rate:>7}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threshold", type=int, default=20, help="requests/s above which the site blocks")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=60.0)
+    parser.add_argument("--window", type=float, default=5.0)
+    parser.add_argument("--initial", type=float, default=settings.scraper_rate_initial)
+    parser.add_argument("--increase", type=float, default=settings.scraper_rate_increase)
+    args = parser.parse_args()
+    settings.scraper_rate_initial = args.initial
+    settings.scraper_rate_increase = args.increase
+
+    print(f"site blocks above {args.threshold} req/s, {args.workers} workers\n")
+    report("unthrottled", asyncio.run(run(args, limited=False)), args.window)
+    report(f"rate limited (start {args.initial}/s, +{args.increase}/s per clean second, "
+           f"x{settings.scraper_rate_decrease} on block)", asyncio.run(run(args, limited=True)), args.window)
+
+
+if __name__ == "__main__":
+    main()
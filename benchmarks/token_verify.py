@@ -0,0 +1,108 @@
+# benchmarks/token_verify.py
+"""
+Cost of access token verification in shared/security/oauth2.py.
+
+- uncached:   jwt.decode (HMAC check and claims validation) on every call
+- cached:     verify_access_token on a token already in the TokenCache
+- dependency: get_current_claims, i.e. cached verification plus the revocation check
+              (answered by the local bloom filter for tokens that aren't revoked)
+- revoked:    get_current_claims on a revoked token (bloom hit confirmed in Redis)
+
+Redis is fakeredis, so the revoked row measures the client path, not the network.
+Before timing, the run checks that cached claims match decoded ones, that a cached token
+is rejected once expired, and that revoked tokens are rejected.
+
+Usage (from the repository root):
+    python -m benchmarks.token_verify
+    python -m benchmarks.token_verify --tokens 10000 --iterations 200000
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import timedelta
+import jwt
+from fakeredis import FakeAsyncRedis
+from fastapi import HTTPException
+from shared.security import oauth2
+from shared.security.jwt import ALGORITHM, SECRET_KEY, create_access_token
+from shared.security.revocation import RevocationList
+
+
+def timed(fn, tokens: list[str], iterations: int) -> float:
+    """Mean microseconds per call."""
+    started = time.perf_counter()
+    for i in range(iterations):
+        fn(tokens[i % len(tokens)])
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+async def timed_async(fn, tokens: list[str], iterations: int) -> float:
+    started = time.perf_counter()
+    for i in range(iterations):
+        await fn(tokens[i % len(tokens)])
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def expect_401(call, detail: str):
+    try:
+        call()
+    except HTTPException as e:
+        assert e.status_code == 401 and e.detail == detail, (e.status_code, e.detail)
+    else:
+        raise AssertionError(f"expected 401 {detail}")
+
+
+async def check(tokens: list[str]):
+    for token in tokens[:100]:
+        assert oauth2.verify_access_token(token) == jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+    short_lived = create_access_token({"user_id": 0}, expires_delta=timedelta(seconds=1))
+    oauth2.verify_access_token(short_lived)
+    await asyncio.sleep(1.5)
+    expect_401(lambda: oauth2.verify_access_token(short_lived), "Token expired")
+
+    await oauth2.revoke_access_token(tokens[0])
+    try:
+        await oauth2.get_current_claims(tokens[0])
+    except HTTPException as e:
+        assert e.detail == "Token revoked", e.detail
+    else:
+        raise AssertionError("revoked token accepted")
+    # A fresh process only learns about it from Redis
+    fresh = RevocationList(redis=oauth2.revocations.redis)
+    assert await fresh.is_revoked(jwt.decode(tokens[0], SECRET_KEY, algorithms=[ALGORITHM])["jti"])
+    assert not await fresh.is_revoked(jwt.decode(tokens[1], SECRET_KEY, algorithms=[ALGORITHM])["jti"])
+
+
+async def run(args):
+    oauth2.revocations = RevocationList(redis=FakeAsyncRedis())
+    tokens = [create_access_token({"user_id": i}) for i in range(args.tokens)]
+    await check(tokens)
+    live = tokens[1:]
+
+    print(f"{args.tokens} tokens, {args.iterations} calls each\n")
+    print(f"{'path':<12} {'us/call':>9}")
+    decode = lambda token: jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    print(f"{'uncached':<12} {timed(decode, live, args.iterations):>9.2f}")
+    print(f"{'cached':<12} {timed(oauth2.verify_access_token, live, args.iterations):>9.2f}")
+    print(f"{'dependency':<12} {await timed_async(oauth2.get_current_claims, live, args.iterations):>9.2f}")
+
+    async def revoked(token):
+        try:
+            await oauth2.get_current_claims(token)
+        except HTTPException:
+            pass
+    print(f"{'revoked':<12} {await timed_async(revoked, tokens[:1], args.iterations // 10):>9.2f}")
+    print(f"\ncache hit rate {oauth2.token_cache.hits / max(1, oauth2.token_cache.hits + oauth2.token_cache.misses):.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=100_000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# benchmarks/transformer.py
+"""
+Transformer.clean_product_data (row by row) versus Transformer.clean_product_columns.
+
+Inputs are built before timing; the row version mutates its input, so it gets a fresh
+copy each run. Outputs of both versions are compared at the smallest size.
+
+Usage (from the repository root):
+    python -m benchmarks.transformer
+    python -m benchmarks.transformer --sizes 10000 100000
+"""
+
+import argparse
+import random
+import time
+from services.ingestion.app.etl.transformer import Transformer
+
+
+def make_products(count: int) -> list[dict]:
+    """
+    Scraper-shaped rows with a realistic spread: prices are mostly .99/.00 points,
+    ratings have one decimal, review counts are long-tailed and categories repeat.
+    """
+    rng = random.Random(7)
+    categories = [f"Electronics > Audio > Type {i}" for i in range(200)] + [" Home & Kitchen ", None]
+    rows = []
+    for i in range(count):
+        roll = rng.random()
+        rows.append({
+            "title": "Not Found" if roll < 0.02 else f"Product {i}",
+            "price": "Not Available" if roll > 0.95 else f"${rng.randint(1, 2000):,}.{rng.choice(['99', '00', '49'])}",
+            "rating": "Not Available" if roll > 0.9 else f"{rng.randint(10, 50) / 10}",
+            "total_reviews": "Not Available" if roll > 0.9 else f"{int(rng.paretovariate(1.2)) * 7:,} ratings",
+            "category": rng.choice(categories),
+        })
+    return rows
+
+
+def timed(fn) -> tuple[float, object]:
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'rows s':>9} {'columns s':>10} {'speedup':>8}")
+    for i, size in enumerate(sorted(args.sizes)):
+        products = make_products(size)
+        columns = Transformer.to_columns(products)
+        row_input = [dict(p) for p in products]
+
+        row_time, row_result = timed(lambda: Transformer.clean_product_data(row_input))
+        col_time, col_result = timed(lambda: Transformer.clean_product_columns(columns))
+
+        if i == 0:
+            as_dicts = Transformer.clean_product_columns(columns, as_dicts=True)
+            assert as_dicts == row_result, "columnar output differs from clean_product_data"
+        print(f"{size:>10} {row_time:>9.3f} {col_time:>10.3f} {row_time / col_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
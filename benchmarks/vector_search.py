@@ -0,0 +1,95 @@
+# benchmarks/vector_search.py
+"""
+Build time, query latency and recall@k of the IVF index in
+services/recommendation/app/utils/semantic_search.py against exact (brute-force) search.
+
+Vectors are drawn around --clusters random centres, which is closer to real product
+embeddings than uniform noise. Queries are perturbed copies of indexed vectors; recall is
+the overlap of the IVF top-k with the exact top-k. The index is also saved and reloaded
+memory-mapped, and queried again from the mapped copy.
+
+Usage (from the repository root):
+    python -m benchmarks.vector_search
+    python -m benchmarks.vector_search --size 1000000 --nprobe 8 16 32
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+import numpy as np
+from services.recommendation.app.utils.semantic_search import IVFIndex, normalize_rows
+
+
+def make_vectors(size: int, dim: int, clusters: int, seed: int = 3) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim), dtype=np.float32)
+    vectors = np.empty((size, dim), dtype=np.float32)
+    block = 100_000
+    for start in range(0, size, block):
+        end = min(size, start + block)
+        vectors[start:end] = centres[rng.integers(0, clusters, end - start)]
+        vectors[start:end] += 0.6 * rng.standard_normal((end - start, dim), dtype=np.float32)
+    return normalize_rows(vectors)
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[int(fraction * (len(ordered) - 1))]
+
+
+def run_queries(index: IVFIndex, vectors: np.ndarray, queries: np.ndarray, k: int, nprobe: int) -> tuple:
+    latencies, recalls = [], []
+    for query in queries:
+        started = time.perf_counter()
+        ids, _ = index.search(query, k=k, nprobe=nprobe)
+        latencies.append((time.perf_counter() - started) * 1000)
+        exact = np.argpartition(-(vectors @ query), k - 1)[:k]
+        recalls.append(len(np.intersect1d(ids, exact)) / k)
+    return statistics.median(latencies), percentile(latencies, 0.99), statistics.mean(recalls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--clusters", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 16, 32])
+    args = parser.parse_args()
+
+    vectors = make_vectors(args.size, args.dim, args.clusters)
+    ids = np.arange(args.size, dtype=np.int64)
+    rng = np.random.default_rng(5)
+    queries = normalize_rows(
+        vectors[rng.integers(0, args.size, args.queries)]
+        # Noise with norm ~0.3 relative to the unit-length vectors
+        + (0.3 / np.sqrt(args.dim)) * rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+    )
+
+    started = time.perf_counter()
+    index = IVFIndex.build(ids, vectors)
+    print(f"built {args.size} x {args.dim} into {index.nlist} lists in {time.perf_counter() - started:.1f}s\n")
+
+    print(f"{'index':<8} {'nprobe':>6} {'p50 ms':>8} {'p99 ms':>8} {f'recall@{args.k}':>10}")
+    with tempfile.TemporaryDirectory(prefix="thumbsy-ivf-") as root:
+        index.save(root)
+        mapped = IVFIndex.load(root, mmap=True)
+        for name, candidate in (("memory", index), ("mmap", mapped)):
+            for nprobe in args.nprobe:
+                p50, p99, recall = run_queries(candidate, vectors, queries, args.k, nprobe)
+                print(f"{name:<8} {nprobe:>6} {p50:>8.2f} {p99:>8.2f} {recall:>10.3f}")
+        del mapped
+
+    # Exact search, for reference
+    latencies = []
+    for query in queries[:50]:
+        started = time.perf_counter()
+        np.argpartition(-(vectors @ query), args.k - 1)[:args.k]
+        latencies.append((time.perf_counter() - started) * 1000)
+    print(f"{'exact':<8} {'-':>6} {statistics.median(latencies):>8.2f} {percentile(latencies, 0.99):>8.2f} {1.0:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -36,15 +36,8 @@ ALTER DEFAULT PRIVILEGES FOR ROLE thumbsy_user IN SCHEMA public
 ALTER DEFAULT PRIVILEGES FOR ROLE thumbsy_user IN SCHEMA public 
     GRANT ALL ON FUNCTIONS TO PUBLIC;
 
--- Create the products table as thumbsy_user
-SET ROLE thumbsy_user;
-CREATE TABLE IF NOT EXISTS public.products (
-    id SERIAL PRIMARY KEY,
-    name VARCHAR NOT NULL,
-    description VARCHAR,
-    price FLOAT,
-    category VARCHAR
-);
+-- Tables are created by the Alembic migrations (alembic upgrade head, from the
+-- repository root), as thumbsy_user
 
 -- Grant PUBLIC table permissions
 GRANT ALL PRIVILEGES ON ALL TABLES IN SCHEMA public TO PUBLIC;
@@ -57,9 +50,7 @@ SELECT
     current_database(),
     current_setting('search_path'),
     has_schema_privilege('public', 'CREATE') as schema_create,
-    has_schema_privilege('public', 'USAGE') as schema_usage,
-    has_table_privilege('public.products', 'INSERT') as table_insert,
-    has_table_privilege('public.products', 'SELECT') as table_select;
+    has_schema_privilege('public', 'USAGE') as schema_usage;
 
 -- Show current permissions
 \dn+
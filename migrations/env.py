@@ -0,0 +1,56 @@
+# migrations/env.py
+"""
+Alembic environment: migrates the database configured in shared settings, against the
+models' metadata (shared.models.base.Base, schema "public").
+"""
+
+from logging.config import fileConfig
+from alembic import context
+from shared.config.db import database_url, engine
+from shared.models.base import Base
+import shared.models.product  # noqa: F401  (registers the table on Base.metadata)
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+SCHEMA = target_metadata.schema
+
+
+def include_name(name, type_, parent_names) -> bool:
+    # The models name their schema explicitly, so reflect it and nothing else
+    if type_ == "schema":
+        return name == SCHEMA
+    return True
+
+
+def run_migrations_offline():
+    """Emit the SQL instead of running it (alembic upgrade head --sql)."""
+    context.configure(
+        url=database_url().render_as_string(hide_password=False),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        version_table_schema=SCHEMA,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            version_table_schema=SCHEMA,
+            include_schemas=True,
+            include_name=include_name,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,39 @@
+"""
+Products table as created before migrations (init.sql / ingestion startup)
+
+Written with IF NOT EXISTS, so databases created by the old startup code can simply be
+upgraded: this revision leaves them as they are and records them as migrated.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS public.products (
+            id SERIAL PRIMARY KEY,
+            name VARCHAR NOT NULL,
+            description VARCHAR,
+            price FLOAT,
+            category VARCHAR,
+            asin VARCHAR,
+            content_hash VARCHAR(64)
+        )
+    """)
+    # Older databases got these two columns after the table was created
+    op.execute("ALTER TABLE public.products ADD COLUMN IF NOT EXISTS asin VARCHAR")
+    op.execute("ALTER TABLE public.products ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)")
+    op.execute("CREATE UNIQUE INDEX IF NOT EXISTS ix_products_asin ON public.products (asin)")
+
+
+def downgrade():
+    op.drop_table("products", schema="public")
@@ -0,0 +1,74 @@
+"""
+Query-ready products: filter columns and their indexes
+
+Adds rating, total_reviews, popularity_score and updated_at, B-tree indexes for
+category browsing by price, rating and popularity, and a pg_trgm GIN index on name.
+
+The indexes are built CONCURRENTLY (outside the migration transaction), so a large
+table stays writable while they build. If one of them fails, Postgres leaves it
+INVALID: drop it and run the upgrade again.
+
+Rows that existed before this revision have no rating, total_reviews or
+popularity_score yet. Their content_hash is cleared, so the next ingestion of each
+product writes them instead of skipping it as unchanged.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+SCHEMA = "public"
+
+# name -> columns; see shared/models/product.py for what each one serves
+BTREE_INDEXES = {
+    "ix_products_category_price": ["category", "price"],
+    "ix_products_category_rating": ["category", "rating"],
+    "ix_products_category_popularity": ["category", "popularity_score"],
+    "ix_products_popularity": ["popularity_score"],
+}
+
+
+def upgrade():
+    # Trusted since Postgres 13: the database owner can create it without superuser
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.add_column("products", sa.Column("rating", sa.Float(), nullable=True), schema=SCHEMA)
+    op.add_column("products", sa.Column("total_reviews", sa.Integer(), nullable=True), schema=SCHEMA)
+    op.add_column("products", sa.Column("popularity_score", sa.Float(), nullable=True), schema=SCHEMA)
+    # A non-volatile default: no table rewrite, existing rows read the migration's time
+    op.add_column(
+        "products",
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        schema=SCHEMA,
+    )
+    op.execute("UPDATE public.products SET content_hash = NULL WHERE rating IS NULL")
+
+    with op.get_context().autocommit_block():
+        for name, columns in BTREE_INDEXES.items():
+            op.create_index(
+                name, "products", columns, schema=SCHEMA,
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+        op.create_index(
+            "ix_products_name_trgm", "products", ["name"], schema=SCHEMA,
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"},
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in ["ix_products_name_trgm", *BTREE_INDEXES]:
+            op.drop_index(name, table_name="products", schema=SCHEMA, postgresql_concurrently=True, if_exists=True)
+
+    for column in ("updated_at", "popularity_score", "total_reviews", "rating"):
+        op.drop_column("products", column, schema=SCHEMA)
+    # pg_trgm may be used by other tables, so it stays
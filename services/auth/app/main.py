@@ -1,14 +1,23 @@
 # services/auth/app/main.py
 from fastapi import FastAPI
-from shared.config.db import engine
+from shared.config.db import async_engine, engine
 from shared.models.base import Base
+from shared.utils.metrics import instrument
 from .routes.auth import router as auth_router
+from .utils.hashing import start_pool, shutdown_pool
 
 app = FastAPI()
+instrument(app, "auth")
 
 # Create tables on startup (for dev only; in production, use migrations)
 @app.on_event("startup")
 def on_startup():
     Base.metadata.create_all(bind=engine)  # Creates users table if not already present
+    start_pool()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    shutdown_pool()
+    await async_engine.dispose()
 
 app.include_router(auth_router, prefix="/auth")
@@ -1,49 +1,85 @@
 # services/auth/app/routes/auth.py
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from shared.config.db import SessionLocal
+import secrets
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from shared.config.db import get_async_db
 from shared.models.user import User
 from shared.security.jwt import create_access_token
-from ..utils.hashing import Hash
-from ..schemas.user import UserCreate, UserOut
+from shared.security.oauth2 import get_current_claims, oauth2_scheme, revoke_access_token
+from ..utils.hashing import HashPoolBusy, hash_password, verify_password
+from ..schemas.user import UserCreate, UserLogin, UserOut
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Hash checked for unknown emails, so they take as long as a wrong password
+_dummy_hash = None
+
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many concurrent logins, retry shortly",
+        headers={"Retry-After": "1"},
+    )
 
 @router.post("/signup", response_model=UserOut)
-def signup(user_data: UserCreate, db: Session = Depends(get_db)):
+async def signup(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     # Check if email exists
-    existing_user = db.query(User).filter_by(email=user_data.email).first()
+    existing_user = await db.scalar(select(User).filter_by(email=user_data.email))
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    # Hash password
-    hashed_pw = Hash.bcrypt(user_data.password)
+    # Hash password (in the hashing pool)
+    try:
+        hashed_pw = await hash_password(user_data.password)
+    except HashPoolBusy:
+        raise _busy()
 
     # Create user
     new_user = User(
         email=user_data.email,
         hashed_password=hashed_pw,
-        full_name=user_data.full_name
+        username=user_data.username
     )
+
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Email or username already registered")
 
     return new_user
 
 @router.post("/login")
-def login(user_data: UserCreate, db: Session = Depends(get_db)):
-    user = db.query(User).filter_by(email=user_data.email).first()
-    if not user or not Hash.verify(user_data.password, user.hashed_password):
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    global _dummy_hash
+    user = await db.scalar(select(User).filter_by(email=user_data.email))
+
+    try:
+        if user is None:
+            if _dummy_hash is None:
+                _dummy_hash = await hash_password(secrets.token_urlsafe(16))
+            await verify_password(user_data.password, _dummy_hash)
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        valid, new_hash = await verify_password(user_data.password, user.hashed_password)
+    except HashPoolBusy:
+        raise _busy()
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    # The stored hash used another bcrypt cost; upgrade it while we have the password
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+
     # Generate token
     token = create_access_token({"user_id": user.id})
     return {"access_token": token, "token_type": "bearer"}
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(token: str = Depends(oauth2_scheme), claims: dict = Depends(get_current_claims)):
+    # Revoked everywhere, not just forgotten by this client
+    await revoke_access_token(token)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -8,6 +8,10 @@ class UserCreate(BaseModel):
     username: str
     full_name: Optional[str] = None
 
+class UserLogin(BaseModel):
+    email: EmailStr
+    password: str
+
 class UserOut(BaseModel):
     id: int
     email: EmailStr
@@ -1,7 +1,37 @@
 # services/auth/app/utils/hashing.py
+"""
+Password hashing for the auth service.
+
+bcrypt costs ~250 ms of CPU per call at the default cost, so the async API below runs
+it on a dedicated, bounded process pool instead of in request threads (where it would
+also hold the GIL). Admission control caps the number of hashes waiting for the pool:
+past settings.auth_hash_max_pending, calls fail fast with HashPoolBusy, which routes
+turn into 503 rather than letting a login burst queue up behind itself.
+
+The context pins bcrypt to exactly settings.auth_bcrypt_rounds, so verify_password()
+also returns a replacement hash whenever a stored hash used a different cost.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 from passlib.context import CryptContext
+from shared.config.settings import settings
+
+
+def _context(rounds: int) -> CryptContext:
+    # min == max == default: hashes with any other cost "need update"
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
 
-pwd_cxt = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_cxt = _context(settings.auth_bcrypt_rounds)
 
 class Hash:
     @staticmethod
@@ -11,3 +41,74 @@ class Hash:
     @staticmethod
     def verify(plain_password, hashed_password):
         return pwd_cxt.verify(plain_password, hashed_password)
+
+
+class HashPoolBusy(Exception):
+    """Too many hashes are already waiting for the pool."""
+
+
+# ---------------------
+# Worker-side functions (run in the pool processes)
+# ---------------------
+_worker_contexts = {}
+
+def _worker_context(rounds: int) -> CryptContext:
+    if rounds not in _worker_contexts:
+        _worker_contexts[rounds] = _context(rounds)
+    return _worker_contexts[rounds]
+
+def _hash(password: str, rounds: int) -> str:
+    return _worker_context(rounds).hash(password)
+
+def _verify_and_update(password: str, hashed_password: str, rounds: int) -> tuple[bool, str | None]:
+    return _worker_context(rounds).verify_and_update(password, hashed_password)
+
+def _warm_up(rounds: int) -> None:
+    _worker_context(rounds)
+
+
+# ---------------------
+# Async API (event loop side)
+# ---------------------
+_pool = None
+_pending = 0
+
+def start_pool() -> ProcessPoolExecutor:
+    """
+    Create the hashing pool (idempotent). Workers are spawned rather than forked so
+    they don't inherit the server's threads and sockets.
+    """
+    global _pool
+    if _pool is None:
+        workers = settings.auth_hash_workers or os.cpu_count() or 1
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        # Start every worker now rather than on the first logins
+        for _ in range(workers):
+            _pool.submit(_warm_up, settings.auth_bcrypt_rounds)
+    return _pool
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+async def hash_password(password: str) -> str:
+    return await _submit(_hash, password, settings.auth_bcrypt_rounds)
+
+async def verify_password(password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """
+    Returns (valid, new_hash). new_hash is set when the password is valid but the stored
+    hash used a different cost than settings.auth_bcrypt_rounds; store it.
+    """
+    return await _submit(_verify_and_update, password, hashed_password, settings.auth_bcrypt_rounds)
+
+async def _submit(fn, *args):
+    global _pending
+    if _pending >= settings.auth_hash_max_pending:
+        raise HashPoolBusy()
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(start_pool(), fn, *args)
+    finally:
+        _pending -= 1
@@ -1,23 +1,282 @@
 # services/ingestion/app/etl/api_fetcher.py
+"""
+Paginated product feeds from partner APIs.
+
+iter_pages() / iter_products() walk a feed page by page and yield as they go, so a
+feed of any length is never held in memory. Three pagination styles are supported
+(Pagination.mode):
+
+- "cursor": the body carries the next cursor (cursor_field, dotted path allowed),
+  sent back as the cursor_param query parameter; stops when it is empty
+- "offset": offset_param/limit_param query parameters; stops at the first short page
+- "link":   follows the Link header's rel="next" URL (RFC 8288)
+- None:     a single request
+
+Up to 'prefetch' pages are fetched ahead of the consumer and no more, so a slow
+consumer slows the fetching down instead of buffering the feed. Offset pages are known
+up front and fetched concurrently; cursor and link pages are fetched one after another
+while the consumer works on earlier pages.
+
+Each page is retried (transport errors, 429 and 5xx) and then, if it still fails,
+surfaces as PageFetchError whose 'resume' restarts the iteration at that page:
+    iter_pages(url, pagination, resume=error.resume)
+"""
+
+import asyncio
+import collections
+from typing import AsyncIterator, Iterator
+import httpx
+import orjson
+from shared.config.settings import settings
+from shared.utils.metrics import stage
+from . import http_client
+
+_RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+class Pagination:
+    def __init__(
+        self,
+        mode: str | None = "cursor",
+        items_field: str = "products",
+        cursor_field: str = "next_cursor",
+        cursor_param: str = "cursor",
+        offset_param: str = "offset",
+        limit_param: str = "limit",
+        page_size: int | None = None,
+    ):
+        if mode not in ("cursor", "offset", "link", None):
+            raise ValueError(f"Unknown pagination mode '{mode}', expected 'cursor', 'offset', 'link' or None")
+        self.mode = mode
+        self.items_field = items_field
+        self.cursor_field = cursor_field
+        self.cursor_param = cursor_param
+        self.offset_param = offset_param
+        self.limit_param = limit_param
+        self.page_size = page_size or settings.api_fetch_page_size
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+
+
+class Page:
+    def __init__(self, number: int, url: str, items: list[dict], next_resume: dict | None):
+        self.number = number
+        self.url = url
+        self.items = items
+        # Where to resume once this page has been consumed (None: this was the last page)
+        self.next_resume = next_resume
+
+
+class PageFetchError(Exception):
+    """A page kept failing. 'resume' restarts the feed at that page."""
+
+    def __init__(self, url: str, resume: dict, cause: Exception):
+        super().__init__(f"Error fetching {url}: {cause}")
+        self.url = url
+        self.resume = resume
+        self.cause = cause
 
-import requests
 
 class APIFetcher:
+    # ---------------------
+    # Async API
+    # ---------------------
+    @staticmethod
+    async def iter_pages(
+        url: str,
+        pagination: Pagination | None = None,
+        params: dict | None = None,
+        resume: dict | None = None,
+        prefetch: int | None = None,
+        client: httpx.AsyncClient | None = None,
+    ) -> AsyncIterator[Page]:
+        pagination = pagination or Pagination()
+        prefetch = max(1, prefetch or settings.api_fetch_prefetch)
+        client = client or http_client.get_client()
+        if client is None:
+            async with http_client.new_client() as client:
+                async for page in APIFetcher.iter_pages(url, pagination, params, resume, prefetch, client):
+                    yield page
+            return
+
+        if pagination.mode == "offset":
+            pages = _offset_pages(client, url, pagination, params or {}, resume or {}, prefetch)
+        else:
+            pages = _sequential_pages(client, url, pagination, params or {}, resume or {}, prefetch)
+        async for page in pages:
+            yield page
+
+    @staticmethod
+    async def iter_products(url: str, pagination: Pagination | None = None, **kwargs) -> AsyncIterator[dict]:
+        async for page in APIFetcher.iter_pages(url, pagination, **kwargs):
+            for item in page.items:
+                yield item
+
+    # ---------------------
+    # Synchronous wrappers
+    # ---------------------
+    @staticmethod
+    def stream_pages(url: str, pagination: Pagination | None = None, **kwargs) -> Iterator[Page]:
+        """
+        iter_pages() for synchronous callers (Celery tasks): pages are fetched on the
+        pooled client's loop and handed over one at a time.
+        """
+        pages = APIFetcher.iter_pages(url, pagination, **kwargs)
+        try:
+            while True:
+                page = http_client.run(_next(pages))
+                if page is None:
+                    return
+                yield page
+        finally:
+            http_client.run(pages.aclose())
+
+    @staticmethod
+    def stream_products(url: str, pagination: Pagination | None = None, **kwargs) -> Iterator[dict]:
+        for page in APIFetcher.stream_pages(url, pagination, **kwargs):
+            yield from page.items
+
     @staticmethod
-    def fetch_products(url: str, params: dict | None = None) -> list[dict]:
+    def fetch_products(url: str, params: dict | None = None, pagination: Pagination | None = None) -> list[dict]:
         """
-        Fetch product data from a given API endpoint.
-        Returns a list of product dictionaries.
+        Fetch every product from an API endpoint (a single request unless 'pagination'
+        says otherwise). Only for small feeds; raises PageFetchError on failure.
         """
+        return list(APIFetcher.stream_products(url, pagination or Pagination(mode=None), params=params))
+
+
+# ---------------------
+# Internals
+# ---------------------
+async def _next(pages: AsyncIterator[Page]) -> Page | None:
+    try:
+        return await pages.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+async def _get_page(client: httpx.AsyncClient, url: str, params: dict, resume: dict) -> httpx.Response:
+    attempts = settings.api_fetch_retries + 1
+    for attempt in range(attempts):
         try:
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            # Ensure it's a list of dicts
-            if isinstance(data, dict):
-                # Some APIs return a dict with a "products" key, for example
-                data = data.get("products", [])
-            return data
+            with stage("fetch"):
+                response = await client.get(url, params=params or None)
+            if response.status_code not in _RETRY_STATUS or attempt == attempts - 1:
+                response.raise_for_status()
+                return response
+        except httpx.HTTPStatusError as e:
+            raise PageFetchError(url, resume, e)
+        except httpx.TransportError as e:
+            if attempt == attempts - 1:
+                raise PageFetchError(url, resume, e)
+        await asyncio.sleep(min(30.0, 0.5 * 2 ** attempt))
+
+
+def _items(body, pagination: Pagination) -> list[dict]:
+    # Some APIs return a bare list, others a dict with a "products" key, for example
+    if isinstance(body, dict):
+        body = body.get(pagination.items_field) or []
+    if not isinstance(body, list):
+        raise ValueError(f"Expected a list of products, got {type(body).__name__}")
+    return body
+
+
+def _field(body, path: str):
+    for part in path.split("."):
+        if not isinstance(body, dict):
+            return None
+        body = body.get(part)
+    return body
+
+
+async def _sequential_pages(client, url: str, pagination: Pagination, params: dict, resume: dict, prefetch: int):
+    """Cursor, link and single-page feeds: one request at a time, up to 'prefetch' ahead."""
+    queue = asyncio.Queue(maxsize=prefetch)
+    done = object()
+
+    async def produce():
+        number, next_url, cursor = resume.get("page", 0), resume.get("url", url), resume.get("cursor")
+        while True:
+            page_params = dict(params) if next_url == url else {}
+            if pagination.mode == "cursor" and cursor:
+                page_params[pagination.cursor_param] = cursor
+            here = {"page": number, "url": next_url, "cursor": cursor}
+            response = await _get_page(client, next_url, page_params, here)
+            try:
+                with stage("parse"):
+                    body = orjson.loads(response.content)
+                    items = _items(body, pagination)
+            except ValueError as e:
+                raise PageFetchError(next_url, here, e)
+
+            following = None
+            if pagination.mode == "cursor":
+                cursor = _field(body, pagination.cursor_field)
+                following = {"page": number + 1, "url": url, "cursor": cursor} if cursor and items else None
+            elif pagination.mode == "link":
+                link = response.links.get("next", {}).get("url")
+                if link:
+                    next_url = str(response.url.join(link))
+                    following = {"page": number + 1, "url": next_url, "cursor": None}
+            await queue.put(Page(number, here["url"], items, following))
+            if following is None:
+                return
+            number += 1
+
+    async def run():
+        try:
+            await produce()
         except Exception as e:
-            print(f"Error fetching products from {url}: {e}")
-            return []
+            # Handed to the consumer after the pages fetched before it
+            await queue.put(e)
+            return
+        await queue.put(done)
+
+    producer = asyncio.create_task(run())
+    try:
+        while True:
+            page = await queue.get()
+            if page is done:
+                return
+            if isinstance(page, Exception):
+                raise page
+            yield page
+    finally:
+        producer.cancel()
+
+
+async def _offset_pages(client, url: str, pagination: Pagination, params: dict, resume: dict, prefetch: int):
+    """Offset feeds: up to 'prefetch' pages in flight, yielded in order."""
+    size = pagination.page_size
+    start_offset, start_page = resume.get("offset", 0), resume.get("page", 0)
+
+    async def fetch(number: int) -> Page:
+        offset = start_offset + (number - start_page) * size
+        here = {"page": number, "offset": offset}
+        page_params = {**params, pagination.offset_param: offset, pagination.limit_param: size}
+        response = await _get_page(client, url, page_params, here)
+        try:
+            with stage("parse"):
+                items = _items(orjson.loads(response.content), pagination)
+        except ValueError as e:
+            raise PageFetchError(url, here, e)
+        following = {"page": number + 1, "offset": offset + size} if len(items) >= size else None
+        return Page(number, str(response.url), items, following)
+
+    window = collections.deque()
+    number = start_page
+    try:
+        while True:
+            while len(window) < prefetch:
+                window.append(asyncio.create_task(fetch(number)))
+                number += 1
+            page = await window.popleft()
+            yield page
+            if page.next_resume is None:
+                return
+    finally:
+        for task in window:
+            task.cancel()
+            # Pages past the end (or past a failure) may have failed too; nobody needs to know
+            task.add_done_callback(lambda task: task.cancelled() or task.exception())
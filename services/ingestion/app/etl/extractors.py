@@ -0,0 +1,233 @@
+# services/ingestion/app/etl/extractors.py
+"""
+HTML extraction backends for WebScraper.
+
+Every backend turns a search page into a sorted list of ASINs and a product page
+into the same product dict. "bs4" is the reference implementation (BeautifulSoup with
+html.parser); "lxml" compiles the same CSS selectors to XPath once per process and runs
+them over an lxml tree, which is several times faster on full Amazon pages.
+benchmarks/parse.py checks both backends for identical output on the saved fixtures.
+
+The backend is chosen with SCRAPER_PARSER_BACKEND; more can be added with register_backend().
+"""
+
+import logging
+from bs4 import BeautifulSoup
+from shared.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+TITLE_SELECTOR = "#productTitle"
+PRICE_SELECTORS = [
+    "#priceblock_ourprice",
+    "#priceblock_dealprice",
+    "span.a-price span.a-offscreen",
+]
+BREADCRUMB_SELECTOR = "#wayfinding-breadcrumbs_feature_div ul li span a"
+RATING_SELECTOR = ".a-icon-star span.a-icon-alt, #averageCustomerReviews .a-icon-alt"
+REVIEWS_SELECTOR = "#acrCustomerReviewText, #acrCustomerReviewLink span"
+
+
+class Bs4Extractor:
+    name = "bs4"
+
+    @staticmethod
+    def parse_search_asins(html: str) -> list[str]:
+        soup = BeautifulSoup(html, "html.parser")
+
+        # Typical: <div data-asin="XYZ" data-component-type="s-search-result">
+        found_asins = set()
+        search_divs = soup.find_all("div", attrs={"data-component-type": "s-search-result"})
+        for div in search_divs:
+            asin = div.get("data-asin")
+            if asin and asin.strip():
+                found_asins.add(asin.strip())
+        return sorted(found_asins)
+
+    @staticmethod
+    def parse_product(html: str) -> dict:
+        soup = BeautifulSoup(html, "html.parser")
+
+        # ---------------------
+        # Extract Title
+        # ---------------------
+        title_elem = soup.select_one(TITLE_SELECTOR)
+        title = title_elem.get_text(strip=True) if title_elem else "Not Found"
+
+        # ---------------------
+        # Extract Price
+        # ---------------------
+        price = None
+        for sel in PRICE_SELECTORS:
+            price_elem = soup.select_one(sel)
+            if price_elem and price_elem.get_text(strip=True):
+                price = price_elem.get_text(strip=True)
+                break
+        if not price:
+            price = "Not Available"
+
+        # ---------------------
+        # Extract Category
+        # ---------------------
+        category = "Not Available"
+        breadcrumb_elem = soup.select(BREADCRUMB_SELECTOR)
+        if breadcrumb_elem:
+            categories = [b.get_text(strip=True) for b in breadcrumb_elem if b.get_text(strip=True)]
+            if categories:
+                category = " > ".join(categories)
+
+        # ---------------------
+        # Extract Rating
+        # ---------------------
+        rating_elem = soup.select_one(RATING_SELECTOR)
+        rating = rating_elem.get_text(strip=True).split()[0] if rating_elem else "Not Available"
+
+        # ---------------------
+        # Extract Total Reviews
+        # ---------------------
+        reviews_elem = soup.select_one(REVIEWS_SELECTOR)
+        total_reviews = reviews_elem.get_text(strip=True) if reviews_elem else "Not Available"
+
+        return {
+            "title": title,
+            "price": price,
+            "category": category,
+            "rating": rating,
+            "total_reviews": total_reviews,
+        }
+
+
+class LxmlExtractor:
+    name = "lxml"
+
+    # Content of these elements is not text as far as BeautifulSoup's get_text() is concerned
+    _NON_TEXT_TAGS = frozenset(["script", "style", "template"])
+
+    def __init__(self):
+        import lxml.html
+        from lxml import etree
+        from lxml.cssselect import CSSSelector
+
+        self._html = lxml.html
+        self._parser_error = etree.ParserError
+        self._title = CSSSelector(TITLE_SELECTOR)
+        self._prices = [CSSSelector(sel) for sel in PRICE_SELECTORS]
+        self._breadcrumbs = CSSSelector(BREADCRUMB_SELECTOR)
+        self._rating = CSSSelector(RATING_SELECTOR)
+        self._reviews = CSSSelector(REVIEWS_SELECTOR)
+        self._search_asins = etree.XPath('//div[@data-component-type="s-search-result"]/@data-asin')
+
+    def parse_search_asins(self, html: str) -> list[str]:
+        tree = self._parse(html)
+        if tree is None:
+            return []
+        return sorted({asin.strip() for asin in self._search_asins(tree) if asin and asin.strip()})
+
+    def parse_product(self, html: str) -> dict:
+        tree = self._parse(html)
+        if tree is None:
+            return Bs4Extractor.parse_product("")
+
+        title = self._first_text(self._title, tree)
+        if title is None:
+            title = "Not Found"
+
+        price = None
+        for selector in self._prices:
+            price = self._first_text(selector, tree)
+            if price:
+                break
+        if not price:
+            price = "Not Available"
+
+        category = "Not Available"
+        categories = [text for text in (self._text(a) for a in self._breadcrumbs(tree)) if text]
+        if categories:
+            category = " > ".join(categories)
+
+        rating = self._first_text(self._rating, tree)
+        rating = rating.split()[0] if rating is not None else "Not Available"
+
+        total_reviews = self._first_text(self._reviews, tree)
+        if total_reviews is None:
+            total_reviews = "Not Available"
+
+        return {
+            "title": title,
+            "price": price,
+            "category": category,
+            "rating": rating,
+            "total_reviews": total_reviews,
+        }
+
+    def _parse(self, html: str):
+        try:
+            return self._html.document_fromstring(html)
+        except self._parser_error:
+            # Empty or whitespace-only document
+            return None
+        except ValueError:
+            # Unicode input with an XML encoding declaration
+            return self._html.document_fromstring(html.encode("utf-8"))
+
+    def _first_text(self, selector, tree) -> str | None:
+        """Text of the first match in document order (like select_one), or None."""
+        matches = selector(tree)
+        return self._text(matches[0]) if matches else None
+
+    def _text(self, elem) -> str:
+        """Equivalent of BeautifulSoup's get_text(strip=True)."""
+        parts = []
+        self._collect_text(elem, parts)
+        return "".join(parts)
+
+    def _collect_text(self, elem, parts: list):
+        if elem.text and elem.tag not in self._NON_TEXT_TAGS:
+            text = elem.text.strip()
+            if text:
+                parts.append(text)
+        for child in elem:
+            # Comments and processing instructions have a non-string tag
+            if isinstance(child.tag, str):
+                self._collect_text(child, parts)
+            if child.tail:
+                tail = child.tail.strip()
+                if tail:
+                    parts.append(tail)
+
+
+_BACKENDS = {"bs4": Bs4Extractor}
+_instances = {}
+
+
+def register_backend(name: str, factory):
+    """
+    Make an extractor available under 'name'. factory() must return an object with
+    parse_search_asins(html) and parse_product(html).
+    """
+    _BACKENDS[name] = factory
+    _instances.pop(name, None)
+
+
+def get_extractor(name: str | None = None):
+    """
+    Return the configured extractor, falling back to bs4 when the requested backend's
+    dependencies are not installed.
+    """
+    name = name or settings.scraper_parser_backend
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown parser backend '{name}', expected one of {available_backends()}")
+    if name not in _instances:
+        try:
+            _instances[name] = _BACKENDS[name]()
+        except ImportError as e:
+            logger.warning(f"Parser backend '{name}' is unavailable ({e}); using bs4")
+            _instances[name] = Bs4Extractor()
+    return _instances[name]
+
+
+def available_backends() -> list[str]:
+    return list(_BACKENDS)
+
+
+register_backend("lxml", LxmlExtractor)
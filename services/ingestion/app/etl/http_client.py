@@ -0,0 +1,136 @@
+# services/ingestion/app/etl/http_client.py
+"""
+Per-process pooled HTTP client shared by WebScraper and APIFetcher.
+
+Each worker process owns one httpx.AsyncClient that lives on a background event
+loop thread, so connections (and their TLS sessions) are kept alive across Celery
+tasks instead of being re-established for every request. Synchronous callers submit
+coroutines to that loop with run().
+
+Pool sizing, keep-alive and HTTP/2 are configured through shared settings
+(HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE_CONNECTIONS, HTTP_KEEPALIVE_EXPIRY,
+HTTP_HTTP2); requests go through SCRAPER_PROXY when it is set. gzip/deflate are
+always negotiated; br is added automatically when the brotli package is installed.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from collections import defaultdict
+import httpx
+from shared.config.settings import settings
+from shared.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/91.0.4472.124 Safari/537.36"
+    ),
+    "Accept-Language": "en-US,en;q=0.5",
+}
+
+_lock = threading.Lock()
+_pid = None
+_loop = None
+_client = None
+_stats = defaultdict(lambda: {"requests": 0, "tcp_connects": 0, "tls_handshakes": 0})
+
+
+def run(coro):
+    """
+    Run a coroutine on the process-wide HTTP loop and block until it finishes.
+    Its ETL stages count towards the caller's breakdown (metrics.collect_stages()).
+    """
+    loop = _ensure_started()
+    return asyncio.run_coroutine_threadsafe(metrics.bind(coro), loop).result()
+
+
+def get_client() -> httpx.AsyncClient | None:
+    """
+    Return the pooled client if the caller is running on the process-wide HTTP loop,
+    else None (an httpx.AsyncClient cannot be shared across event loops).
+    """
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    if _pid == os.getpid() and running is _loop:
+        return _client
+    return None
+
+
+def new_client() -> httpx.AsyncClient:
+    """
+    Build an AsyncClient configured from settings, with pool statistics enabled.
+    """
+    http2 = settings.http_http2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("HTTP_HTTP2 is enabled but the h2 package is not installed; using HTTP/1.1")
+            http2 = False
+
+    return httpx.AsyncClient(
+        headers=HEADERS,
+        timeout=settings.scraper_timeout,
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        ),
+        http2=http2,
+        proxy=settings.scraper_proxy,
+        follow_redirects=True,
+        event_hooks={"request": [_track_request]},
+    )
+
+
+def pool_stats() -> dict[str, dict]:
+    """
+    Per-host connection statistics for this process:
+    requests, tcp_connects, tls_handshakes and reuse_ratio (share of requests
+    served on an already-open connection).
+    """
+    report = {}
+    for host, counts in list(_stats.items()):
+        requests = counts["requests"]
+        reused = max(requests - counts["tcp_connects"], 0)
+        report[host] = {**counts, "reuse_ratio": round(reused / requests, 3) if requests else 0.0}
+    return report
+
+
+def _ensure_started() -> asyncio.AbstractEventLoop:
+    global _pid, _loop, _client
+    # Celery prefork children inherit module state but not the loop thread: start fresh per pid
+    if _pid == os.getpid() and _loop is not None:
+        return _loop
+    with _lock:
+        if _pid != os.getpid() or _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="http-client-loop", daemon=True).start()
+            _client = asyncio.run_coroutine_threadsafe(_create_client(), loop).result()
+            _stats.clear()
+            _loop, _pid = loop, os.getpid()
+    return _loop
+
+
+async def _create_client() -> httpx.AsyncClient:
+    return new_client()
+
+
+async def _track_request(request: httpx.Request):
+    host = request.url.host
+    _stats[host]["requests"] += 1
+
+    async def trace(event: str, info: dict):
+        if event == "connection.connect_tcp.complete":
+            _stats[host]["tcp_connects"] += 1
+        elif event == "connection.start_tls.complete":
+            _stats[host]["tls_handshakes"] += 1
+
+    request.extensions["trace"] = trace
@@ -0,0 +1,276 @@
+# services/ingestion/app/etl/loader.py
+
+import hashlib
+import json
+import math
+import os
+import logging
+from contextlib import nullcontext
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from elasticsearch.helpers import streaming_bulk
+from shared.models.product import Product
+from shared.config.elasticsearch import es_client, bulk_indexing, dual_write_target, PRODUCTS_ALIAS
+from shared.config.cache import bump_products_generation
+from shared.config.settings import settings
+from shared.utils.metrics import stage
+
+logger = logging.getLogger(__name__)
+
+# Writes go through the alias so reindexing can swap the physical index underneath
+PRODUCTS_INDEX = PRODUCTS_ALIAS
+BULK_CHUNK_SIZE = int(os.getenv("INGEST_BULK_CHUNK_SIZE", "500"))
+# Cap on per-item errors returned in Celery task results (all of them are logged)
+MAX_REPORTED_ERRORS = 50
+
+# Only these keys are written to Postgres; the rest of the row is still indexed in ES
+_PRODUCT_COLUMNS = frozenset(c.name for c in Product.__table__.columns if c.name != "id")
+# Fields covered by the content hash; a change in any of them triggers a write
+_HASHED_FIELDS = ("name", "description", "price", "category", "rating", "total_reviews")
+# Dialects with INSERT ... ON CONFLICT support
+_UPSERT_INSERT = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _default_description(prod: dict) -> str:
+    return f"Scraped from Amazon: rating={prod.get('rating', 0.0)}"
+
+
+class BulkLoader:
+    @staticmethod
+    def build_row(prod: dict, describe=_default_description) -> dict:
+        """
+        Map a cleaned product dict (as returned by Transformer.clean_product_data)
+        to the document we store in Postgres and Elasticsearch.
+        """
+        row = {
+            "name": prod["title"],
+            "description": prod.get("description") or describe(prod),
+            "price": prod["price"],
+            "category": prod["category"],
+            "rating": prod["rating"],
+            "total_reviews": prod["total_reviews"],
+            "asin": prod.get("asin") or None,
+        }
+        row["popularity_score"] = BulkLoader.popularity_score(row["rating"], row["total_reviews"])
+        row["content_hash"] = BulkLoader.content_hash(row)
+        return row
+
+    @staticmethod
+    def popularity_score(rating: float | None, total_reviews: int | None) -> float:
+        """
+        Rating weighted by the order of magnitude of its review count, so 4.5 stars
+        over 10,000 reviews ranks above 5 stars over 3.
+        """
+        return round((rating or 0.0) * math.log10(1 + (total_reviews or 0)), 4)
+
+    @staticmethod
+    def content_hash(row: dict) -> str:
+        """
+        Stable sha256 of the fields we store, so re-scraping an unchanged product
+        produces the same hash.
+        """
+        payload = json.dumps([row.get(field) for field in _HASHED_FIELDS], separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def load_products(
+        db,
+        products: list[dict],
+        describe=_default_description,
+        chunk_size: int = BULK_CHUNK_SIZE,
+        es=es_client,
+        index: str = PRODUCTS_INDEX,
+    ) -> dict:
+        """
+        Load cleaned products into Postgres and Elasticsearch, one chunk at a time:
+        1. Products with an ASIN are upserted on it with one INSERT ... ON CONFLICT per
+           chunk; products whose content hash is unchanged are skipped entirely.
+           Products without an ASIN get one multi-row INSERT ... RETURNING id.
+        2. One _bulk request per chunk for the rows that were actually written.
+        3. If anything was indexed, bump the products index generation so the search
+           service drops its cached results.
+
+        Loads of at least settings.es_bulk_settings_threshold products run with the
+        index's refresh and replicas switched off (shared.config.elasticsearch.bulk_indexing).
+
+        Failures are reported per item, so a single bad product never fails its chunk.
+        An ASIN repeated within a chunk is loaded once (the last occurrence wins); the
+        earlier occurrences are counted in "duplicates".
+        Pass es=None to skip indexing.
+        Returns {"inserted", "updated", "unchanged", "duplicates", "indexed": int,
+                 "errors": [{"title", "stage", "error"}]}.
+        """
+        result = {"inserted": 0, "updated": 0, "unchanged": 0, "duplicates": 0, "indexed": 0, "errors": []}
+
+        large = es is not None and len(products) >= settings.es_bulk_settings_threshold
+        with bulk_indexing(es, index) if large else nullcontext() as renew:
+            BulkLoader._load_chunks(db, products, describe, chunk_size, es, index, result, renew)
+
+        if result["indexed"]:
+            # Cached search results may now be stale
+            bump_products_generation()
+        return result
+
+    @staticmethod
+    def _load_chunks(db, products: list[dict], describe, chunk_size: int, es, index: str, result: dict,
+                     renew=None):
+        for start in range(0, len(products), chunk_size):
+            chunk = products[start:start + chunk_size]
+            if renew is not None:
+                # Keep this load's hold on the bulk index settings alive
+                renew()
+
+            docs = []
+            for prod in chunk:
+                try:
+                    docs.append(BulkLoader.build_row(prod, describe))
+                except Exception as e:
+                    result["errors"].append(_error(prod.get("title"), "transform", e))
+
+            keyed = {}
+            for doc in docs:
+                if doc["asin"]:
+                    # The same ASIN twice in one statement would make ON CONFLICT fail; last one wins
+                    if doc["asin"] in keyed:
+                        result["duplicates"] += 1
+                    keyed[doc["asin"]] = doc
+            unkeyed = [doc for doc in docs if not doc["asin"]]
+
+            with stage("db"):
+                written = BulkLoader._upsert_chunk(db, list(keyed.values()), result)
+                inserted = BulkLoader._insert_chunk(db, unkeyed, result["errors"])
+            result["inserted"] += len(inserted)
+            written.extend(inserted)
+
+            if es is not None and written:
+                with stage("index"):
+                    result["indexed"] += BulkLoader._index_chunk(es, index, written, result["errors"])
+                    rebuilding = dual_write_target(index)
+                    if rebuilding is not None:
+                        # reindex_products is copying into a new index; keep it up to date too
+                        BulkLoader._index_chunk(es, rebuilding, written, result["errors"])
+
+    @staticmethod
+    def _upsert_chunk(db, docs: list[dict], result: dict) -> list[tuple[int, dict]]:
+        """
+        Upsert products keyed by ASIN, skipping those whose stored content hash matches.
+        Updates result's inserted/updated/unchanged counts.
+        Returns (id, doc) pairs for the rows that were inserted or updated.
+        """
+        if not docs:
+            return []
+
+        existing = dict(db.execute(
+            select(Product.asin, Product.content_hash).where(Product.asin.in_([doc["asin"] for doc in docs]))
+        ).all())
+        changed = [doc for doc in docs if doc["asin"] not in existing or existing[doc["asin"]] != doc["content_hash"]]
+        result["unchanged"] += len(docs) - len(changed)
+        if not changed:
+            db.commit()
+            return []
+
+        dialect = db.get_bind().dialect.name
+        stmt = _UPSERT_INSERT[dialect](Product)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Product.asin],
+            set_={
+                **{name: stmt.excluded[name] for name in _PRODUCT_COLUMNS if name != "asin"},
+                "updated_at": func.now(),
+            },
+            # Another worker may have written the same content since we looked
+            where=Product.content_hash.is_distinct_from(stmt.excluded.content_hash),
+        ).returning(Product.id, Product.asin)
+
+        by_asin = {doc["asin"]: doc for doc in changed}
+        rows = [_columns(doc) for doc in changed]
+        written = []
+        failed = 0
+        try:
+            with db.begin_nested():
+                written = db.execute(stmt, rows).all()
+        except Exception as e:
+            logger.warning(f"Bulk upsert of {len(rows)} products failed, retrying row by row: {e}")
+            for row in rows:
+                try:
+                    with db.begin_nested():
+                        written.extend(db.execute(stmt, [row]).all())
+                except Exception as e:
+                    failed += 1
+                    result["errors"].append(_error(row["name"], "upsert", e))
+        db.commit()
+
+        for _, asin in written:
+            if asin in existing:
+                result["updated"] += 1
+            else:
+                result["inserted"] += 1
+        # Rows filtered out by the ON CONFLICT ... WHERE clause
+        result["unchanged"] += len(changed) - len(written) - failed
+        return [(product_id, by_asin[asin]) for product_id, asin in written]
+
+    @staticmethod
+    def _insert_chunk(db, docs: list[dict], errors: list[dict]) -> list[tuple[int, dict]]:
+        """
+        Insert a chunk with a single statement. If the statement fails, fall back to
+        inserting row by row inside savepoints to isolate the offending products.
+        Returns (id, doc) pairs for every row that made it into the table.
+        """
+        if not docs:
+            return []
+
+        stmt = insert(Product).returning(Product.id, sort_by_parameter_order=True)
+        rows = [_columns(doc) for doc in docs]
+
+        try:
+            with db.begin_nested():
+                ids = db.scalars(stmt, rows).all()
+            db.commit()
+            return list(zip(ids, docs))
+        except Exception as e:
+            logger.warning(f"Bulk insert of {len(rows)} products failed, retrying row by row: {e}")
+
+        loaded = []
+        for row, doc in zip(rows, docs):
+            try:
+                with db.begin_nested():
+                    product_id = db.scalars(stmt, [row]).one()
+                loaded.append((product_id, doc))
+            except Exception as e:
+                errors.append(_error(doc["name"], "insert", e))
+        db.commit()
+        return loaded
+
+    @staticmethod
+    def _index_chunk(es, index: str, loaded: list[tuple[int, dict]], errors: list[dict]) -> int:
+        """
+        Send a chunk to the Elasticsearch _bulk API and record per-item failures.
+        Returns the number of documents indexed.
+        """
+        names = {str(product_id): doc["name"] for product_id, doc in loaded}
+        actions = (
+            {"_op_type": "index", "_index": index, "_id": product_id, "_source": {**doc, "id": product_id}}
+            for product_id, doc in loaded
+        )
+
+        indexed = 0
+        for ok, item in streaming_bulk(
+            es,
+            actions,
+            chunk_size=len(loaded),
+            raise_on_error=False,
+            raise_on_exception=False,
+        ):
+            if ok:
+                indexed += 1
+                continue
+            info = item.get("index", {})
+            errors.append(_error(names.get(str(info.get("_id"))), "index", info.get("error")))
+        return indexed
+
+
+def _columns(doc: dict) -> dict:
+    return {k: v for k, v in doc.items() if k in _PRODUCT_COLUMNS}
+
+
+def _error(title, stage: str, error) -> dict:
+    return {"title": title, "stage": stage, "error": str(error)}
@@ -0,0 +1,162 @@
+# services/ingestion/app/etl/rate_limiter.py
+"""
+Cluster-wide, adaptive request rate limit for scraping.
+
+Every (host, proxy) pair has one token bucket in Redis, shared by all scraper workers.
+WebScraper reserves a token before each request (one Lua call that refills the bucket,
+takes a token and returns how long to wait for it) and reports each response back:
+
+- blocked (429, 503 or a captcha page): the rate is multiplied by
+  scraper_rate_decrease, at most once per scraper_rate_backoff_interval, so a burst of
+  blocked responses counts as a single signal;
+- clean: the rate grows by scraper_rate_increase / rate, i.e. by about
+  scraper_rate_increase requests/s for every second of clean traffic.
+
+This additive-increase / multiplicative-decrease loop keeps the cluster's request rate
+just under the rate at which the site starts blocking, however many workers run.
+If Redis is unreachable, requests go out unthrottled (within FetchLimiter's local
+concurrency limits) and Redis is retried after a pause.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+import weakref
+from urllib.parse import urlsplit
+import redis.asyncio
+from redis.exceptions import RedisError
+from shared.config.cache import REDIS_HOST, REDIS_PORT
+from shared.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+RATE_KEY = "scrape:rate:{host}:{proxy}"
+
+
+def _proxy_label(proxy: str) -> str:
+    """
+    The proxy's host:port, as used in RATE_KEY; credentials never end up in Redis.
+    Proxy URLs with credentials get a short hash of the whole URL appended, since
+    providers often pick the exit IP from the username.
+    """
+    netloc = urlsplit(proxy).netloc
+    if not netloc:
+        return proxy  # "direct"
+    _, at, hostport = netloc.rpartition("@")
+    if not at:
+        return hostport
+    return f"{hostport}#{hashlib.sha256(proxy.encode('utf-8')).hexdigest()[:12]}"
+
+# Both scripts first refill the bucket at the current rate up to now (Redis clock)
+_REFILL = """
+local now_t = redis.call('TIME')
+local now = tonumber(now_t[1]) + tonumber(now_t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'rate', 'tokens', 'ts', 'cut_at')
+local initial, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+local rate = tonumber(state[1]) or initial
+local tokens = tonumber(state[2]) or burst
+local ts = tonumber(state[3]) or now
+local cut_at = tonumber(state[4]) or 0
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+"""
+
+# ARGV: initial rate, burst, key ttl. Returns the seconds to wait (as a string).
+_ACQUIRE = _REFILL + """
+tokens = tokens - 1
+redis.call('HSET', KEYS[1], 'rate', rate, 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]))
+if tokens >= 0 then
+    return '0'
+end
+return tostring(-tokens / rate)
+"""
+
+# ARGV: initial rate, burst, key ttl, blocked (0/1), min rate, max rate, increase,
+# decrease factor, backoff interval. Returns the new rate (as a string).
+_REPORT = _REFILL + """
+if ARGV[4] == '1' then
+    if now - cut_at >= tonumber(ARGV[9]) then
+        rate = math.max(tonumber(ARGV[5]), rate * tonumber(ARGV[8]))
+        cut_at = now
+        -- Drop the saved-up burst too, so the slowdown is immediate
+        tokens = math.min(tokens, 0)
+    end
+else
+    rate = math.min(tonumber(ARGV[6]), rate + tonumber(ARGV[7]) / rate)
+end
+redis.call('HSET', KEYS[1], 'rate', rate, 'tokens', tokens, 'ts', now, 'cut_at', cut_at)
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]))
+return tostring(rate)
+"""
+
+_KEY_TTL = 60 * 60           # idle buckets disappear after an hour
+_REDIS_RETRY_AFTER = 30.0    # seconds without Redis after an error
+
+
+class RateLimiter:
+    """
+    Client for the shared buckets. Holds an asyncio Redis client, so an instance must
+    only be used on the event loop that created it (see get_rate_limiter()).
+    """
+
+    def __init__(self, redis_client=None, proxy: str | None = None):
+        self.redis = redis_client or redis.asyncio.Redis(host=REDIS_HOST, port=REDIS_PORT)
+        self.proxy = _proxy_label(proxy if proxy is not None else (settings.scraper_proxy or "direct"))
+        self._acquire = self.redis.register_script(_ACQUIRE)
+        self._report = self.redis.register_script(_REPORT)
+        self._down_until = 0.0
+
+    def key(self, url: str) -> str:
+        return RATE_KEY.format(host=urlsplit(url).netloc, proxy=self.proxy)
+
+    async def acquire(self, url: str) -> float:
+        """Wait for a token for 'url'. Returns the seconds waited."""
+        wait = await self._call(self._acquire, url)
+        wait = float(wait) if wait is not None else 0.0
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    async def report(self, url: str, blocked: bool) -> float | None:
+        """Feed a response back into the rate for 'url'. Returns the new rate, if known."""
+        rate = await self._call(
+            self._report, url,
+            int(blocked),
+            settings.scraper_rate_min,
+            settings.scraper_rate_max,
+            settings.scraper_rate_increase,
+            settings.scraper_rate_decrease,
+            settings.scraper_rate_backoff_interval,
+        )
+        return float(rate) if rate is not None else None
+
+    async def _call(self, script, url: str, *args):
+        if time.monotonic() < self._down_until:
+            return None
+        try:
+            return await script(
+                keys=[self.key(url)],
+                args=[settings.scraper_rate_initial, settings.scraper_rate_burst, _KEY_TTL, *args],
+            )
+        except RedisError as e:
+            self._down_until = time.monotonic() + _REDIS_RETRY_AFTER
+            logger.warning(f"Scrape rate limiter unavailable, not throttling for {_REDIS_RETRY_AFTER:.0f}s: {e}")
+            return None
+
+
+_limiters = weakref.WeakKeyDictionary()
+
+
+def get_rate_limiter() -> RateLimiter | None:
+    """
+    The rate limiter for the running event loop, or None when disabled
+    (SCRAPER_RATE_LIMIT_ENABLED=false).
+    """
+    if not settings.scraper_rate_limit_enabled:
+        return None
+    loop = asyncio.get_running_loop()
+    limiter = _limiters.get(loop)
+    if limiter is None:
+        limiter = _limiters[loop] = RateLimiter()
+    return limiter
@@ -0,0 +1,242 @@
+# services/ingestion/app/etl/response_cache.py
+"""
+Optional on-disk cache for scraped pages.
+
+Entries are keyed by normalized URL and stored in a single SQLite file with
+zlib-compressed bodies, the origin's validators (ETag / Last-Modified) and the
+result of parsing the page. Within the TTL an entry is served without touching
+the network; after that it is revalidated with a conditional request, and a 304
+lets the scraper reuse the stored parse instead of downloading and parsing again.
+The file is kept under a byte budget by evicting least-recently-used entries. Reads
+record their access time in memory and write it in batches, so a cache hit is a single
+SELECT; pending access times are flushed before any eviction.
+
+Enabled with SCRAPER_CACHE_ENABLED=true; see shared settings for path, size and TTL.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from shared.config.settings import settings
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+# Pending access times are written once this many accumulate, or this many seconds pass
+_TOUCH_BATCH = 256
+_TOUCH_INTERVAL = 5.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    parsed TEXT,
+    validated_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+
+-- Running total of responses.size, kept by triggers in the writing transaction, so the
+-- byte budget is checked without scanning the table (and stays right across processes)
+CREATE TABLE IF NOT EXISTS stats (id INTEGER PRIMARY KEY CHECK (id = 0), total_bytes INTEGER NOT NULL);
+INSERT OR IGNORE INTO stats (id, total_bytes)
+    SELECT 0, COALESCE(SUM(size), 0) FROM responses WHERE NOT EXISTS (SELECT 1 FROM stats);
+CREATE TRIGGER IF NOT EXISTS responses_size_insert AFTER INSERT ON responses BEGIN
+    UPDATE stats SET total_bytes = total_bytes + NEW.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS responses_size_update AFTER UPDATE OF size ON responses BEGIN
+    UPDATE stats SET total_bytes = total_bytes + NEW.size - OLD.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS responses_size_delete AFTER DELETE ON responses BEGIN
+    UPDATE stats SET total_bytes = total_bytes - OLD.size WHERE id = 0;
+END;
+"""
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form used as the cache key: lower-case scheme and host, default port
+    and fragment dropped, query parameters sorted.
+    """
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+class CachedResponse:
+    def __init__(self, body: str, etag: str | None, last_modified: str | None, parsed, validated_at: float):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.parsed = parsed
+        self.validated_at = validated_at
+
+    def is_fresh(self, ttl: float) -> bool:
+        return time.time() - self.validated_at < ttl
+
+    def validators(self) -> dict:
+        """Headers for a conditional request, empty if the origin gave us none."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    def __init__(self, path: str, max_bytes: int, ttl: float):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._touches = {}  # key -> accessed_at not yet written
+        self._touched_at = time.monotonic()
+
+    def get(self, url: str) -> CachedResponse | None:
+        key = normalize_url(url)
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT body, etag, last_modified, parsed, validated_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._touches[key] = time.time()
+            if len(self._touches) >= _TOUCH_BATCH or time.monotonic() - self._touched_at >= _TOUCH_INTERVAL:
+                self._flush_touches(conn)
+                conn.commit()
+
+        body, etag, last_modified, parsed, validated_at = row
+        return CachedResponse(
+            body=zlib.decompress(body).decode("utf-8"),
+            etag=etag,
+            last_modified=last_modified,
+            parsed=json.loads(parsed) if parsed is not None else None,
+            validated_at=validated_at,
+        )
+
+    def put(self, url: str, body: str, etag: str | None = None, last_modified: str | None = None, parsed=None):
+        compressed = zlib.compress(body.encode("utf-8"), 6)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            # An upsert rather than INSERT OR REPLACE: REPLACE's implicit delete skips the
+            # delete trigger, which would leave the replaced entry's size in stats
+            conn.execute(
+                "INSERT INTO responses "
+                "(key, body, size, etag, last_modified, parsed, validated_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET body = excluded.body, size = excluded.size, "
+                "etag = excluded.etag, last_modified = excluded.last_modified, parsed = excluded.parsed, "
+                "validated_at = excluded.validated_at, accessed_at = excluded.accessed_at",
+                (
+                    normalize_url(url),
+                    compressed,
+                    len(compressed),
+                    etag,
+                    last_modified,
+                    json.dumps(parsed) if parsed is not None else None,
+                    now,
+                    now,
+                ),
+            )
+            self._touches.pop(normalize_url(url), None)
+            self._flush_touches(conn)
+            self._evict(conn)
+            conn.commit()
+
+    def mark_validated(self, url: str):
+        """Record a successful revalidation (HTTP 304) so the entry is fresh again."""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "UPDATE responses SET validated_at = ?, accessed_at = ? WHERE key = ?",
+                (now, now, normalize_url(url)),
+            )
+            self._touches.pop(normalize_url(url), None)
+            conn.commit()
+
+    def set_parsed(self, url: str, parsed):
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "UPDATE responses SET parsed = ? WHERE key = ?",
+                (json.dumps(parsed), normalize_url(url)),
+            )
+            conn.commit()
+
+    def flush(self):
+        """Write pending access times now (e.g. before the process exits)."""
+        with self._lock:
+            conn = self._connection()
+            self._flush_touches(conn)
+            conn.commit()
+
+    def _flush_touches(self, conn: sqlite3.Connection):
+        if self._touches:
+            conn.executemany(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._touches.items()],
+            )
+            self._touches = {}
+        self._touched_at = time.monotonic()
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT total_bytes FROM stats WHERE id = 0").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least-recently-used entries until we are back under budget
+        excess = total - self.max_bytes
+        freed = 0
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections must not cross a fork
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn, self._pid = conn, os.getpid()
+            self._touches = {}  # the parent's, if we were forked
+        return self._conn
+
+
+_cache = None
+
+
+def get_cache() -> ResponseCache | None:
+    """
+    Process-wide cache configured from settings, or None when caching is disabled.
+    """
+    global _cache
+    if not settings.scraper_cache_enabled:
+        return None
+    if _cache is None:
+        _cache = ResponseCache(
+            path=settings.scraper_cache_path,
+            max_bytes=settings.scraper_cache_max_bytes,
+            ttl=settings.scraper_cache_ttl,
+        )
+    return _cache
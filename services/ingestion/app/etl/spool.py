@@ -0,0 +1,149 @@
+# services/ingestion/app/etl/spool.py
+"""
+Claim-check storage for streamed batch uploads.
+
+The ingest endpoint writes an upload as NDJSON chunks of at most ingest_chunk_size
+records and queues one task per chunk carrying only a small reference
+({"backend", "batch_id", "index"}); the worker reads the chunk back and parses it
+line by line. Neither the broker nor any single process ever holds the whole feed.
+
+Backends (INGEST_SPOOL_BACKEND):
+- "redis": one key per chunk, expiring after ingest_spool_ttl; works across machines
+- "local": one file per chunk under ingest_spool_path; API and workers must share
+  that directory
+"""
+
+import os
+import shutil
+import uuid
+from typing import Iterator
+import orjson
+import redis
+from shared.config.cache import REDIS_HOST, REDIS_PORT
+from shared.config.settings import settings
+
+CHUNK_KEY = "ingest:chunk:{batch_id}:{index}"
+
+
+class ChunkSpool:
+    def __init__(self, backend: str | None = None, path: str | None = None, redis_client=None):
+        self.backend = backend or settings.ingest_spool_backend
+        if self.backend not in ("redis", "local"):
+            raise ValueError(f"Unknown spool backend '{self.backend}', expected 'redis' or 'local'")
+        self.path = path or settings.ingest_spool_path
+        self._redis = redis_client
+
+    @property
+    def redis(self):
+        # Binary-safe: chunks are raw NDJSON bytes
+        if self._redis is None:
+            self._redis = redis.Redis(host=REDIS_HOST, port=REDIS_PORT)
+        return self._redis
+
+    @staticmethod
+    def new_batch_id() -> str:
+        return uuid.uuid4().hex
+
+    def put(self, batch_id: str, index: int, ndjson: bytes) -> dict:
+        """Store one chunk (newline-separated JSON records); returns its reference."""
+        if self.backend == "redis":
+            self.redis.set(CHUNK_KEY.format(batch_id=batch_id, index=index), ndjson, ex=settings.ingest_spool_ttl)
+        else:
+            directory = os.path.join(self.path, batch_id)
+            os.makedirs(directory, exist_ok=True)
+            tmp = os.path.join(directory, f"{index}.ndjson.tmp")
+            with open(tmp, "wb") as f:
+                f.write(ndjson)
+            os.replace(tmp, os.path.join(directory, f"{index}.ndjson"))
+        return {"backend": self.backend, "batch_id": batch_id, "index": index}
+
+    def records(self, ref: dict, errors: list | None = None) -> Iterator[dict]:
+        """
+        Parse the chunk behind 'ref' one record at a time. Lines that aren't a JSON
+        object are skipped and appended to 'errors' as (line number, message).
+        Raises KeyError if the chunk is gone (expired or already consumed).
+        """
+        for number, line in enumerate(self._lines(ref), start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = orjson.loads(line)
+            except orjson.JSONDecodeError as e:
+                record, message = None, str(e)
+            else:
+                message = None if isinstance(record, dict) else "not a JSON object"
+            if message is None:
+                yield record
+            elif errors is not None:
+                errors.append((number, message))
+
+    def delete(self, ref: dict):
+        if ref["backend"] == "redis":
+            self.redis.delete(CHUNK_KEY.format(**ref))
+            return
+        try:
+            os.remove(self._file(ref))
+        except FileNotFoundError:
+            pass
+        # Last chunk of the batch: drop its directory
+        directory = os.path.dirname(self._file(ref))
+        if os.path.isdir(directory) and not os.listdir(directory):
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def _lines(self, ref: dict) -> Iterator[bytes]:
+        if ref["backend"] == "redis":
+            payload = self.redis.get(CHUNK_KEY.format(**ref))
+            if payload is None:
+                raise KeyError(f"Chunk {ref['index']} of batch {ref['batch_id']} not found")
+            # Chunks are bounded by ingest_chunk_size, so one GET is fine
+            yield from payload.splitlines()
+            return
+        try:
+            f = open(self._file(ref), "rb")
+        except FileNotFoundError:
+            raise KeyError(f"Chunk {ref['index']} of batch {ref['batch_id']} not found")
+        with f:
+            yield from f
+
+    def _file(self, ref: dict) -> str:
+        return os.path.join(self.path, ref["batch_id"], f"{ref['index']}.ndjson")
+
+
+class NDJSONChunker:
+    """
+    Incrementally split a byte stream into NDJSON chunks of at most 'chunk_size'
+    records. feed() returns the chunks it completed; close() returns the remainder.
+    """
+
+    def __init__(self, chunk_size: int | None = None, max_line_bytes: int | None = None):
+        self.chunk_size = chunk_size or settings.ingest_chunk_size
+        self.max_line_bytes = max_line_bytes or settings.ingest_max_line_bytes
+        self.records = 0
+        self._partial = b""
+        self._lines = []
+
+    def feed(self, data: bytes) -> list[bytes]:
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()
+        if len(self._partial) > self.max_line_bytes or any(len(line) > self.max_line_bytes for line in lines):
+            raise ValueError(f"Line longer than {self.max_line_bytes} bytes")
+        chunks = []
+        for line in lines:
+            if line.strip():
+                self._lines.append(line)
+                self.records += 1
+                if len(self._lines) >= self.chunk_size:
+                    chunks.append(self._flush())
+        return chunks
+
+    def close(self) -> list[bytes]:
+        chunks = self.feed(b"\n") if self._partial.strip() else []
+        if self._lines:
+            chunks.append(self._flush())
+        return chunks
+
+    def _flush(self) -> bytes:
+        chunk = b"\n".join(self._lines) + b"\n"
+        self._lines = []
+        return chunk
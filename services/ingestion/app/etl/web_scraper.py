@@ -1,49 +1,131 @@
 # services/ingestion/app/etl/web_scraper.py
 
-import requests
-from bs4 import BeautifulSoup
-import urllib.parse
+import asyncio
+import re
+import httpx
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+from shared.config.settings import settings
+from shared.utils.metrics import stage
+from . import http_client
+from .extractors import get_extractor
+from .rate_limiter import get_rate_limiter
+from .response_cache import get_cache
+
+AMAZON_BASE_URL = settings.scraper_amazon_base_url.rstrip("/")
+AMAZON_SEARCH_URL = f"{AMAZON_BASE_URL}/s"
+AMAZON_PRODUCT_URL = AMAZON_BASE_URL + "/dp/{asin}"
+_ASIN_IN_URL = re.compile(r"/(?:dp|gp/product)/([A-Z0-9]{10})(?:[/?]|$)")
+_BLOCKED_STATUS = frozenset({429, 503})
+_CAPTCHA_MARKERS = ("/errors/validateCaptcha", "Type the characters you see in this image")
+
+
+class ScrapeBlocked(Exception):
+    """The site answered with a block page (captcha, 429 or 503) instead of content."""
+
+
+def is_blocked(response: httpx.Response) -> bool:
+    if response.status_code in _BLOCKED_STATUS:
+        return True
+    return response.status_code == 200 and any(marker in response.text for marker in _CAPTCHA_MARKERS)
+
+
+class FetchLimiter:
+    """
+    Bounds the number of requests in flight, both overall and per host.
+    Must be created and used inside a single event loop.
+    """
+
+    def __init__(self, concurrency: int | None = None, per_host: int | None = None):
+        self._total = asyncio.Semaphore(concurrency or settings.scraper_concurrency)
+        self._per_host = per_host or settings.scraper_per_host_concurrency
+        self._hosts: dict[str, asyncio.Semaphore] = {}
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        host = urlsplit(url).netloc
+        host_sem = self._hosts.setdefault(host, asyncio.Semaphore(self._per_host))
+        # Wait for the host slot first so a busy host doesn't hold global slots
+        async with host_sem:
+            async with self._total:
+                yield
+
 
 class WebScraper:
+    """
+    Amazon scraper. The *_async methods fetch concurrently within the limits in
+    settings (scraper_concurrency, scraper_per_host_concurrency), so a batch takes
+    about as long as its slowest requests, and every request also waits for the
+    cluster-wide rate limit (rate_limiter.py). The synchronous methods are thin
+    wrappers that run them on the pooled client in http_client.
+    """
+
+    # ---------------------
+    # Async API
+    # ---------------------
     @staticmethod
-    def scrape_amazon_search(query: str, pages: int = 1) -> list[str]:
+    async def scrape_amazon_search_async(query: str, pages: int = 1, client=None, limiter=None) -> list[str]:
         """
-        1) Perform a search on Amazon for 'query' (e.g. "best wireless headphones").
-        2) Parse out ASINs from up to 'pages' pages of results.
+        Fetch up to 'pages' pages of Amazon search results for 'query' concurrently.
         Returns a list of unique ASINs.
         """
-        found_asins = set()
-        base_url = "https://www.amazon.com/s"
+        async with _session(client, limiter) as (client, limiter):
+            async def fetch_page(page: int) -> set[str]:
+                try:
+                    url = str(httpx.URL(AMAZON_SEARCH_URL, params={"k": query, "page": page}))
+                    asins = await WebScraper._fetch(client, limiter, url, get_extractor().parse_search_asins)
+                    return set(asins)
+                except Exception as e:
+                    print(f"Error scraping Amazon search (page={page}, query='{query}'): {e}")
+                    return set()
 
-        headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/91.0.4472.124 Safari/537.36"
-            ),
-            "Accept-Language": "en-US,en;q=0.5",
-        }
+            results = await asyncio.gather(*(fetch_page(page) for page in range(1, pages + 1)))
 
-        query_encoded = urllib.parse.quote_plus(query)
+        return list(set().union(*results))
 
-        for page in range(1, pages + 1):
-            params = {"k": query_encoded, "page": page}
+    @staticmethod
+    async def scrape_amazon_product_async(url: str, client=None, limiter=None) -> list[dict]:
+        """
+        Scrape product data from an Amazon product page by direct URL.
+        Returns a list with a single dict, or empty on error.
+        The dict carries the page's ASIN when the URL contains one.
+        """
+        async with _session(client, limiter) as (client, limiter):
             try:
-                response = requests.get(base_url, headers=headers, params=params, timeout=10)
-                response.raise_for_status()
-                soup = BeautifulSoup(response.text, "html.parser")
-
-                # Typical: <div data-asin="XYZ" data-component-type="s-search-result">
-                search_divs = soup.find_all("div", attrs={"data-component-type": "s-search-result"})
-                for div in search_divs:
-                    asin = div.get("data-asin")
-                    if asin and asin.strip():
-                        found_asins.add(asin.strip())
-
+                product = await WebScraper._fetch(client, limiter, url, get_extractor().parse_product)
             except Exception as e:
-                print(f"Error scraping Amazon search (page={page}, query='{query}'): {e}")
+                print(f"Error scraping product data from {url}: {e}")
+                return []
+
+        match = _ASIN_IN_URL.search(url)
+        if match:
+            product["asin"] = match.group(1)
+        return [product]
 
-        return list(found_asins)
+    @staticmethod
+    async def scrape_amazon_by_asins_async(asins: list[str], client=None, limiter=None) -> list[dict]:
+        """
+        Scrape the product pages for many ASINs concurrently.
+        Returns the product dicts that were scraped successfully.
+        """
+        async with _session(client, limiter) as (client, limiter):
+            results = await asyncio.gather(*(
+                WebScraper.scrape_amazon_product_async(AMAZON_PRODUCT_URL.format(asin=asin), client, limiter)
+                for asin in asins
+            ))
+        return [product for result in results for product in result]
+
+    # ---------------------
+    # Synchronous wrappers
+    # ---------------------
+    @staticmethod
+    def scrape_amazon_search(query: str, pages: int = 1) -> list[str]:
+        """
+        1) Perform a search on Amazon for 'query' (e.g. "best wireless headphones").
+        2) Parse out ASINs from up to 'pages' pages of results.
+        Returns a list of unique ASINs.
+        """
+        return http_client.run(WebScraper.scrape_amazon_search_async(query, pages))
 
     @staticmethod
     def scrape_amazon_product(url: str) -> list[dict]:
@@ -54,77 +136,7 @@ class WebScraper:
         Example usage:
             product_data = WebScraper.scrape_amazon_product("https://www.amazon.com/dp/B08JWMPVDM")
         """
-        try:
-            headers = {
-                "User-Agent": (
-                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) "
-                    "Chrome/91.0.4472.124 Safari/537.36"
-                ),
-                "Accept-Language": "en-US,en;q=0.5",
-            }
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.text, "html.parser")
-
-            # ---------------------
-            # Extract Title
-            # ---------------------
-            title_elem = soup.select_one("#productTitle")
-            title = title_elem.get_text(strip=True) if title_elem else "Not Found"
-
-            # ---------------------
-            # Extract Price
-            # ---------------------
-            possible_price_selectors = [
-                "#priceblock_ourprice",
-                "#priceblock_dealprice",
-                "span.a-price span.a-offscreen",
-            ]
-            price = None
-            for sel in possible_price_selectors:
-                price_elem = soup.select_one(sel)
-                if price_elem and price_elem.get_text(strip=True):
-                    price = price_elem.get_text(strip=True)
-                    break
-            if not price:
-                price = "Not Available"
-
-            # ---------------------
-            # Extract Category
-            # ---------------------
-            category = "Not Available"
-            breadcrumb_elem = soup.select("#wayfinding-breadcrumbs_feature_div ul li span a")
-            if breadcrumb_elem:
-                categories = [b.get_text(strip=True) for b in breadcrumb_elem if b.get_text(strip=True)]
-                if categories:
-                    category = " > ".join(categories)
-
-            # ---------------------
-            # Extract Rating
-            # ---------------------
-            rating_elem = soup.select_one(".a-icon-star span.a-icon-alt, #averageCustomerReviews .a-icon-alt")
-            rating = rating_elem.get_text(strip=True).split()[0] if rating_elem else "Not Available"
-
-            # ---------------------
-            # Extract Total Reviews
-            # ---------------------
-            reviews_elem = soup.select_one("#acrCustomerReviewText, #acrCustomerReviewLink span")
-            total_reviews = reviews_elem.get_text(strip=True) if reviews_elem else "Not Available"
-
-            product_dict = {
-                "title": title,
-                "price": price,
-                "category": category,
-                "rating": rating,
-                "total_reviews": total_reviews,
-            }
-            return [product_dict]
-
-        except Exception as e:
-            print(f"Error scraping product data from {url}: {e}")
-            return []
+        return http_client.run(WebScraper.scrape_amazon_product_async(url))
 
     @staticmethod
     def scrape_amazon_by_asin(asin: str) -> list[dict]:
@@ -132,5 +144,82 @@ class WebScraper:
         Helper function to build an Amazon product URL from an ASIN,
         then call scrape_amazon_product().
         """
-        product_url = f"https://www.amazon.com/dp/{asin}"
+        product_url = AMAZON_PRODUCT_URL.format(asin=asin)
         return WebScraper.scrape_amazon_product(product_url)
+
+    @staticmethod
+    def scrape_amazon_by_asins(asins: list[str]) -> list[dict]:
+        """
+        Concurrent version of scrape_amazon_by_asin() for a list of ASINs.
+        """
+        return http_client.run(WebScraper.scrape_amazon_by_asins_async(asins))
+
+    # ---------------------
+    # Internals
+    # ---------------------
+    @staticmethod
+    async def _fetch(client: httpx.AsyncClient, limiter: FetchLimiter, url: str, parse):
+        """
+        GET 'url' and return parse(html). With the response cache enabled, a fresh
+        entry is served without a request, and a stale one is revalidated with
+        If-None-Match / If-Modified-Since so an unchanged page (304) is not parsed again.
+        Cache reads and writes are SQLite calls, so they run in a worker thread.
+        """
+        cache = get_cache()
+        cached = await asyncio.to_thread(cache.get, url) if cache else None
+        if cached is not None and cached.parsed is not None and cached.is_fresh(cache.ttl):
+            return cached.parsed
+
+        headers = cached.validators() if cached is not None else {}
+        rate_limiter = get_rate_limiter()
+        async with limiter.slot(url):
+            if rate_limiter is not None:
+                with stage("rate_limit"):
+                    await rate_limiter.acquire(url)
+            with stage("fetch"):
+                response = await client.get(url, headers=headers)
+
+        blocked = is_blocked(response)
+        if rate_limiter is not None:
+            await rate_limiter.report(url, blocked)
+        if blocked:
+            raise ScrapeBlocked(f"Blocked by {urlsplit(url).netloc} (HTTP {response.status_code})")
+
+        if response.status_code == 304 and cached is not None:
+            await asyncio.to_thread(cache.mark_validated, url)
+            if cached.parsed is not None:
+                return cached.parsed
+            with stage("parse"):
+                parsed = parse(cached.body)
+            await asyncio.to_thread(cache.set_parsed, url, parsed)
+            return parsed
+
+        response.raise_for_status()
+        with stage("parse"):
+            parsed = parse(response.text)
+        if cache is not None:
+            await asyncio.to_thread(
+                cache.put,
+                url,
+                response.text,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+                parsed=parsed,
+            )
+        return parsed
+
+
+@asynccontextmanager
+async def _session(client: httpx.AsyncClient | None, limiter: FetchLimiter | None):
+    """
+    Reuse the caller's client/limiter when given. Otherwise use the process-wide pooled
+    client, or a short-lived one when running outside the shared HTTP loop.
+    """
+    limiter = limiter or FetchLimiter()
+    client = client or http_client.get_client()
+    if client is not None:
+        yield client, limiter
+        return
+
+    async with http_client.new_client() as client:
+        yield client, limiter
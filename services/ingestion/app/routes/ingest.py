@@ -1,256 +1,135 @@
-# services/ingestion/app/scheduler/tasks.py
-
-from celery import Celery
-from celery.utils.log import get_task_logger
-from services.ingestion.app.etl.web_scraper import WebScraper
-from services.ingestion.app.etl.transformer import Transformer
-from shared.config.db import engine
-from sqlalchemy.orm import sessionmaker
-from shared.models.product import Product
-from shared.config.elasticsearch import es_client
-from typing import List
-import logging
-
-# Initialize Celery (ensure this matches your celery.py configuration)
-celery_app = Celery(
-    "ingestion",
-    broker="redis://localhost:6379/0",
-    backend="redis://localhost:6379/1",
+# services/ingestion/app/routes/ingest.py
+import zlib
+from celery.result import AsyncResult
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from ..etl.spool import ChunkSpool, NDJSONChunker
+from ..scheduler.celery_app import celery_app
+from ..scheduler.tasks import (
+    ingest_amazon_search,
+    ingest_api_feed,
+    ingest_batch_chunk_task,
+    ingest_batch_products_task,
+    ingest_single_amazon_product,
 )
-
-# Configure Celery (ensure consistency with celery.py)
-celery_app.conf.update(
-    task_serializer="json",
-    accept_content=["json"],
-    result_serializer="json",
-    timezone="UTC",
-    enable_utc=True,
-    worker_concurrency=5,  # Adjust based on your proxy pool and requirements
+from ..schemas.ingest import (
+    BatchIngestRequest,
+    FeedIngestRequest,
+    ProductIngestRequest,
+    SearchIngestRequest,
+    StreamIngestAccepted,
+    TaskQueued,
+    TaskStatus,
 )
 
-logger = get_task_logger(__name__)
+router = APIRouter()
 
-# Set up SQLAlchemy session
-SessionLocal = sessionmaker(bind=engine)
+_GZIP_TYPES = {"application/gzip", "application/x-gzip"}
+# Upper bound on bytes decompressed per step, so a gzip bomb can't allocate at once
+_INFLATE_STEP = 1024 * 1024
 
-@celery_app.task(bind=True, max_retries=5, default_retry_delay=60)
-def ingest_amazon_search(self, query: str, pages: int = 1):
+@router.post("/amazon/search", response_model=TaskQueued, status_code=202)
+def ingest_search(request: SearchIngestRequest):
     """
-    Celery task to:
-    1. Scrape ASINs from Amazon search results.
-    2. Scrape detailed product data for each ASIN.
-    3. Transform the data.
-    4. Load into PostgreSQL and Elasticsearch.
+    Queue a search scrape: ASIN pages fan out to the scrape workers, then one bulk load.
     """
-    logger.info(f"Starting ingest_amazon_search task for query='{query}', pages={pages}")
-
-    # Step 1: Scrape ASINs
-    try:
-        asins = WebScraper.scrape_amazon_search(query=query, pages=pages)
-        if not asins:
-            logger.warning(f"No ASINs found for query='{query}'")
-            return {"status": "No ASINs found", "asins_scraped": 0}
-    except Exception as e:
-        logger.error(f"Error scraping ASINs for query='{query}': {e}")
-        self.retry(exc=e, countdown=60 * (2 ** self.request.retries))  # Exponential backoff
+    task = ingest_amazon_search.delay(request.query, request.pages)
+    return {"task_id": task.id}
 
-    # Step 2: Scrape product details
-    all_product_data = []
-    for asin in asins:
-        try:
-            product_data_list = WebScraper.scrape_amazon_by_asin(asin)
-            if product_data_list:
-                all_product_data.extend(product_data_list)
-        except Exception as e:
-            logger.error(f"Error scraping product for ASIN='{asin}': {e}")
-            continue  # Skip to next ASIN
+@router.post("/amazon/product", response_model=TaskQueued, status_code=202)
+def ingest_product(request: ProductIngestRequest):
+    task = ingest_single_amazon_product.delay(request.url)
+    return {"task_id": task.id}
 
-    if not all_product_data:
-        logger.warning("No product data scraped after ASIN scraping")
-        return {"status": "No product data scraped", "products_scraped": 0}
-
-    # Step 3: Transform data
-    try:
-        cleaned_products = Transformer.clean_product_data(all_product_data)
-        if not cleaned_products:
-            logger.warning("No valid product data after transformation")
-            return {"status": "No valid product data", "products_cleaned": 0}
-    except Exception as e:
-        logger.error(f"Error transforming product data: {e}")
-        self.retry(exc=e, countdown=60 * (2 ** self.request.retries))  # Exponential backoff
-
-    # Step 4: Load into PostgreSQL and Elasticsearch
-    try:
-        db = SessionLocal()
-        inserted_count = 0
-        for prod in cleaned_products:
-            try:
-                new_product = Product(
-                    name=prod["title"],
-                    description=f"Scraped from Amazon: rating={prod['rating']}",
-                    price=prod["price"],
-                    category=prod["category"],
-                    rating=prod["rating"],
-                    total_reviews=prod["total_reviews"],
-                )
-                db.add(new_product)
-                db.commit()
-                db.refresh(new_product)
-
-                # Index in Elasticsearch
-                doc_body = {
-                    "name": new_product.name,
-                    "description": new_product.description,
-                    "price": new_product.price,
-                    "category": new_product.category,
-                    "rating": new_product.rating,
-                    "total_reviews": new_product.total_reviews,
-                }
-                es_client.index(index="products", id=new_product.id, body=doc_body)
-                inserted_count += 1
-
-            except Exception as e:
-                db.rollback()
-                logger.error(f"Error inserting/indexing product '{prod['title']}': {e}")
-                continue  # Skip to next product
-
-        db.close()
-        logger.info(f"Successfully ingested {inserted_count} products for query='{query}'")
-        return {"status": "Success", "products_inserted": inserted_count}
-
-    except Exception as e:
-        logger.error(f"Error loading data into DB/Elasticsearch: {e}")
-        self.retry(exc=e, countdown=60 * (2 ** self.request.retries))  # Exponential backoff
-
-@celery_app.task(bind=True, max_retries=3, default_retry_delay=30)
-def ingest_single_amazon_product(self, url: str):
+@router.post("/batch", response_model=TaskQueued, status_code=202)
+def ingest_batch(request: BatchIngestRequest):
     """
-    Celery task to:
-    1. Scrape product data from an Amazon URL.
-    2. Transform the data.
-    3. Load into PostgreSQL and Elasticsearch.
+    Small batches only: the products travel inside the task message. Use
+    /batch/stream for feeds.
     """
-    logger.info(f"Starting ingest_single_amazon_product task for URL='{url}'")
-
-    # Step 1: Scrape product data
-    try:
-        raw_products = WebScraper.scrape_amazon_product(url)
-        if not raw_products:
-            logger.warning(f"Failed to scrape product data from URL='{url}'")
-            return {"status": "Failed to scrape product data", "url": url}
-    except Exception as e:
-        logger.error(f"Error scraping product data from URL='{url}': {e}")
-        self.retry(exc=e, countdown=30 * (2 ** self.request.retries))  # Exponential backoff
+    task = ingest_batch_products_task.delay(request.products)
+    return {"task_id": task.id}
 
-    # Step 2: Transform data
-    try:
-        cleaned_products = Transformer.clean_product_data(raw_products)
-        if not cleaned_products:
-            logger.warning(f"No valid product data after transformation for URL='{url}'")
-            return {"status": "No valid product data", "url": url}
-    except Exception as e:
-        logger.error(f"Error transforming product data for URL='{url}': {e}")
-        self.retry(exc=e, countdown=30 * (2 ** self.request.retries))  # Exponential backoff
-
-    # Step 3: Load into PostgreSQL and Elasticsearch
-    try:
-        db = SessionLocal()
-        inserted_count = 0
-        for prod in cleaned_products:
-            try:
-                new_product = Product(
-                    name=prod["title"],
-                    description=f"Scraped from Amazon: rating={prod['rating']}",
-                    price=prod["price"],
-                    category=prod["category"],
-                    rating=prod["rating"],
-                    total_reviews=prod["total_reviews"],
-                )
-                db.add(new_product)
-                db.commit()
-                db.refresh(new_product)
-
-                # Index in Elasticsearch
-                doc_body = {
-                    "name": new_product.name,
-                    "description": new_product.description,
-                    "price": new_product.price,
-                    "category": new_product.category,
-                    "rating": new_product.rating,
-                    "total_reviews": new_product.total_reviews,
-                }
-                es_client.index(index="products", id=new_product.id, body=doc_body)
-                inserted_count += 1
-
-            except Exception as e:
-                db.rollback()
-                logger.error(f"Error inserting/indexing product '{prod['title']}': {e}")
-                continue  # Skip to next product
-
-        db.close()
-        logger.info(f"Successfully ingested {inserted_count} products from URL='{url}'")
-        return {"status": "Success", "products_inserted": inserted_count, "url": url}
-
-    except Exception as e:
-        logger.error(f"Error loading data into DB/Elasticsearch for URL='{url}': {e}")
-        self.retry(exc=e, countdown=30 * (2 ** self.request.retries))  # Exponential backoff
-
-@celery_app.task(bind=True, max_retries=3, default_retry_delay=60)
-def ingest_batch_products_task(self, products_data: List[dict]):
+@router.post("/feed", response_model=TaskQueued, status_code=202)
+def ingest_feed(request: FeedIngestRequest):
     """
-    Celery task to ingest a batch of products.
+    Queue the ingestion of a paginated partner API feed. The task's result lists the
+    chunk load tasks it queued.
     """
-    logger.info(f"Starting ingest_batch_products_task for {len(products_data)} products")
+    task = ingest_api_feed.delay(url=request.url, pagination=request.pagination.model_dump(), params=request.params)
+    return {"task_id": task.id}
 
-    # Step 1: Transform data
-    try:
-        cleaned_products = Transformer.clean_product_data(products_data)
-        if not cleaned_products:
-            logger.warning("No valid product data after transformation")
-            return {"status": "No valid product data", "products_cleaned": 0}
-    except Exception as e:
-        logger.error(f"Error transforming batch product data: {e}")
-        self.retry(exc=e, countdown=60 * (2 ** self.request.retries))  # Exponential backoff
+@router.post("/batch/stream", response_model=StreamIngestAccepted, status_code=202)
+async def ingest_batch_stream(request: Request):
+    """
+    Ingest a product feed uploaded as NDJSON (one product per line), optionally
+    gzipped (Content-Encoding: gzip or Content-Type: application/gzip; concatenated
+    gzip members are read one after another, truncated bodies are rejected).
+
+    The body is read incrementally and spooled in chunks of ingest_chunk_size records.
+    Once the whole body has been read, each chunk is queued with a task that carries
+    only the chunk's reference; if the body turns out to be invalid (bad gzip, overlong
+    line) nothing is queued and the spooled chunks are deleted. Memory use is one chunk,
+    whatever the size of the feed.
+    """
+    gzipped = (
+        request.headers.get("content-encoding", "").lower() == "gzip"
+        or request.headers.get("content-type", "").split(";")[0].strip().lower() in _GZIP_TYPES
+    )
+    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else None
+    spool = ChunkSpool()
+    chunker = NDJSONChunker()
+    batch_id = spool.new_batch_id()
+    refs = []
+
+    async def enqueue(chunks: list[bytes]):
+        for chunk in chunks:
+            refs.append(await run_in_threadpool(spool.put, batch_id, len(refs), chunk))
+
+    def discard():
+        for ref in refs:
+            spool.delete(ref)
+
+    def queue() -> list[str]:
+        return [ingest_batch_chunk_task.delay(ref).id for ref in refs]
 
-    # Step 2: Load into PostgreSQL and Elasticsearch
     try:
-        db = SessionLocal()
-        inserted_count = 0
-        for prod in cleaned_products:
-            try:
-                new_product = Product(
-                    name=prod["title"],
-                    description=prod.get("description", f"Batch ingested product: rating={prod.get('rating', 0.0)}"),
-                    price=prod["price"],
-                    category=prod["category"],
-                    rating=prod["rating"],
-                    total_reviews=prod["total_reviews"],
-                )
-                db.add(new_product)
-                db.commit()
-                db.refresh(new_product)
-
-                # Index in Elasticsearch
-                doc_body = {
-                    "name": new_product.name,
-                    "description": new_product.description,
-                    "price": new_product.price,
-                    "category": new_product.category,
-                    "rating": new_product.rating,
-                    "total_reviews": new_product.total_reviews,
-                }
-                es_client.index(index="products", id=new_product.id, body=doc_body)
-                inserted_count += 1
-
-            except Exception as e:
-                db.rollback()
-                logger.error(f"Error inserting/indexing product '{prod['title']}': {e}")
-                continue  # Skip to next product
-
-        db.close()
-        logger.info(f"Successfully ingested {inserted_count} products in batch")
-        return {"status": "Success", "products_inserted": inserted_count}
-
-    except Exception as e:
-        logger.error(f"Error loading batch data into DB/Elasticsearch: {e}")
-        self.retry(exc=e, countdown=60 * (2 ** self.request.retries))  # Exponential backoff
+        async for data in request.stream():
+            if inflater is None:
+                await enqueue(chunker.feed(data))
+                continue
+            while data:
+                if inflater.eof:
+                    # Concatenated .gz files: another member follows (anything else fails its header check)
+                    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                await enqueue(chunker.feed(inflater.decompress(data, _INFLATE_STEP)))
+                data = inflater.unconsumed_tail or inflater.unused_data
+        if inflater is not None:
+            await enqueue(chunker.feed(inflater.flush()))
+            if not inflater.eof:
+                raise zlib.error("body ends before the end of the gzip stream")
+        await enqueue(chunker.close())
+    except zlib.error as e:
+        await run_in_threadpool(discard)
+        raise HTTPException(status_code=400, detail=f"Invalid gzip body after {chunker.records} records: {e}")
+    except ValueError as e:
+        await run_in_threadpool(discard)
+        raise HTTPException(status_code=413, detail=f"{e} (after {chunker.records} records)")
+    except BaseException:
+        # Client disconnect or cancellation: nothing was queued, so drop the chunks too
+        await run_in_threadpool(discard)
+        raise
+
+    task_ids = await run_in_threadpool(queue)
+    return {"batch_id": batch_id, "records": chunker.records, "chunks": len(task_ids), "task_ids": task_ids}
+
+@router.get("/tasks/{task_id}", response_model=TaskStatus)
+def task_status(task_id: str):
+    """
+    State of an ingestion task. For search and product ingests, the result is the
+    load summary once the whole pipeline has finished.
+    """
+    result = AsyncResult(task_id, app=celery_app)
+    if result.failed():
+        return {"task_id": task_id, "status": result.status, "result": str(result.result)}
+    return {"task_id": task_id, "status": result.status, "result": result.result if result.ready() else None}
@@ -1,12 +1,43 @@
-from celery import Celery
+from celery import Celery, Task
+from celery.schedules import crontab
+from kombu import Queue
+from shared.config.settings import settings
+from shared.utils import metrics
 
+
+class InstrumentedTask(Task):
+    """
+    Adds a "stages" breakdown (seconds and calls per ETL stage, see
+    shared/utils/metrics.py) to dict results, merged with any "stages" the task
+    already reports for upstream work (e.g. the scrape chunks of a chord).
+    """
+
+    def __call__(self, *args, **kwargs):
+        with metrics.collect_stages() as breakdown:
+            result = super().__call__(*args, **kwargs)
+        if isinstance(result, dict) and (breakdown or result.get("stages")):
+            result["stages"] = metrics.stage_summary(breakdown, result.get("stages"))
+        return result
+
+
+# The only Celery app: every service registers its tasks here
 celery_app = Celery(
     'thumbsy_tasks',
-    broker='redis://localhost:6379/0',
-    backend='redis://localhost:6379/0',
-    include=['services.ingestion.app.scheduler.tasks']
+    broker=settings.celery_broker_url,
+    backend=settings.celery_result_backend,
+    task_cls=InstrumentedTask,
+    include=[
+        'services.ingestion.app.scheduler.tasks',
+        'services.recommendation.app.tasks',
+    ]
 )
 
+# Queues, so I/O-bound scraping and DB-bound loading scale independently
+# (start workers with: python -m services.ingestion.app.scheduler.workers <queue>)
+SCRAPE_QUEUE = 'scrape'
+LOAD_QUEUE = 'load'
+DEFAULT_QUEUE = 'celery'
+
 # Optional configurations
 celery_app.conf.update(
     task_serializer='json',
@@ -14,7 +45,43 @@ celery_app.conf.update(
     result_serializer='json',
     timezone='UTC',
     enable_utc=True,
+    task_queues=[Queue(DEFAULT_QUEUE), Queue(SCRAPE_QUEUE), Queue(LOAD_QUEUE)],
+    task_default_queue=DEFAULT_QUEUE,
+    task_routes={
+        'services.ingestion.app.scheduler.tasks.ingest_amazon_search': {'queue': SCRAPE_QUEUE},
+        'services.ingestion.app.scheduler.tasks.scrape_asins': {'queue': SCRAPE_QUEUE},
+        'services.ingestion.app.scheduler.tasks.scrape_product': {'queue': SCRAPE_QUEUE},
+        'services.ingestion.app.scheduler.tasks.ingest_single_amazon_product': {'queue': SCRAPE_QUEUE},
+        'services.ingestion.app.scheduler.tasks.ingest_api_feed': {'queue': SCRAPE_QUEUE},
+        'services.ingestion.app.scheduler.tasks.load_products': {'queue': LOAD_QUEUE},
+        'services.ingestion.app.scheduler.tasks.ingest_batch_products_task': {'queue': LOAD_QUEUE},
+        'services.ingestion.app.scheduler.tasks.ingest_batch_chunk_task': {'queue': LOAD_QUEUE},
+    },
+    # A lost worker's tasks are redelivered instead of dropped
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    result_expires=24 * 60 * 60,
 )
 
+# Periodic jobs (run with: celery -A services.ingestion.app.scheduler.celery_app beat)
+celery_app.conf.beat_schedule = {
+    # Neighbour lists for products whose embedding changed
+    'refresh-similar-products': {
+        'task': 'services.recommendation.app.tasks.refresh_similar_products',
+        'schedule': settings.recommend_refresh_interval,
+    },
+    # Every list, so existing products pick up new neighbours
+    'rebuild-similar-products': {
+        'task': 'services.recommendation.app.tasks.refresh_similar_products',
+        'schedule': crontab(hour=3, minute=0),
+        'kwargs': {'full': True},
+    },
+    # Refresh/replicas back on the products index if a bulk load died holding them off
+    'restore-bulk-index-settings': {
+        'task': 'services.ingestion.app.scheduler.tasks.restore_bulk_index_settings',
+        'schedule': settings.es_bulk_lease_seconds,
+    },
+}
+
 # This is important - it exposes the Celery app instance
-celery = celery_app 
\ No newline at end of file
+celery = celery_app
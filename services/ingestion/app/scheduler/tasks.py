@@ -1,120 +1,276 @@
 # services/ingestion/app/scheduler/tasks.py
+"""
+Ingestion tasks, split by what they wait on.
 
-from celery import Celery
+    ingest_amazon_search (scrape queue)
+      -> scrape_asins x N  (scrape queue, one per ingest_asin_chunk_size ASINs)
+      -> load_products     (load queue, once every chunk is done)
+
+The search task replaces itself with that chord, so its result (as seen through
+AsyncResult) is the load summary, as it was when one task did everything. Scrape tasks
+fetch, parse and clean; the load task only writes to PostgreSQL and Elasticsearch, on
+workers sized for the database rather than for the network.
+
+Every dict result carries a "stages" breakdown (rate_limit, fetch, parse, transform,
+spool, db, index; see InstrumentedTask in celery_app.py), so a slow run shows where
+its time went. load_products adds up the breakdowns of its scrape chunks.
+"""
+
+import orjson
+from celery import chord
 from celery.utils.log import get_task_logger
+from services.ingestion.app.etl import http_client
+from services.ingestion.app.etl.api_fetcher import APIFetcher, PageFetchError, Pagination
 from services.ingestion.app.etl.web_scraper import WebScraper
 from services.ingestion.app.etl.transformer import Transformer
-from shared.config.db import engine
-from sqlalchemy.orm import sessionmaker
-from shared.models.product import Product
-from shared.config.elasticsearch import es_client
-
-# Initialize Celery (ensure this matches your celery.py configuration)
-celery_app = Celery(
-    "ingestion",
-    broker="redis://localhost:6379/0",
-    backend="redis://localhost:6379/1",
-)
-
-# Configure Celery (ensure consistency with celery.py)
-celery_app.conf.update(
-    task_serializer="json",
-    accept_content=["json"],
-    result_serializer="json",
-    timezone="UTC",
-    enable_utc=True,
-)
+from services.ingestion.app.etl.loader import BulkLoader, MAX_REPORTED_ERRORS
+from services.ingestion.app.etl.spool import ChunkSpool
+from shared.config.db import SessionLocal
+from shared.config.elasticsearch import restore_bulk_settings_if_idle
+from shared.config.settings import settings
+from shared.utils.metrics import stage, stage_summary
+from .celery_app import celery_app
 
 logger = get_task_logger(__name__)
 
-# Set up SQLAlchemy session
-SessionLocal = sessionmaker(bind=engine)
 
-@celery_app.task(bind=True, max_retries=3, default_retry_delay=60)
+def _backoff(task, base: int) -> int:
+    return base * (2 ** task.request.retries)
+
+
+# ---------------------
+# Entry points
+# ---------------------
+@celery_app.task(bind=True, max_retries=5, default_retry_delay=60)
 def ingest_amazon_search(self, query: str, pages: int = 1):
     """
     Celery task to:
     1. Scrape ASINs from Amazon search results.
-    2. Scrape detailed product data for each ASIN.
-    3. Transform the data.
-    4. Load into PostgreSQL and Elasticsearch.
+    2. Fan out scrape_asins over chunks of them (scrape queue).
+    3. Load everything they return with one load_products (load queue).
     """
     logger.info(f"Starting ingest_amazon_search task for query='{query}', pages={pages}")
 
-    # Step 1: Scrape ASINs
     try:
         asins = WebScraper.scrape_amazon_search(query=query, pages=pages)
-        if not asins:
-            logger.warning(f"No ASINs found for query='{query}'")
-            return {"status": "No ASINs found", "asins_scraped": 0}
     except Exception as e:
         logger.error(f"Error scraping ASINs for query='{query}': {e}")
-        self.retry(exc=e)
+        raise self.retry(exc=e, countdown=_backoff(self, 60))  # Exponential backoff
+    if not asins:
+        logger.warning(f"No ASINs found for query='{query}'")
+        return {"status": "No ASINs found", "asins_scraped": 0}
 
-    # Step 2: Scrape product details
-    all_product_data = []
-    for asin in asins:
-        try:
-            product_data_list = WebScraper.scrape_amazon_by_asin(asin)
-            if product_data_list:
-                all_product_data.extend(product_data_list)
-        except Exception as e:
-            logger.error(f"Error scraping product for ASIN='{asin}': {e}")
-            continue  # Skip to next ASIN
-
-    if not all_product_data:
-        logger.warning("No product data scraped after ASIN scraping")
-        return {"status": "No product data scraped", "products_scraped": 0}
-
-    # Step 3: Transform data
+    size = settings.ingest_asin_chunk_size
+    chunks = [asins[i:i + size] for i in range(0, len(asins), size)]
+    logger.info(f"Scraping {len(asins)} ASINs in {len(chunks)} tasks for query='{query}'")
+    raise self.replace(chord(
+        [scrape_asins.s(chunk) for chunk in chunks],
+        load_products.s(source=f"query='{query}'"),
+    ))
+
+@celery_app.task(bind=True, max_retries=3, default_retry_delay=30)
+def ingest_single_amazon_product(self, url: str):
+    """
+    Celery task to scrape one Amazon product page (scrape queue) and load it (load queue).
+    """
+    logger.info(f"Starting ingest_single_amazon_product task for URL='{url}'")
+    raise self.replace(chord([scrape_product.s(url)], load_products.s(source=f"URL='{url}'")))
+
+def _describe_batch_product(prod: dict) -> str:
+    return f"Batch ingested product: rating={prod.get('rating', 0.0)}"
+
+@celery_app.task(bind=True, max_retries=3, default_retry_delay=60)
+def ingest_batch_products_task(self, products_data: list[dict]):
+    """
+    Celery task to ingest a batch of already-fetched products (load queue).
+    """
+    logger.info(f"Starting ingest_batch_products_task for {len(products_data)} products")
+    cleaned_products = Transformer.clean_product_batch(products_data)
+    if not cleaned_products:
+        logger.warning("No valid product data after transformation")
+        return {"status": "No valid product data", "products_cleaned": 0}
+    return _load(self, cleaned_products, "batch", describe=_describe_batch_product)
+
+@celery_app.task(bind=True, max_retries=3, default_retry_delay=60)
+def ingest_batch_chunk_task(self, ref: dict):
+    """
+    Celery task to ingest one spooled chunk of a streamed upload (load queue).
+    'ref' points at the chunk (see etl/spool.py); it is deleted once loaded.
+    """
+    spool = ChunkSpool(backend=ref["backend"])
+    source = f"chunk {ref['index']} of batch {ref['batch_id']}"
+    invalid = []
     try:
-        cleaned_products = Transformer.clean_product_data(all_product_data)
-        if not cleaned_products:
-            logger.warning("No valid product data after transformation")
-            return {"status": "No valid product data", "products_cleaned": 0}
+        records = list(spool.records(ref, errors=invalid))
+    except KeyError as e:
+        # Expired or already loaded by an earlier delivery of this task
+        logger.error(f"Skipping {source}: {e}")
+        return {"status": "Chunk not found", "batch_id": ref["batch_id"], "chunk": ref["index"]}
     except Exception as e:
-        logger.error(f"Error transforming product data: {e}")
-        self.retry(exc=e)
+        logger.error(f"Error reading {source}: {e}")
+        raise self.retry(exc=e, countdown=_backoff(self, 60))  # Exponential backoff
+    # Partner JSON has numbers and nulls where scraped pages have strings; the columnar
+    # cleaner accepts any value type, so bad data never costs the chunk a retry
+    cleaned_products = Transformer.clean_product_batch(records)
+    for line, message in invalid[:MAX_REPORTED_ERRORS]:
+        logger.warning(f"Invalid record at line {line} of {source}: {message}")
+
+    result = {"status": "No valid product data", "products_cleaned": 0}
+    if cleaned_products:
+        result = _load(self, cleaned_products, source, describe=_describe_batch_product)
+    spool.delete(ref)
+    return {**result, "batch_id": ref["batch_id"], "chunk": ref["index"], "invalid_records": len(invalid)}
+
+
+@celery_app.task(bind=True, max_retries=5, default_retry_delay=60)
+def ingest_api_feed(self, url: str, pagination: dict | None = None, params: dict | None = None,
+                    resume: dict | None = None, progress: dict | None = None):
+    """
+    Celery task to stream a paginated partner API feed (scrape queue): products are
+    cut into chunks of ingest_chunk_size as pages arrive, spooled, and queued as
+    ingest_batch_chunk_task (load queue), so the feed is never held in memory.
+    When a page keeps failing the task retries from that page ('resume'); chunks
+    already queued are not sent again ('progress').
+    """
+    progress = progress or {"batch_id": ChunkSpool.new_batch_id(), "pages": 0, "records": 0, "task_ids": []}
+    spool = ChunkSpool()
+    size = settings.ingest_chunk_size
+    buffer = []
+
+    def flush(products: list[dict]):
+        with stage("spool"):
+            ndjson = b"".join(orjson.dumps(product) + b"\n" for product in products)
+            ref = spool.put(progress["batch_id"], len(progress["task_ids"]), ndjson)
+        progress["task_ids"].append(ingest_batch_chunk_task.delay(ref).id)
 
-    # Step 4: Load into PostgreSQL and Elasticsearch
+    logger.info(f"Starting ingest_api_feed for {url} (resume={resume})")
     try:
-        db = SessionLocal()
-        inserted_count = 0
-        for prod in cleaned_products:
-            try:
-                new_product = Product(
-                    name=prod["title"],
-                    description=f"Scraped from Amazon: rating={prod['rating']}",
-                    price=prod["price"],
-                    category=prod["category"],
-                    rating=prod["rating"],
-                    total_reviews=prod["total_reviews"],
-                )
-                db.add(new_product)
-                db.commit()
-                db.refresh(new_product)
-
-                # Index in Elasticsearch
-                doc_body = {
-                    "name": new_product.name,
-                    "description": new_product.description,
-                    "price": new_product.price,
-                    "category": new_product.category,
-                    "rating": new_product.rating,
-                    "total_reviews": new_product.total_reviews,
-                }
-                es_client.index(index="products", id=new_product.id, body=doc_body)
-                inserted_count += 1
-
-            except Exception as e:
-                db.rollback()
-                logger.error(f"Error inserting/indexing product '{prod['title']}': {e}")
-                continue  # Skip to next product
-
-        db.close()
-        logger.info(f"Successfully ingested {inserted_count} products for query='{query}'")
-        return {"status": "Success", "products_inserted": inserted_count}
+        for page in APIFetcher.stream_pages(url, Pagination(**(pagination or {})), params=params, resume=resume):
+            buffer.extend(page.items)
+            progress["pages"] += 1
+            progress["records"] += len(page.items)
+            while len(buffer) >= size:
+                flush(buffer[:size])
+                del buffer[:size]
+    except PageFetchError as e:
+        # Everything before the failed page is queued, so the retry starts at that page
+        if buffer:
+            flush(buffer)
+        logger.error(f"{e}; retrying from {e.resume}")
+        raise self.retry(
+            exc=e,
+            countdown=_backoff(self, 60),  # Exponential backoff
+            kwargs={**self.request.kwargs, "resume": e.resume, "progress": progress},
+        )
+    if buffer:
+        flush(buffer)
+
+    logger.info(f"Queued {progress['records']} products from {progress['pages']} pages of {url} "
+                f"in {len(progress['task_ids'])} chunks")
+    return {"status": "Success", **progress, "chunks": len(progress["task_ids"])}
+
+
+# ---------------------
+# Fan-out (scrape queue)
+# ---------------------
+@celery_app.task(bind=True, max_retries=3, default_retry_delay=30)
+def scrape_asins(self, asins: list[str]) -> dict:
+    """
+    Scrape and clean the product pages of 'asins'. Failed pages are skipped by the
+    scraper; if the whole chunk keeps failing, it contributes nothing rather than
+    failing the chord.
+    """
+    try:
+        raw_products = WebScraper.scrape_amazon_by_asins(asins)
+        products = Transformer.clean_product_batch(raw_products) if raw_products else []
+    except Exception as e:
+        if self.request.retries >= self.max_retries:
+            logger.error(f"Giving up on {len(asins)} ASINs ({asins[0]}...): {e}")
+            return {"asins": len(asins), "scraped": 0, "products": []}
+        logger.warning(f"Error scraping {len(asins)} ASINs, retrying: {e}")
+        raise self.retry(exc=e, countdown=_backoff(self, 30))
+    return {"asins": len(asins), "scraped": len(raw_products), "products": products,
+            "http_pool": http_client.pool_stats()}
+
+@celery_app.task(bind=True, max_retries=3, default_retry_delay=30)
+def scrape_product(self, url: str) -> dict:
+    try:
+        raw_products = WebScraper.scrape_amazon_product(url)
+        products = Transformer.clean_product_data(raw_products) if raw_products else []
+    except Exception as e:
+        logger.error(f"Error scraping product data from URL='{url}': {e}")
+        raise self.retry(exc=e, countdown=_backoff(self, 30))  # Exponential backoff
+    return {"asins": 1, "scraped": len(raw_products), "products": products,
+            "http_pool": http_client.pool_stats()}
+
 
+# ---------------------
+# Fan-in (load queue)
+# ---------------------
+@celery_app.task(bind=True, max_retries=5, default_retry_delay=60)
+def load_products(self, chunks: list[dict], source: str = ""):
+    """
+    Chord callback: load the products of every scrape chunk in one bulk load.
+    """
+    products = [product for chunk in chunks for product in chunk["products"]]
+    scraped = sum(chunk["scraped"] for chunk in chunks)
+    # The scrape chunks' time; this task's own stages are added on return
+    stages = stage_summary({}, *(chunk.get("stages") for chunk in chunks))
+    if not scraped:
+        logger.warning(f"No product data scraped for {source}")
+        return {"status": "No product data scraped", "products_scraped": 0, "stages": stages}
+    if not products:
+        logger.warning(f"No valid product data after transformation for {source}")
+        return {"status": "No valid product data", "products_cleaned": 0, "stages": stages}
+
+    result = _load(self, products, source)
+    result["asins_scraped"] = sum(chunk["asins"] for chunk in chunks)
+    result["products_scraped"] = scraped
+    # Connection reuse of every scrape worker that took part (last report per host wins)
+    result["http_pool"] = {host: stats for chunk in chunks for host, stats in chunk.get("http_pool", {}).items()}
+    result["stages"] = stages
+    return result
+
+def _load(task, products: list[dict], source: str, **kwargs) -> dict:
+    try:
+        db = SessionLocal()
+        try:
+            result = BulkLoader.load_products(db, products, **kwargs)
+        finally:
+            db.close()
     except Exception as e:
-        logger.error(f"Error loading data into DB/Elasticsearch: {e}")
-        self.retry(exc=e)
+        logger.error(f"Error loading data into DB/Elasticsearch for {source}: {e}")
+        raise task.retry(exc=e, countdown=_backoff(task, 60))  # Exponential backoff
+
+    for err in result["errors"]:
+        logger.error(f"Error at {err['stage']} for product '{err['title']}': {err['error']}")
+    logger.info(
+        f"Ingested {result['inserted']} new, {result['updated']} updated, "
+        f"{result['unchanged']} unchanged products for {source}"
+        + (f" ({result['duplicates']} duplicate ASINs skipped)" if result["duplicates"] else "")
+    )
+    return {
+        "status": "Success",
+        "products_inserted": result["inserted"],
+        "products_updated": result["updated"],
+        "products_unchanged": result["unchanged"],
+        "products_duplicate": result["duplicates"],
+        "products_indexed": result["indexed"],
+        "products_failed": len(result["errors"]),
+        "errors": result["errors"][:MAX_REPORTED_ERRORS],
+    }
+
+
+# ---------------------
+# Maintenance (beat)
+# ---------------------
+@celery_app.task
+def restore_bulk_index_settings():
+    """
+    Put the products index's refresh and replicas back if a load died while it had
+    them switched off (see shared.config.elasticsearch.bulk_indexing).
+    """
+    restored = restore_bulk_settings_if_idle()
+    if restored:
+        logger.warning("Restored products index settings left behind by a dead bulk load")
+    return {"restored": restored}
@@ -0,0 +1,54 @@
+# services/ingestion/app/scheduler/workers.py
+"""
+Start a Celery worker for one queue, with the pool, concurrency and prefetch
+configured for that queue in shared settings (CELERY_SCRAPE_*, CELERY_LOAD_*,
+CELERY_DEFAULT_*).
+
+    python -m services.ingestion.app.scheduler.workers scrape   # I/O: threads, many slots
+    python -m services.ingestion.app.scheduler.workers load     # DB: prefork, few slots
+    python -m services.ingestion.app.scheduler.workers celery   # periodic jobs
+    python -m services.ingestion.app.scheduler.workers scrape --dry-run -- --loglevel=debug
+
+Extra arguments after '--' are passed to the worker. Run more scrape or load workers
+(on more machines) to scale each side independently.
+"""
+
+import argparse
+import socket
+from shared.config.settings import settings
+from .celery_app import celery_app, DEFAULT_QUEUE, LOAD_QUEUE, SCRAPE_QUEUE
+
+_PREFIX = {SCRAPE_QUEUE: "celery_scrape", LOAD_QUEUE: "celery_load", DEFAULT_QUEUE: "celery_default"}
+
+
+def worker_argv(queue: str) -> list[str]:
+    prefix = _PREFIX[queue]
+    return [
+        "worker",
+        f"--queues={queue}",
+        f"--hostname={queue}@{socket.gethostname()}",
+        f"--pool={getattr(settings, prefix + '_pool')}",
+        f"--concurrency={getattr(settings, prefix + '_concurrency')}",
+        f"--prefetch-multiplier={getattr(settings, prefix + '_prefetch')}",
+        # Recycle prefork children now and then (no-op for the threads pool)
+        "--max-tasks-per-child=1000",
+        "--loglevel=info",
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("queue", choices=sorted(_PREFIX))
+    parser.add_argument("--dry-run", action="store_true", help="print the worker arguments and exit")
+    parser.add_argument("extra", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    argv = worker_argv(args.queue) + [arg for arg in args.extra if arg != "--"]
+    if args.dry_run:
+        print("celery -A services.ingestion.app.scheduler.celery_app " + " ".join(argv))
+        return
+    celery_app.worker_main(argv)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# services/ingestion/app/schemas/ingest.py
+from pydantic import BaseModel, Field
+from typing import Any, List, Literal, Optional
+
+class SearchIngestRequest(BaseModel):
+    query: str
+    pages: int = Field(1, ge=1, le=20)
+
+class ProductIngestRequest(BaseModel):
+    url: str
+
+class BatchIngestRequest(BaseModel):
+    products: List[dict]
+
+class FeedPagination(BaseModel):
+    mode: Optional[Literal["cursor", "offset", "link"]] = "cursor"
+    items_field: str = "products"
+    cursor_field: str = "next_cursor"
+    cursor_param: str = "cursor"
+    offset_param: str = "offset"
+    limit_param: str = "limit"
+    page_size: Optional[int] = Field(None, ge=1)
+
+class FeedIngestRequest(BaseModel):
+    url: str
+    params: dict = {}
+    pagination: FeedPagination = FeedPagination()
+
+class TaskQueued(BaseModel):
+    task_id: str
+
+class StreamIngestAccepted(BaseModel):
+    batch_id: str
+    records: int
+    chunks: int
+    task_ids: List[str]
+
+class TaskStatus(BaseModel):
+    task_id: str
+    status: str
+    result: Optional[Any] = None
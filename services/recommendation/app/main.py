@@ -0,0 +1,14 @@
+# services/recommendation/app/main.py
+from fastapi import FastAPI
+from shared.config.cache import async_redis_client
+from shared.utils.metrics import instrument
+from .routes.recommend import router as recommend_router
+
+app = FastAPI()
+instrument(app, "recommendation")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await async_redis_client.aclose()
+
+app.include_router(recommend_router)
@@ -0,0 +1,27 @@
+# services/recommendation/app/routes/recommend.py
+import orjson
+from fastapi import APIRouter, HTTPException, Query
+from shared.config.cache import async_redis_client
+from ..schemas.recommendation import RecommendationResponse
+from ..services.similar_products import STATUS_KEY, similar_key
+
+router = APIRouter()
+
+@router.get("/recommend/{product_id}", response_model=RecommendationResponse)
+async def recommend(product_id: int, limit: int = Query(10, ge=1, le=100)):
+    """
+    Products most similar to 'product_id', precomputed by the
+    refresh_similar_products Celery task: a single Redis lookup.
+    """
+    payload = await async_redis_client.get(similar_key(product_id))
+    if payload is None:
+        raise HTTPException(status_code=404, detail="No recommendations for this product yet")
+    return {"product_id": product_id, "similar": orjson.loads(payload)[:limit]}
+
+@router.get("/recommend-status")
+async def recommend_status():
+    """
+    Counts and stage timings of the last similar-products refresh.
+    """
+    payload = await async_redis_client.get(STATUS_KEY)
+    return orjson.loads(payload) if payload else {"status": "never run"}
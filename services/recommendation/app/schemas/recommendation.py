@@ -0,0 +1,12 @@
+# services/recommendation/app/schemas/recommendation.py
+from pydantic import BaseModel
+from typing import List, Optional
+
+class SimilarProduct(BaseModel):
+    id: int
+    name: Optional[str] = None
+    score: float
+
+class RecommendationResponse(BaseModel):
+    product_id: int
+    similar: List[SimilarProduct]
@@ -0,0 +1,382 @@
+# services/recommendation/app/services/embeddings.py
+"""
+Product embeddings for the recommendation service.
+
+Products are embedded from their name, category and description in large batches by
+a pluggable local model. "hashing" is the built-in model: a deterministic feature-hashing
+bag of words and word bigrams, no training or downloads needed. Other models can be
+added with register_model(); anything with a 'key', a 'dim' and embed(texts) works.
+
+Vectors live in an EmbeddingStore: one contiguous float32 matrix plus parallel id and
+content-hash arrays, saved as .npy files in a versioned directory published through a
+CURRENT pointer (as IVFIndex does), so readers never pair one version's ids with
+another's vectors; the files can be memory-mapped back. The content
+hash covers the model key and the embedded text, so EmbeddingService.sync() re-embeds
+only products whose text changed (or all of them when the model changes).
+
+The model is chosen with EMBEDDING_MODEL; benchmarks/embeddings.py measures throughput
+and memory per million products.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import zlib
+from itertools import chain
+import numpy as np
+from shared.config.settings import settings
+from ..utils.semantic_search import current_version
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"[a-z0-9]+")
+# The hashing model forgets its word-hash memo past this size to bound memory
+_MAX_MEMO_TOKENS = 1_000_000
+_HASH_WIDTH = 40  # sha1 hex digest
+_KEEP_VERSIONS = 2  # saved store versions kept on disk (readers may still map the previous one)
+
+
+def product_text(product: dict) -> str:
+    """
+    The text a product is embedded from. Accepts loader rows ("name") and scraper
+    rows ("title").
+    """
+    parts = (product.get("name") or product.get("title"), product.get("category"), product.get("description"))
+    return " | ".join(str(part) for part in parts if part)
+
+
+class _WordHashes(dict):
+    """crc32 of each word, computed on first use."""
+
+    def __missing__(self, word: str) -> int:
+        h = self[word] = zlib.crc32(word.encode("utf-8"))
+        return h
+
+
+class HashingEmbedder:
+    """
+    Signed feature hashing (the "hashing trick") of lower-cased words and word bigrams,
+    L2-normalised. Deterministic across processes: words are hashed with crc32, not
+    Python's salted hash(), and bigram hashes are mixed from their words' hashes.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dim: int | None = None):
+        self.dim = dim or settings.embedding_dim
+        if self.dim & (self.dim - 1):
+            raise ValueError(f"hashing model dim must be a power of two, got {self.dim}")
+        self.key = f"hashing-v1-{self.dim}"
+        self._word_hashes = _WordHashes()
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Embed a batch of texts; returns a C-contiguous (len(texts), dim) float32 array."""
+        words = [_WORD.findall(text.lower()) for text in texts]
+        counts = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+        flat = list(chain.from_iterable(words))
+
+        if len(self._word_hashes) > _MAX_MEMO_TOKENS:
+            self._word_hashes.clear()
+        unigrams = np.fromiter(map(self._word_hashes.__getitem__, flat), dtype=np.uint64, count=len(flat))
+        rows = np.repeat(np.arange(len(texts), dtype=np.int64), counts)
+
+        # Bigrams are adjacent words within the same text
+        same_text = rows[1:] == rows[:-1]
+        bigrams = _mix(unigrams[:-1][same_text], unigrams[1:][same_text])
+        features = np.concatenate([unigrams, bigrams])
+        feature_rows = np.concatenate([rows, rows[:-1][same_text]])
+
+        # Low bits pick the column, bit 31 the sign; scatter everything in one pass
+        columns = (features & np.uint64(self.dim - 1)).astype(np.int64)
+        signs = 1.0 - 2.0 * ((features >> np.uint64(31)) & np.uint64(1)).astype(np.float64)
+        matrix = np.bincount(
+            feature_rows * self.dim + columns, weights=signs, minlength=len(texts) * self.dim
+        ).reshape(len(texts), self.dim).astype(np.float32)
+        return normalize(matrix)
+
+
+def _mix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Order-sensitive 32-bit hash of two uint64 arrays of 32-bit hashes (splitmix64 finaliser)."""
+    x = a * np.uint64(0x9E3779B97F4A7C15) + b
+    x ^= x >> np.uint64(30)
+    x *= np.uint64(0xBF58476D1CE4E5B9)
+    x ^= x >> np.uint64(27)
+    x *= np.uint64(0x94D049BB133111EB)
+    x ^= x >> np.uint64(31)
+    return x & np.uint64(0xFFFFFFFF)
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalise rows in place (zero rows stay zero) and return the matrix."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+_MODELS = {"hashing": HashingEmbedder}
+_instances = {}
+# get_model() is also called from worker threads (search queries); build each model once
+_instances_lock = threading.Lock()
+
+
+def register_model(name: str, factory):
+    """
+    Make an embedding model available under 'name'. factory() must return an object with
+    'key' (changes whenever its vectors would), 'dim' and embed(texts) -> float32 array.
+    """
+    _MODELS[name] = factory
+    _instances.pop(name, None)
+
+
+def get_model(name: str | None = None):
+    """
+    Return the configured model, falling back to "hashing" when the requested model's
+    dependencies are not installed.
+    """
+    name = name or settings.embedding_model
+    if name not in _MODELS:
+        raise ValueError(f"Unknown embedding model '{name}', expected one of {available_models()}")
+    if name not in _instances:
+        with _instances_lock:
+            if name not in _instances:
+                try:
+                    _instances[name] = _MODELS[name]()
+                except ImportError as e:
+                    logger.warning(f"Embedding model '{name}' is unavailable ({e}); using hashing")
+                    _instances[name] = HashingEmbedder()
+    return _instances[name]
+
+
+def available_models() -> list[str]:
+    return list(_MODELS)
+
+
+class EmbeddingStore:
+    """
+    Product vectors as one contiguous (n, dim) float32 matrix, with parallel arrays of
+    product ids and content hashes. Rows are appended into spare capacity and removed
+    by moving the last row into the gap, so the live rows are always matrix[:n].
+    """
+
+    def __init__(self, dim: int, model_key: str, capacity: int = 1024):
+        self.dim = dim
+        self.model_key = model_key
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._hashes = np.zeros(capacity, dtype=f"S{_HASH_WIDTH}")
+        self._size = 0
+        self._row_by_id = {}
+        self._row_by_hash = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[:self._size]
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids[:self._size]
+
+    @property
+    def nbytes(self) -> int:
+        return self.vectors.nbytes + self.ids.nbytes + self._hashes[:self._size].nbytes
+
+    def hash_of(self, product_id: int) -> bytes | None:
+        row = self._row_by_id.get(product_id)
+        return None if row is None else self._hashes[row]
+
+    def vector_for_hash(self, content_hash: bytes) -> np.ndarray | None:
+        row = self._row_by_hash.get(content_hash)
+        return None if row is None else self._vectors[row]
+
+    def get(self, product_ids) -> np.ndarray:
+        """Vectors for these ids, in order (KeyError for unknown ids)."""
+        return self._vectors[[self._row_by_id[int(i)] for i in product_ids]]
+
+    def upsert(self, product_ids, hashes: list[bytes], vectors: np.ndarray):
+        self._ensure_writable(self._size + len(product_ids))
+        rows = np.empty(len(product_ids), dtype=np.int64)
+        for i, (product_id, content_hash) in enumerate(zip(product_ids, hashes)):
+            product_id = int(product_id)
+            row = self._row_by_id.get(product_id)
+            if row is None:
+                row = self._size
+                self._size += 1
+                self._ids[row] = product_id
+                self._row_by_id[product_id] = row
+            else:
+                self._forget_hash(row)
+            self._hashes[row] = content_hash
+            self._row_by_hash[content_hash] = row
+            rows[i] = row
+        # One copy for the whole batch instead of one per row
+        self._vectors[rows] = vectors
+
+    def remove(self, product_ids) -> int:
+        self._ensure_writable(self._size)
+        removed = 0
+        for product_id in product_ids:
+            row = self._row_by_id.pop(int(product_id), None)
+            if row is None:
+                continue
+            self._forget_hash(row)
+            last = self._size - 1
+            if row != last:
+                self._vectors[row] = self._vectors[last]
+                self._ids[row] = self._ids[last]
+                self._hashes[row] = self._hashes[last]
+                self._row_by_id[int(self._ids[row])] = row
+                if self._row_by_hash.get(self._hashes[row]) == last:
+                    self._row_by_hash[self._hashes[row]] = row
+            self._size = last
+            removed += 1
+        return removed
+
+    def save(self, directory: str) -> str:
+        """
+        Write ids.npy, hashes.npy, vectors.npy and meta.json to a new version directory
+        under 'directory' and point directory/CURRENT at it atomically, so a concurrent
+        load() sees either the old store or the new one. Returns the version directory.
+        """
+        os.makedirs(directory, exist_ok=True)
+        version = f"store-{time.time_ns()}"
+        target = os.path.join(directory, version)
+        os.makedirs(target)
+        for name, array in (("ids", self.ids), ("hashes", self._hashes[:self._size]), ("vectors", self.vectors)):
+            np.save(os.path.join(target, f"{name}.npy"), array)
+        with open(os.path.join(target, "meta.json"), "w") as f:
+            json.dump({"model_key": self.model_key, "dim": self.dim, "count": self._size}, f)
+
+        pointer = os.path.join(directory, "CURRENT")
+        with open(pointer + ".tmp", "w") as f:
+            f.write(version)
+        os.replace(pointer + ".tmp", pointer)
+
+        versions = sorted(name for name in os.listdir(directory) if name.startswith("store-"))
+        for old in versions[:-_KEEP_VERSIONS]:
+            shutil.rmtree(os.path.join(directory, old), ignore_errors=True)
+        return target
+
+    @classmethod
+    def load(cls, directory: str, model_key: str, dim: int, mmap: bool = True) -> "EmbeddingStore":
+        """
+        Load a saved store. With mmap the vectors stay in the page cache, shared by every
+        process that maps them, until the store is first modified. A missing store, or
+        one written by a different model, loads empty.
+        """
+        store = cls(dim, model_key)
+        version = current_version(directory)
+        if version is not None:
+            directory = os.path.join(directory, version)
+        # else: a store saved before versioning, with its files directly in 'directory'
+        try:
+            with open(os.path.join(directory, "meta.json")) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return store
+        if meta["model_key"] != model_key or meta["dim"] != dim:
+            logger.info(f"Embedding store in {directory} was built by {meta['model_key']}; starting empty")
+            return store
+
+        mode = "r" if mmap else None
+        store._vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode=mode)
+        store._ids = np.load(os.path.join(directory, "ids.npy"))
+        store._hashes = np.load(os.path.join(directory, "hashes.npy"))
+        store._size = len(store._ids)
+        store._row_by_id = {int(product_id): row for row, product_id in enumerate(store._ids)}
+        store._row_by_hash = {content_hash: row for row, content_hash in enumerate(store._hashes)}
+        return store
+
+    def _ensure_writable(self, needed: int):
+        # Grow by doubling; this also turns a read-only memory map into a private copy
+        capacity = len(self._vectors)
+        if needed <= capacity and self._vectors.flags.writeable:
+            return
+        if needed > capacity:
+            capacity = max(needed, capacity * 2, 1024)
+        for name in ("_vectors", "_ids", "_hashes"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def _forget_hash(self, row: int):
+        content_hash = self._hashes[row]
+        if self._row_by_hash.get(content_hash) == row:
+            del self._row_by_hash[content_hash]
+
+
+class EmbeddingService:
+    def __init__(self, model=None, store: EmbeddingStore | None = None, batch_size: int | None = None):
+        self.model = model or get_model()
+        self.store = store if store is not None else EmbeddingStore(self.model.dim, self.model.key)
+        self.batch_size = batch_size or settings.embedding_batch_size
+
+    @classmethod
+    def from_disk(cls, directory: str | None = None, model=None, mmap: bool = True) -> "EmbeddingService":
+        model = model or get_model()
+        directory = directory or settings.embedding_store_path
+        return cls(model, EmbeddingStore.load(directory, model.key, model.dim, mmap=mmap))
+
+    def content_hash(self, text: str) -> bytes:
+        return hashlib.sha1(f"{self.model.key}\x00{text}".encode("utf-8")).hexdigest().encode("ascii")
+
+    def embed_texts(self, texts: list[str]) -> np.ndarray:
+        """Embed arbitrary texts (e.g. a search query) in batches, without caching."""
+        if not texts:
+            return np.zeros((0, self.model.dim), dtype=np.float32)
+        out = np.empty((len(texts), self.model.dim), dtype=np.float32)
+        for start in range(0, len(texts), self.batch_size):
+            out[start:start + self.batch_size] = self.model.embed(texts[start:start + self.batch_size])
+        return out
+
+    def sync(self, products: list[dict]) -> dict:
+        """
+        Bring the store up to date for these products (dicts with "id" plus name/title,
+        category and description):
+        1. Products whose content hash matches the stored one are skipped.
+        2. Changed products whose text is already embedded under another id reuse
+           that vector.
+        3. The rest are embedded in batches of batch_size.
+        Returns {"unchanged", "reused", "embedded": int, "changed_ids": int64 array}.
+        """
+        changed_ids, changed_hashes, texts = [], [], []
+        unchanged = 0
+        for product in products:
+            text = product_text(product)
+            content_hash = self.content_hash(text)
+            if self.store.hash_of(product["id"]) == content_hash:
+                unchanged += 1
+                continue
+            changed_ids.append(product["id"])
+            changed_hashes.append(content_hash)
+            texts.append(text)
+
+        vectors = np.empty((len(texts), self.model.dim), dtype=np.float32)
+        missing = []
+        for i, content_hash in enumerate(changed_hashes):
+            cached = self.store.vector_for_hash(content_hash)
+            if cached is None:
+                missing.append(i)
+            else:
+                vectors[i] = cached
+        if missing:
+            vectors[missing] = self.embed_texts([texts[i] for i in missing])
+
+        self.store.upsert(changed_ids, changed_hashes, vectors)
+        return {
+            "unchanged": unchanged,
+            "reused": len(texts) - len(missing),
+            "embedded": len(missing),
+            "changed_ids": np.asarray(changed_ids, dtype=np.int64),
+        }
+
+    def save(self, directory: str | None = None):
+        self.store.save(directory or settings.embedding_store_path)
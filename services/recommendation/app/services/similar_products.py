@@ -0,0 +1,255 @@
+# services/recommendation/app/services/similar_products.py
+"""
+Precomputed "similar products" lists.
+
+refresh() streams the products table through the embedding store in batches, then
+computes top-K cosine neighbours with blocked matrix products over the whole catalogue
+(never a full n x n matrix), and writes one Redis key per product. GET /recommend/{id}
+is then a single key lookup.
+
+The lists last written are also kept on disk (NeighbourTable), so an incremental run
+recomputes exactly the lists that can change: those of new or re-embedded products,
+those naming a removed or re-embedded product, and those a new or re-embedded product
+now scores high enough to enter. A full run (full=True, daily on the beat schedule)
+recomputes every list. Both also publish the IVF index used for vector search.
+"""
+
+import json
+import logging
+import os
+import time
+import numpy as np
+import orjson
+from sqlalchemy import select
+from shared.config.cache import redis_client
+from shared.config.settings import settings
+from shared.models.product import Product
+from .embeddings import EmbeddingService
+from ..utils.semantic_search import IVFIndex
+
+logger = logging.getLogger(__name__)
+
+SIMILAR_KEY = "recommend:similar:{product_id}"
+STATUS_KEY = "recommend:similar:status"
+LOCK_KEY = "recommend:similar:lock"
+_FETCH_BATCH = 10_000
+
+
+def similar_key(product_id: int) -> str:
+    return SIMILAR_KEY.format(product_id=product_id)
+
+
+def top_k_neighbours(queries: np.ndarray, corpus: np.ndarray, k: int, query_rows: np.ndarray | None = None,
+                     query_block: int | None = None, corpus_block: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Exact top-k rows of 'corpus' by dot product for every row of 'queries'.
+    query_rows[i] is the corpus row of query i (excluded from its own results), or -1.
+    Scores are computed one (query_block x corpus_block) tile at a time and merged into
+    a running top-k, so memory stays bounded at any catalogue size.
+    Returns (corpus row indices, scores), each (len(queries), k), best first; rows with
+    fewer than k candidates are padded with index -1.
+    """
+    query_block = query_block or settings.recommend_query_block
+    corpus_block = corpus_block or settings.recommend_corpus_block
+    m, n = len(queries), len(corpus)
+    best_scores = np.full((m, k), -np.inf, dtype=np.float32)
+    best_rows = np.full((m, k), -1, dtype=np.int64)
+
+    for q_start in range(0, m, query_block):
+        q_end = min(m, q_start + query_block)
+        block = queries[q_start:q_end]
+        scores_view, rows_view = best_scores[q_start:q_end], best_rows[q_start:q_end]
+        self_rows = query_rows[q_start:q_end] if query_rows is not None else None
+
+        for c_start in range(0, n, corpus_block):
+            c_end = min(n, c_start + corpus_block)
+            tile = block @ corpus[c_start:c_end].T
+            if self_rows is not None:
+                inside = np.flatnonzero((self_rows >= c_start) & (self_rows < c_end))
+                tile[inside, self_rows[inside] - c_start] = -np.inf
+
+            kk = min(k, tile.shape[1])
+            part = np.argpartition(-tile, kk - 1, axis=1)[:, :kk]
+            candidate_scores = np.concatenate([scores_view, np.take_along_axis(tile, part, axis=1)], axis=1)
+            candidate_rows = np.concatenate([rows_view, part + c_start], axis=1)
+            top = np.argpartition(-candidate_scores, k - 1, axis=1)[:, :k]
+            scores_view[:] = np.take_along_axis(candidate_scores, top, axis=1)
+            rows_view[:] = np.take_along_axis(candidate_rows, top, axis=1)
+
+    order = np.argsort(-best_scores, axis=1, kind="stable")
+    best_scores = np.take_along_axis(best_scores, order, axis=1)
+    best_rows = np.take_along_axis(best_rows, order, axis=1)
+    best_rows[~np.isfinite(best_scores)] = -1
+    return best_rows, best_scores
+
+
+class NeighbourTable:
+    """
+    The neighbour lists last written to Redis: for each product id in 'owners', its
+    neighbour ids (-1 padded) and scores (-inf padded), best first.
+    """
+
+    def __init__(self, owners: np.ndarray, neighbours: np.ndarray, scores: np.ndarray, model_key: str):
+        self.owners = owners
+        self.neighbours = neighbours
+        self.scores = scores
+        self.model_key = model_key
+
+    @classmethod
+    def load(cls, directory: str, model_key: str, k: int) -> "NeighbourTable | None":
+        """The saved table, or None if there is none for this model and k."""
+        try:
+            with open(os.path.join(directory, "meta.json")) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        if meta["model_key"] != model_key or meta["k"] != k:
+            return None
+        arrays = [np.load(os.path.join(directory, f"{name}.npy")) for name in ("owners", "neighbours", "scores")]
+        return cls(*arrays, model_key)
+
+    def save(self, directory: str):
+        """Write owners.npy, neighbours.npy, scores.npy and meta.json, each replaced atomically."""
+        os.makedirs(directory, exist_ok=True)
+        for name, array in (("owners", self.owners), ("neighbours", self.neighbours), ("scores", self.scores)):
+            tmp = os.path.join(directory, f".{name}.tmp.npy")
+            np.save(tmp, array)
+            os.replace(tmp, os.path.join(directory, f"{name}.npy"))
+        tmp = os.path.join(directory, ".meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"model_key": self.model_key, "k": self.neighbours.shape[1]}, f)
+        os.replace(tmp, os.path.join(directory, "meta.json"))
+
+    def replaced(self, owners: np.ndarray, neighbours: np.ndarray, scores: np.ndarray,
+                 catalogue: np.ndarray) -> "NeighbourTable":
+        """A copy with the lists of 'owners' replaced and products gone from 'catalogue' dropped."""
+        keep = np.isin(self.owners, catalogue) & ~np.isin(self.owners, owners)
+        return NeighbourTable(
+            np.concatenate([self.owners[keep], owners]),
+            np.concatenate([self.neighbours[keep], neighbours]),
+            np.concatenate([self.scores[keep], scores]),
+            self.model_key,
+        )
+
+
+class SimilarProducts:
+    @staticmethod
+    def refresh(db, full: bool = False, service: EmbeddingService | None = None, redis=redis_client) -> dict:
+        """
+        Sync embeddings with the products table and recompute the neighbour lists that
+        can have changed (see the module docstring), or every list when full=True or
+        no NeighbourTable is saved yet.
+        Returns counts and per-stage timings.
+        """
+        timings = {}
+        started = time.perf_counter()
+        service = service or EmbeddingService.from_disk(mmap=False)
+        k = settings.recommend_top_k
+
+        # Names are all we keep per product; rows are embedded one fetch batch at a time
+        names, embedded, reused, changed_parts = {}, 0, 0, []
+        stmt = select(Product.id, Product.name, Product.category, Product.description)
+        for batch in db.execute(stmt.execution_options(yield_per=_FETCH_BATCH)).mappings().partitions():
+            products = [dict(row) for row in batch]
+            synced = service.sync(products)
+            embedded += synced["embedded"]
+            reused += synced["reused"]
+            changed_parts.append(synced["changed_ids"])
+            names.update((product["id"], product["name"]) for product in products)
+        changed_ids = np.concatenate(changed_parts) if changed_parts else np.empty(0, dtype=np.int64)
+        removed_ids = np.setdiff1d(service.store.ids, np.fromiter(names, dtype=np.int64, count=len(names)))
+        service.store.remove(removed_ids)
+        changed = bool(len(changed_ids) or len(removed_ids))
+        if changed:
+            service.save()
+        timings["embed"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        ids = service.store.ids
+        vectors = service.store.vectors
+        table = None if full else NeighbourTable.load(settings.recommend_neighbours_path, service.model.key, k)
+        if table is None:
+            full = True
+            query_rows = np.arange(len(ids), dtype=np.int64)
+        else:
+            query_rows = SimilarProducts._affected_rows(table, ids, vectors, changed_ids, removed_ids)
+        neighbour_rows, scores = top_k_neighbours(vectors[query_rows], vectors, k, query_rows=query_rows)
+        timings["neighbours"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        written = SimilarProducts._write(redis, ids, names, query_rows, neighbour_rows, scores, removed_ids)
+        neighbour_ids = np.where(neighbour_rows >= 0, ids[np.maximum(neighbour_rows, 0)], -1)
+        if full:
+            table = NeighbourTable(ids[query_rows], neighbour_ids, scores, service.model.key)
+        else:
+            table = table.replaced(ids[query_rows], neighbour_ids, scores, catalogue=ids)
+        table.save(settings.recommend_neighbours_path)
+        timings["write"] = time.perf_counter() - started
+
+        if changed or full:
+            started = time.perf_counter()
+            SimilarProducts._publish_index(ids, vectors, changed_ids, removed_ids, rebuild=full)
+            timings["index"] = time.perf_counter() - started
+
+        result = {
+            "products": len(ids),
+            "embedded": embedded,
+            "reused": reused,
+            "removed": len(removed_ids),
+            "lists_written": written,
+            "full": full,
+            "timings": {stage: round(seconds, 3) for stage, seconds in timings.items()},
+        }
+        redis.set(STATUS_KEY, orjson.dumps({**result, "finished_at": time.time()}))
+        return result
+
+    @staticmethod
+    def _affected_rows(table: NeighbourTable, ids: np.ndarray, vectors: np.ndarray,
+                       changed_ids: np.ndarray, removed_ids: np.ndarray) -> np.ndarray:
+        """
+        Store rows whose list can differ from the one in 'table': new or re-embedded
+        products, products missing from the table, lists naming a removed or re-embedded
+        product, and lists a new or re-embedded product now scores above the last entry of.
+        The lists of every other product are exactly what a full run would compute.
+        """
+        row_by_id = {product_id: row for row, product_id in enumerate(ids.tolist())}
+        changed_rows = np.array([row_by_id[i] for i in changed_ids.tolist()], dtype=np.int64)
+        missing_rows = np.flatnonzero(~np.isin(ids, table.owners))
+
+        current = np.isin(table.owners, ids) & ~np.isin(table.owners, changed_ids)
+        owners, neighbours, last_scores = table.owners[current], table.neighbours[current], table.scores[current, -1]
+        stale = np.isin(neighbours, np.concatenate([changed_ids, removed_ids])).any(axis=1)
+        owner_rows = np.array([row_by_id[i] for i in owners.tolist()], dtype=np.int64)
+        if len(changed_rows) and len(owner_rows):
+            _, best = top_k_neighbours(vectors[owner_rows], vectors[changed_rows], 1)
+            stale |= best[:, 0] > last_scores
+        return np.union1d(np.union1d(changed_rows, missing_rows), owner_rows[stale]).astype(np.int64)
+
+    @staticmethod
+    def _write(redis, ids, names, query_rows, neighbour_rows, scores, removed_ids) -> int:
+        pipe = redis.pipeline(transaction=False)
+        for query_row, rows, row_scores in zip(query_rows.tolist(), neighbour_rows, scores):
+            similar = [
+                {"id": int(ids[row]), "name": names.get(int(ids[row])), "score": round(float(score), 4)}
+                for row, score in zip(rows.tolist(), row_scores.tolist())
+                if row >= 0
+            ]
+            pipe.set(similar_key(int(ids[query_row])), orjson.dumps(similar))
+            if len(pipe) >= 1000:
+                pipe.execute()
+        for product_id in removed_ids.tolist():
+            pipe.delete(similar_key(product_id))
+        pipe.execute()
+        return len(query_rows)
+
+    @staticmethod
+    def _publish_index(ids, vectors, changed_ids, removed_ids, rebuild: bool):
+        index = None if rebuild else IVFIndex.load(settings.vector_index_path, mmap=False)
+        if index is None:
+            index = IVFIndex.build(ids, vectors, nprobe=settings.vector_nprobe)
+        else:
+            if len(changed_ids):
+                row_by_id = {product_id: row for row, product_id in enumerate(ids.tolist())}
+                index.add(changed_ids, vectors[[row_by_id[i] for i in changed_ids.tolist()]])
+            index.delete(removed_ids)
+        index.save(settings.vector_index_path)
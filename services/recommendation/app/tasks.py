@@ -0,0 +1,40 @@
+# services/recommendation/app/tasks.py
+
+from celery.utils.log import get_task_logger
+from redis.exceptions import LockError
+from services.ingestion.app.scheduler.celery_app import celery_app
+from shared.config.cache import redis_client
+from shared.config.db import SessionLocal
+from .services.similar_products import SimilarProducts, LOCK_KEY
+
+logger = get_task_logger(__name__)
+
+@celery_app.task(bind=True, max_retries=3, default_retry_delay=300)
+def refresh_similar_products(self, full: bool = False):
+    """
+    Celery task to:
+    1. Re-embed products whose name/category/description changed.
+    2. Recompute their top-K similar products (all products when full=True).
+    3. Write the lists to Redis and publish the vector index.
+    Overlapping runs are skipped.
+    """
+    lock = redis_client.lock(LOCK_KEY, timeout=6 * 60 * 60)
+    if not lock.acquire(blocking=False):
+        logger.info("refresh_similar_products is already running; skipping")
+        return {"status": "skipped"}
+
+    db = SessionLocal()
+    try:
+        result = SimilarProducts.refresh(db, full=full)
+        logger.info(f"Similar products refreshed: {result}")
+        return {"status": "Completed", **result}
+    except Exception as e:
+        logger.error(f"Error refreshing similar products: {e}")
+        raise self.retry(exc=e)
+    finally:
+        db.close()
+        try:
+            lock.release()
+        except LockError:
+            # The lock expired (a run longer than its timeout); don't mask the result
+            logger.warning("refresh_similar_products lock was no longer held at release")
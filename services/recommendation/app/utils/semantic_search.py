@@ -0,0 +1,334 @@
+# services/recommendation/app/utils/semantic_search.py
+"""
+In-process approximate nearest-neighbour search over product embeddings.
+
+IVFIndex is an inverted-file index: k-means centroids partition the vectors into lists
+stored back to back (one contiguous matrix ordered by list, plus offsets), and a query
+scores only the nprobe lists whose centroids are closest. Vectors are L2-normalised, so
+dot products are cosine similarities.
+
+Incremental changes don't touch the lists: adds and updates go to a small delta buffer
+that is scanned exhaustively, and deletes are tombstones filtered out of results.
+compact() folds both into the lists (assigning new vectors to their nearest centroid);
+rebuild with IVFIndex.build() when the catalogue has drifted far from the training set.
+
+save() writes a new versioned directory and flips a CURRENT pointer; load() memory-maps
+the arrays, so every uvicorn worker on a host shares one copy through the page cache.
+SharedIndex picks up new versions as they are published.
+"""
+
+import json
+import logging
+import os
+import shutil
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_ASSIGN_BLOCK = 65_536  # vectors per matmul when assigning to centroids
+_KEEP_VERSIONS = 2      # published versions kept on disk (readers may still map the previous one)
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """float32, C-contiguous, L2-normalised copy of 'vectors' (zero rows stay zero)."""
+    vectors = np.array(vectors, dtype=np.float32, ndmin=2, order="C")
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+class IVFIndex:
+    def __init__(self, dim: int, centroids=None, offsets=None, ids=None, vectors=None, nprobe: int = 16):
+        self.dim = dim
+        self.nprobe = nprobe
+        self.centroids = centroids if centroids is not None else np.zeros((0, dim), dtype=np.float32)
+        self.offsets = offsets if offsets is not None else np.zeros(1, dtype=np.int64)
+        self.ids = ids if ids is not None else np.zeros(0, dtype=np.int64)
+        self.vectors = vectors if vectors is not None else np.zeros((0, dim), dtype=np.float32)
+
+        self._tombstones = set()
+        self._tombstone_array = None
+        self._delta_ids = np.zeros(0, dtype=np.int64)
+        self._delta_vectors = np.zeros((0, dim), dtype=np.float32)
+        self._delta_rows = {}
+        self._delta_size = 0
+
+    # ---------------------
+    # Building
+    # ---------------------
+    @classmethod
+    def build(cls, ids, vectors, nlist: int | None = None, iterations: int = 10,
+              sample_size: int | None = None, nprobe: int = 16, seed: int = 0) -> "IVFIndex":
+        """
+        Train centroids with spherical k-means on a sample and bucket every vector.
+        nlist defaults to sqrt(n) (capped at 4096); the sample to 64 vectors per list.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        vectors = normalize_rows(vectors)
+        n, dim = vectors.shape
+        if n == 0:
+            return cls(dim, nprobe=nprobe)
+
+        nlist = min(nlist or max(1, min(4096, int(np.sqrt(n)))), n)
+        rng = np.random.default_rng(seed)
+        sample_size = min(n, sample_size or 64 * nlist)
+        sample = vectors[rng.choice(n, sample_size, replace=False)] if sample_size < n else vectors
+        centroids = _spherical_kmeans(sample, nlist, iterations, rng)
+
+        labels = _assign(vectors, centroids)
+        order = np.argsort(labels, kind="stable")
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=nlist), out=offsets[1:])
+        return cls(dim, centroids, offsets, ids[order], vectors[order], nprobe=nprobe)
+
+    # ---------------------
+    # Incremental updates
+    # ---------------------
+    def __len__(self) -> int:
+        # Tombstones also cover ids that only ever lived in the delta buffer
+        return len(self.ids) - int(self._tombstone_mask(self.ids).sum()) + self._delta_size
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    def add(self, ids, vectors):
+        """Add or replace vectors by product id; they are searchable immediately."""
+        ids = np.asarray(ids, dtype=np.int64)
+        vectors = normalize_rows(vectors)
+        self._tombstones.update(int(i) for i in ids)
+        self._tombstone_array = None
+        self._grow_delta(self._delta_size + len(ids))
+        for product_id, vector in zip(ids.tolist(), vectors):
+            row = self._delta_rows.get(product_id)
+            if row is None:
+                row = self._delta_rows[product_id] = self._delta_size
+                self._delta_ids[row] = product_id
+                self._delta_size += 1
+            self._delta_vectors[row] = vector
+
+    def delete(self, ids) -> None:
+        for product_id in np.asarray(ids, dtype=np.int64).tolist():
+            self._tombstones.add(product_id)
+            row = self._delta_rows.pop(product_id, None)
+            if row is not None:
+                last = self._delta_size - 1
+                if row != last:
+                    moved = int(self._delta_ids[last])
+                    self._delta_ids[row] = moved
+                    self._delta_vectors[row] = self._delta_vectors[last]
+                    self._delta_rows[moved] = row
+                self._delta_size = last
+        self._tombstone_array = None
+
+    def clear(self):
+        """Delete every vector; the trained centroids are kept for future adds."""
+        self.offsets = np.zeros(self.nlist + 1, dtype=np.int64)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.vectors = np.zeros((0, self.dim), dtype=np.float32)
+        self._tombstones = set()
+        self._tombstone_array = None
+        self._delta_rows = {}
+        self._delta_size = 0
+
+    def compact(self):
+        """Fold the delta buffer into the lists and drop tombstoned rows."""
+        if not self._tombstones and not self._delta_size:
+            return
+        if self.nlist == 0:
+            rebuilt = IVFIndex.build(self._delta_ids[:self._delta_size], self._delta_vectors[:self._delta_size],
+                                     nprobe=self.nprobe)
+            self.__dict__.update(rebuilt.__dict__)
+            return
+
+        keep = ~self._tombstone_mask(self.ids)
+        labels = np.repeat(np.arange(self.nlist, dtype=np.int64), np.diff(self.offsets))[keep]
+        ids = self.ids[keep]
+        vectors = self.vectors[keep]
+        if self._delta_size:
+            delta_vectors = self._delta_vectors[:self._delta_size]
+            labels = np.concatenate([labels, _assign(delta_vectors, self.centroids)])
+            ids = np.concatenate([ids, self._delta_ids[:self._delta_size]])
+            vectors = np.concatenate([vectors, delta_vectors])
+
+        order = np.argsort(labels, kind="stable")
+        offsets = np.zeros(self.nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=self.nlist), out=offsets[1:])
+        self.offsets, self.ids, self.vectors = offsets, ids[order], np.ascontiguousarray(vectors[order])
+
+        self._tombstones = set()
+        self._tombstone_array = None
+        self._delta_rows = {}
+        self._delta_size = 0
+
+    # ---------------------
+    # Queries
+    # ---------------------
+    def search(self, query, k: int = 10, nprobe: int | None = None, exclude=()) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k cosine neighbours of one query vector.
+        Returns (ids, scores), best first; ids in 'exclude' are never returned.
+        """
+        q = normalize_rows(query)[0]
+        id_parts, score_parts = [], []
+
+        if self.nlist:
+            nprobe = min(nprobe or self.nprobe, self.nlist)
+            centroid_scores = self.centroids @ q
+            probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe] if nprobe < self.nlist else range(self.nlist)
+            for list_no in probe:
+                start, end = self.offsets[list_no], self.offsets[list_no + 1]
+                if end > start:
+                    id_parts.append(self.ids[start:end])
+                    score_parts.append(self.vectors[start:end] @ q)
+        if id_parts and self._tombstones:
+            ids = np.concatenate(id_parts)
+            keep = ~self._tombstone_mask(ids)
+            id_parts, score_parts = [ids[keep]], [np.concatenate(score_parts)[keep]]
+        if self._delta_size:
+            id_parts.append(self._delta_ids[:self._delta_size])
+            score_parts.append(self._delta_vectors[:self._delta_size] @ q)
+        if not id_parts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        ids = np.concatenate(id_parts)
+        scores = np.concatenate(score_parts)
+        if len(exclude):
+            keep = ~np.isin(ids, np.asarray(list(exclude), dtype=np.int64))
+            ids, scores = ids[keep], scores[keep]
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            ids, scores = ids[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return ids[order], scores[order]
+
+    def get(self, product_id: int) -> np.ndarray | None:
+        """Stored vector for a product id, or None."""
+        row = self._delta_rows.get(product_id)
+        if row is not None:
+            return self._delta_vectors[row]
+        if product_id in self._tombstones:
+            return None
+        rows = np.flatnonzero(self.ids == product_id)
+        return self.vectors[rows[0]] if len(rows) else None
+
+    # ---------------------
+    # Persistence
+    # ---------------------
+    def save(self, root: str) -> str:
+        """
+        Compact, write the arrays to a new version directory under 'root' and point
+        root/CURRENT at it atomically. Returns the version directory.
+        """
+        self.compact()
+        os.makedirs(root, exist_ok=True)
+        version = f"ivf-{time.time_ns()}"
+        directory = os.path.join(root, version)
+        os.makedirs(directory)
+        for name in ("centroids", "offsets", "ids", "vectors"):
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(directory, "meta.json"), "w") as f:
+            json.dump({"dim": self.dim, "nlist": self.nlist, "count": len(self.ids), "nprobe": self.nprobe}, f)
+
+        pointer = os.path.join(root, "CURRENT")
+        with open(pointer + ".tmp", "w") as f:
+            f.write(version)
+        os.replace(pointer + ".tmp", pointer)
+
+        versions = sorted(name for name in os.listdir(root) if name.startswith("ivf-"))
+        for old in versions[:-_KEEP_VERSIONS]:
+            shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+        return directory
+
+    @classmethod
+    def load(cls, root: str, mmap: bool = True) -> "IVFIndex | None":
+        """Load the version root/CURRENT points at, or None if nothing was published."""
+        version = current_version(root)
+        if version is None:
+            return None
+        directory = os.path.join(root, version)
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        mode = "r" if mmap else None
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode if name in ("ids", "vectors") else None)
+            for name in ("centroids", "offsets", "ids", "vectors")
+        }
+        return cls(meta["dim"], nprobe=meta.get("nprobe", 16), **arrays)
+
+    def _grow_delta(self, needed: int):
+        capacity = len(self._delta_ids)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 1024)
+        ids = np.zeros(capacity, dtype=np.int64)
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        ids[:self._delta_size] = self._delta_ids[:self._delta_size]
+        vectors[:self._delta_size] = self._delta_vectors[:self._delta_size]
+        self._delta_ids, self._delta_vectors = ids, vectors
+
+    def _tombstone_mask(self, ids: np.ndarray) -> np.ndarray:
+        if not self._tombstones:
+            return np.zeros(len(ids), dtype=bool)
+        if self._tombstone_array is None:
+            self._tombstone_array = np.fromiter(self._tombstones, dtype=np.int64, count=len(self._tombstones))
+        return np.isin(ids, self._tombstone_array)
+
+
+class SharedIndex:
+    """
+    The latest published IVFIndex under 'root', reloaded (memory-mapped) when a newer
+    version appears. Checks the CURRENT pointer at most every 'check_interval' seconds.
+    """
+
+    def __init__(self, root: str, check_interval: float = 5.0):
+        self.root = root
+        self.check_interval = check_interval
+        self._index = None
+        self._version = None
+        self._checked_at = 0.0
+
+    def get(self) -> IVFIndex | None:
+        now = time.monotonic()
+        if self._index is None or now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            version = current_version(self.root)
+            if version is not None and version != self._version:
+                self._index = IVFIndex.load(self.root)
+                self._version = version
+                logger.info(f"Loaded vector index {version} ({len(self._index)} vectors)")
+        return self._index
+
+
+def current_version(root: str) -> str | None:
+    try:
+        with open(os.path.join(root, "CURRENT")) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Nearest centroid (by dot product) of every vector, in blocks to bound memory."""
+    labels = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), _ASSIGN_BLOCK):
+        labels[start:start + _ASSIGN_BLOCK] = np.argmax(vectors[start:start + _ASSIGN_BLOCK] @ centroids.T, axis=1)
+    return labels
+
+
+def _spherical_kmeans(sample: np.ndarray, nlist: int, iterations: int, rng) -> np.ndarray:
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        labels = _assign(sample, centroids)
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=nlist)
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[filled]
+        centroids[filled] = np.add.reduceat(sample[order], starts, axis=0)
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            # Restart empty lists from random points rather than letting them die
+            centroids[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+        centroids = normalize_rows(centroids)
+    return centroids
@@ -1,13 +1,16 @@
 # services/search/app/main.py (for example)
 from fastapi import FastAPI
+from shared.utils.metrics import instrument
+from .routes.search import router as search_router
 from .utils.elasticsearch import (
+    async_es_client,
     ping_elasticsearch,
     create_index,
-    index_document,
-    search_documents
+    index_document
 )
 
 app = FastAPI()
+instrument(app, "search")
 
 @app.on_event("startup")
 def startup_event():
@@ -19,25 +22,22 @@ def startup_event():
     # Create or verify the index
     create_index(index_name="products")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await async_es_client.close()
+
 @app.post("/index-sample")
 def index_sample_document():
     sample_data = {
-        "title": "Awesome Headphones",
+        "id": 1,
+        "name": "Awesome Headphones",
         "description": "Noise-cancelling wireless headphones with rich bass.",
         "price": 199.99,
-        "tags": ["electronics", "audio", "headphones"]
+        "category": "Electronics > Headphones",
+        "rating": 4.5,
+        "total_reviews": 1200
     }
     response = index_document("products", doc_id="1", body=sample_data)
     return {"result": response["result"], "id": response["_id"]}
 
-@app.get("/search")
-def search_headphones():
-    query = {
-        "query": {
-            "match": {
-                "description": "headphones"
-            }
-        }
-    }
-    results = search_documents("products", query)
-    return results
+app.include_router(search_router)
@@ -0,0 +1,380 @@
+# services/search/app/routes/search.py
+import asyncio
+import base64
+import binascii
+import time
+import orjson
+from elasticsearch import NotFoundError
+from fastapi import APIRouter, HTTPException, Query
+from shared.config.elasticsearch import PRODUCTS_ALIAS
+from shared.config.settings import settings
+from services.recommendation.app.services.embeddings import get_model
+from ..schemas.search import AutocompleteResponse, HybridSearchResponse, ProductHit, SearchResponse
+from ..utils.cache import prefix_cache, search_cache
+from ..utils.elasticsearch import async_es_client
+from ..utils.hybrid import reciprocal_rank_fusion, run_with_budget
+from ..utils.pinecone import get_vector_index
+
+router = APIRouter()
+
+# Fields returned to clients; everything else stays out of _source fetches
+SOURCE_FIELDS = ["id", "name", "price", "category", "rating", "total_reviews", "asin"]
+
+# Completion lookups in flight, so a burst of identical keystrokes shares one ES call
+_pending_suggestions: dict[str, asyncio.Future] = {}
+
+
+@router.get("/search", response_model=SearchResponse)
+async def search_products(
+    q: str | None = None,
+    category: str | None = None,
+    min_price: float | None = Query(None, ge=0),
+    max_price: float | None = Query(None, ge=0),
+    min_rating: float | None = Query(None, ge=0, le=5),
+    size: int = Query(10, ge=1, le=100),
+    cursor: str | None = None,
+    use_cache: bool = True,
+):
+    """
+    Full-text product search with filters.
+
+    Pages are walked with the opaque next_cursor instead of page numbers, so deep pages
+    cost the same as the first one (search_after, no from/size). The first page is a
+    plain search, cached, and its cursor holds only the sort values of its last hit:
+    most clients never ask for page 2, so they never cost a point-in-time. The first
+    cursor page opens a point-in-time snapshot and later cursors carry its id, so pages
+    2 onwards don't shift while a client pages through. Page 1 comes from the live
+    index, so a product written between page 1 and page 2 may be seen by page 2.
+    """
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise HTTPException(status_code=422, detail="min_price must not exceed max_price")
+
+    started = time.perf_counter()
+    params = {
+        "q": q,
+        "category": category,
+        "min_price": min_price,
+        "max_price": max_price,
+        "min_rating": min_rating,
+        "size": size,
+    }
+    # Cursor pages are effectively unique per client; caching them would only churn Redis
+    use_cache = use_cache and cursor is None and settings.search_cache_enabled
+
+    if use_cache:
+        cached = await search_cache.get(params)
+        if cached is not None:
+            search_cache.stats.record("hit", time.perf_counter() - started)
+            return cached
+
+    body = {
+        "query": build_query(q, category, min_price, max_price, min_rating),
+        # id breaks score ties so search_after never skips or repeats a product
+        "sort": [{"_score": "desc"}, {"id": "asc"}] if q else [{"id": "asc"}],
+        "size": size,
+        "source": SOURCE_FIELDS,
+    }
+    if cursor is None:
+        response = await async_es_client.search(index=PRODUCTS_ALIAS, **body)
+        pit_id = None
+        total = response["hits"]["total"]["value"]
+    else:
+        state = _decode_cursor(cursor)
+        response, pit_id = await _search_after(body, state["after"], state.get("pit"))
+        total = None
+
+    hits = response["hits"]["hits"]
+    next_cursor = None
+    if len(hits) == size:
+        state = {"after": hits[-1]["sort"]}
+        if pit_id:
+            state["pit"] = pit_id
+        next_cursor = _encode_cursor(state)
+    elif pit_id:
+        # Last page: release the snapshot now rather than waiting for keep_alive
+        await _close_pit(pit_id)
+
+    result = SearchResponse(
+        total=total,
+        hits=[_to_hit(hit) for hit in hits],
+        next_cursor=next_cursor,
+    ).model_dump()
+
+    if use_cache:
+        await search_cache.set(params, result)
+    search_cache.stats.record("miss" if use_cache else "bypass", time.perf_counter() - started)
+    return result
+
+
+@router.get("/search/stats")
+def search_cache_stats():
+    """
+    Cache hit ratio and p50/p99 latency of cached vs. uncached /search calls
+    served by this process.
+    """
+    return search_cache.stats.report()
+
+
+@router.get("/autocomplete", response_model=AutocompleteResponse)
+async def autocomplete(
+    prefix: str = Query(..., min_length=1, max_length=50),
+    size: int = Query(8, ge=1, le=20),
+):
+    """
+    As-you-type product name suggestions from the name.suggest completion field.
+    Hot prefixes, and extensions of prefixes whose full match list is cached, are
+    served from the in-process prefix cache without touching Elasticsearch.
+    """
+    started = time.perf_counter()
+    key = " ".join(prefix.lower().split())
+    if not key:
+        return AutocompleteResponse(prefix=prefix, suggestions=[])
+
+    suggestions = await prefix_cache.get(key)
+    outcome = "hit"
+    if suggestions is None:
+        outcome = "miss"
+        suggestions = await _suggest(key)
+
+    prefix_cache.stats.record(outcome, time.perf_counter() - started)
+    return AutocompleteResponse(prefix=prefix, suggestions=suggestions[:size])
+
+
+@router.get("/autocomplete/stats")
+def autocomplete_cache_stats():
+    """
+    Prefix cache hit ratio and p50/p99 latency of cached vs. uncached
+    /autocomplete calls served by this process.
+    """
+    return prefix_cache.stats.report()
+
+
+@router.get("/search/hybrid", response_model=HybridSearchResponse)
+async def hybrid_search(
+    q: str = Query(..., min_length=1),
+    category: str | None = None,
+    min_price: float | None = Query(None, ge=0),
+    max_price: float | None = Query(None, ge=0),
+    min_rating: float | None = Query(None, ge=0, le=5),
+    size: int = Query(10, ge=1, le=50),
+    use_cache: bool = True,
+):
+    """
+    Lexical (BM25) and semantic (vector) search run concurrently, each within its own
+    time budget, merged with reciprocal rank fusion. A backend that times out or fails
+    is left out (partial=true) instead of failing the request; the response reports
+    each backend's status and latency.
+    """
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise HTTPException(status_code=422, detail="min_price must not exceed max_price")
+
+    started = time.perf_counter()
+    params = {
+        "mode": "hybrid",
+        "q": q,
+        "category": category,
+        "min_price": min_price,
+        "max_price": max_price,
+        "min_rating": min_rating,
+        "size": size,
+    }
+    use_cache = use_cache and settings.search_cache_enabled
+    if use_cache:
+        cached = await search_cache.get(params)
+        if cached is not None:
+            search_cache.stats.record("hit", time.perf_counter() - started)
+            return cached
+
+    filters = build_filters(category, min_price, max_price, min_rating)
+    candidates = max(size, settings.hybrid_candidates)
+    lexical, vector = await asyncio.gather(
+        run_with_budget(_lexical_candidates(q, filters, candidates), settings.hybrid_lexical_timeout),
+        run_with_budget(_vector_candidates(q, filters, candidates), settings.hybrid_vector_timeout),
+    )
+    outcomes = {"lexical": lexical, "vector": vector}
+    if all(outcome["status"] != "ok" for outcome in outcomes.values()):
+        raise HTTPException(status_code=503, detail={
+            name: outcome.get("error", outcome["status"]) for name, outcome in outcomes.items()
+        })
+
+    fused = reciprocal_rank_fusion(
+        {name: outcome["hits"] for name, outcome in outcomes.items()}, k=settings.hybrid_rrf_k
+    )
+    partial = any(outcome["status"] != "ok" for outcome in outcomes.values())
+    result = HybridSearchResponse(
+        hits=fused[:size],
+        partial=partial,
+        backends={
+            name: {"status": outcome["status"], "took_ms": outcome["took_ms"], "hits": len(outcome["hits"])}
+            for name, outcome in outcomes.items()
+        },
+        took_ms=round((time.perf_counter() - started) * 1000, 3),
+    ).model_dump()
+
+    # Partial results would pin a degraded answer in the cache for its whole TTL
+    if use_cache and not partial:
+        await search_cache.set(params, result)
+    search_cache.stats.record("miss" if use_cache else "bypass", time.perf_counter() - started)
+    return result
+
+
+def build_query(q, category, min_price, max_price, min_rating) -> dict:
+    """
+    bool query: scored multi_match on name/description, everything else as
+    non-scoring (cacheable) filters.
+    """
+    must = [{"multi_match": {"query": q, "fields": ["name^2", "description"]}}] if q else []
+    filters = build_filters(category, min_price, max_price, min_rating)
+    if not must and not filters:
+        return {"match_all": {}}
+    return {"bool": {"must": must, "filter": filters}}
+
+
+def build_filters(category, min_price, max_price, min_rating) -> list[dict]:
+    filters = []
+    if category:
+        filters.append({"term": {"category": category}})
+    price_range = {k: v for k, v in (("gte", min_price), ("lte", max_price)) if v is not None}
+    if price_range:
+        filters.append({"range": {"price": price_range}})
+    if min_rating is not None:
+        filters.append({"range": {"rating": {"gte": min_rating}}})
+    return filters
+
+
+async def _search_after(body: dict, after: list, pit_id: str | None) -> tuple[dict, str]:
+    """
+    Run 'body' from 'after' inside a point in time, opening one on the first cursor
+    page (no pit yet) or if its snapshot has expired. Returns (response, pit id for
+    the next page).
+    """
+    for attempt in range(2):
+        if pit_id is None:
+            pit = await async_es_client.open_point_in_time(
+                index=PRODUCTS_ALIAS, keep_alive=settings.search_pit_keep_alive
+            )
+            pit_id = pit["id"]
+        try:
+            response = await async_es_client.search(
+                pit={"id": pit_id, "keep_alive": settings.search_pit_keep_alive},
+                search_after=after,
+                track_total_hits=False,
+                **body,
+            )
+            # ES may hand back a new id for the same snapshot
+            return response, response.get("pit_id", pit_id)
+        except NotFoundError:
+            if attempt:
+                raise
+            # Client paused longer than keep_alive; continue on a fresh snapshot
+            pit_id = None
+
+
+async def _lexical_candidates(q: str, filters: list[dict], limit: int) -> list[dict]:
+    response = await async_es_client.search(
+        index=PRODUCTS_ALIAS,
+        query={"bool": {"must": [{"multi_match": {"query": q, "fields": ["name^2", "description"]}}], "filter": filters}},
+        size=limit,
+        source=SOURCE_FIELDS,
+        track_total_hits=False,
+    )
+    return [_to_hit(hit).model_dump(exclude={"score"}) for hit in response["hits"]["hits"]]
+
+
+async def _vector_candidates(q: str, filters: list[dict], limit: int) -> list[dict]:
+    """
+    Nearest products to the embedded query, then one ES lookup for their fields. The
+    vector index has no metadata, so filters are applied in that lookup, and extra
+    neighbours are fetched when filtering may drop some.
+    """
+    # Building the model (first call) and embedding can be slow; off the loop, so
+    # hybrid_vector_timeout can cut them short without stalling the lexical leg
+    vector = await asyncio.to_thread(_embed_query, q)
+    top_k = limit * settings.hybrid_filter_overfetch if filters else limit
+    # Index queries are CPU-bound (local) or blocking I/O (Pinecone); keep them off the loop
+    response = await asyncio.to_thread(get_vector_index().query, vector=vector.tolist(), top_k=top_k)
+    ids = [match["id"] for match in response["matches"]]
+    if not ids:
+        return []
+
+    found = await async_es_client.search(
+        index=PRODUCTS_ALIAS,
+        query={"bool": {"filter": [{"ids": {"values": ids}}, *filters]}},
+        size=len(ids),
+        source=SOURCE_FIELDS,
+        track_total_hits=False,
+    )
+    by_id = {hit["_id"]: hit for hit in found["hits"]["hits"]}
+    return [
+        _to_hit(by_id[product_id]).model_dump(exclude={"score"})
+        for product_id in ids
+        if product_id in by_id
+    ][:limit]
+
+
+def _embed_query(q: str):
+    return get_model().embed([q])[0]
+
+
+async def _suggest(prefix: str) -> list[dict]:
+    pending = _pending_suggestions.get(prefix)
+    if pending is None:
+        pending = asyncio.ensure_future(_fetch_suggestions(prefix))
+        _pending_suggestions[prefix] = pending
+        pending.add_done_callback(lambda _: _pending_suggestions.pop(prefix, None))
+    return await asyncio.shield(pending)
+
+
+async def _fetch_suggestions(prefix: str) -> list[dict]:
+    fetch_size = settings.autocomplete_fetch_size
+    response = await async_es_client.search(
+        index=PRODUCTS_ALIAS,
+        size=0,
+        source=["id", "name"],
+        suggest={"names": {
+            "prefix": prefix,
+            "completion": {"field": "name.suggest", "size": fetch_size, "skip_duplicates": True},
+        }},
+    )
+    options = response["suggest"]["names"][0]["options"]
+    suggestions = [
+        {"id": option["_source"].get("id") or int(option["_id"]), "name": option["text"]}
+        for option in options
+    ]
+    prefix_cache.put(prefix, suggestions, complete=len(suggestions) < fetch_size)
+    return suggestions
+
+
+async def _close_pit(pit_id: str):
+    try:
+        await async_es_client.close_point_in_time(id=pit_id)
+    except NotFoundError:
+        pass
+
+
+def _to_hit(hit: dict) -> ProductHit:
+    source = hit["_source"]
+    return ProductHit(
+        id=source.get("id") or int(hit["_id"]),
+        name=source.get("name", ""),
+        price=source.get("price"),
+        category=source.get("category"),
+        rating=source.get("rating"),
+        total_reviews=source.get("total_reviews"),
+        asin=source.get("asin"),
+        score=hit.get("_score"),
+    )
+
+
+def _encode_cursor(state: dict) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps(state)).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> dict:
+    try:
+        state = orjson.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if not isinstance(state.get("after"), list):
+            raise ValueError
+        return state
+    except (binascii.Error, ValueError, AttributeError, orjson.JSONDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -0,0 +1,45 @@
+# services/search/app/schemas/search.py
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+
+class ProductHit(BaseModel):
+    id: int
+    name: str
+    price: Optional[float] = None
+    category: Optional[str] = None
+    rating: Optional[float] = None
+    total_reviews: Optional[int] = None
+    asin: Optional[str] = None
+    score: Optional[float] = None
+
+class SearchResponse(BaseModel):
+    # Only counted on the first page; capped at 10,000 (ES track_total_hits default)
+    total: Optional[int] = None
+    hits: List[ProductHit]
+    # Opaque; pass back as ?cursor= for the next page. None on the last page.
+    next_cursor: Optional[str] = None
+
+class Suggestion(BaseModel):
+    id: int
+    name: str
+
+class AutocompleteResponse(BaseModel):
+    prefix: str
+    suggestions: List[Suggestion]
+
+class HybridHit(ProductHit):
+    # 1-based rank in each backend's results; None if that backend didn't return it
+    lexical_rank: Optional[int] = None
+    vector_rank: Optional[int] = None
+
+class BackendTiming(BaseModel):
+    status: str  # "ok", "timeout" or "error"
+    took_ms: float
+    hits: int
+
+class HybridSearchResponse(BaseModel):
+    hits: List[HybridHit]
+    # True when a backend timed out or failed and its results are missing
+    partial: bool
+    backends: Dict[str, BackendTiming]
+    took_ms: float
@@ -0,0 +1,203 @@
+# services/search/app/utils/cache.py
+"""
+Redis cache for search results.
+
+Keys are built from the products index generation plus a digest of the normalized
+query, filters and pagination. Ingestion bumps the generation after each load
+(shared.config.cache.bump_products_generation), which orphans every cached entry at
+once; orphans simply expire with their TTL. Values are orjson, zlib-compressed when
+that makes them smaller.
+
+PrefixCache is the in-process counterpart for autocomplete: a small LRU of suggestion
+lists that is dropped as a whole when the generation moves.
+"""
+
+import hashlib
+import time
+import zlib
+from collections import OrderedDict, deque
+import orjson
+from redis.exceptions import RedisError
+from shared.config.cache import async_redis_client, PRODUCTS_GENERATION_KEY
+from shared.config.settings import settings
+
+_RAW = b"j"
+_COMPRESSED = b"z"
+_COMPRESS_MIN_BYTES = 512
+
+
+def normalize_params(params: dict, text_fields: tuple = ("q",)) -> dict:
+    """
+    Canonical form of a search request, so equivalent requests share an entry:
+    None values are dropped, and free-text fields are lower-cased with whitespace
+    collapsed (the analyzer does the same). Filters are left exact.
+    """
+    normalized = {}
+    for name, value in params.items():
+        if value is None:
+            continue
+        if name in text_fields and isinstance(value, str):
+            value = " ".join(value.lower().split())
+        normalized[name] = value
+    return normalized
+
+
+class SearchStats:
+    """
+    In-process hit ratio and latency percentiles. Latencies are split into "cached"
+    (hits) and "uncached" (misses plus requests that bypassed the cache); bypasses
+    don't count towards the hit ratio.
+    """
+
+    def __init__(self, window: int = 10_000):
+        self.counts = {"hit": 0, "miss": 0, "bypass": 0}
+        self._latencies = {"cached": deque(maxlen=window), "uncached": deque(maxlen=window)}
+
+    def record(self, outcome: str, seconds: float):
+        """outcome is one of "hit", "miss" or "bypass"."""
+        self.counts[outcome] += 1
+        self._latencies["cached" if outcome == "hit" else "uncached"].append(seconds * 1000)
+
+    def report(self) -> dict:
+        lookups = self.counts["hit"] + self.counts["miss"]
+        return {
+            **self.counts,
+            "hit_ratio": round(self.counts["hit"] / lookups, 4) if lookups else 0.0,
+            "latency_ms": {name: _percentiles(samples) for name, samples in self._latencies.items()},
+        }
+
+
+class IndexGeneration:
+    """
+    The products index generation, re-read from Redis at most every
+    search_cache_generation_refresh seconds to save a round trip per request.
+    """
+
+    def __init__(self, redis=async_redis_client):
+        self.redis = redis
+        self._value = None
+        self._checked_at = 0.0
+
+    async def current(self) -> int:
+        now = time.monotonic()
+        if self._value is None or now - self._checked_at >= settings.search_cache_generation_refresh:
+            self._value = int(await self.redis.get(PRODUCTS_GENERATION_KEY) or 0)
+            self._checked_at = now
+        return self._value
+
+
+class SearchCache:
+    def __init__(self, redis=async_redis_client, ttl: int | None = None, namespace: str = "search"):
+        self.redis = redis
+        self.ttl = ttl or settings.search_cache_ttl
+        self.namespace = namespace
+        self.stats = SearchStats()
+        self.generation = IndexGeneration(redis)
+
+    async def get(self, params: dict):
+        """Cached value for these request params, or None on a miss or Redis error."""
+        try:
+            payload = await self.redis.get(await self._key(params))
+        except RedisError:
+            return None
+        if payload is None:
+            return None
+        body = zlib.decompress(payload[1:]) if payload[:1] == _COMPRESSED else payload[1:]
+        return orjson.loads(body)
+
+    async def set(self, params: dict, value):
+        body = orjson.dumps(value)
+        payload = _RAW + body
+        if len(body) >= _COMPRESS_MIN_BYTES:
+            compressed = zlib.compress(body, 1)
+            if len(compressed) < len(body):
+                payload = _COMPRESSED + compressed
+        try:
+            await self.redis.set(await self._key(params), payload, ex=self.ttl)
+        except RedisError:
+            pass
+
+    async def _key(self, params: dict) -> str:
+        digest = hashlib.sha1(orjson.dumps(normalize_params(params), option=orjson.OPT_SORT_KEYS)).hexdigest()
+        return f"{self.namespace}:{await self.generation.current()}:{digest}"
+
+
+class PrefixCache:
+    """
+    LRU of autocomplete results keyed by normalized prefix, each entry being the
+    top 'fetch_size' suggestions ES returned for it.
+
+    An entry with fewer than fetch_size suggestions is complete: it holds every match
+    for its prefix, so any longer prefix can be answered by filtering it locally.
+    Typing "hea" -> "head" -> "headp" then costs one ES round trip, not three.
+    Entries expire after 'ttl' seconds and are all dropped when the index generation
+    changes.
+    """
+
+    def __init__(self, max_entries: int | None = None, ttl: float | None = None, redis=async_redis_client):
+        self.max_entries = max_entries or settings.autocomplete_cache_size
+        self.ttl = ttl or settings.autocomplete_cache_ttl
+        self.stats = SearchStats()
+        self.generation = IndexGeneration(redis)
+        self._entries = OrderedDict()  # prefix -> (stored_at, complete, suggestions)
+        self._entries_generation = None
+
+    async def get(self, prefix: str):
+        """Suggestions for 'prefix' from this prefix or a complete ancestor, else None."""
+        await self._check_generation()
+        entry = self._fresh(prefix)
+        if entry is not None:
+            return entry[2]
+
+        for cut in range(len(prefix) - 1, 0, -1):
+            ancestor = self._fresh(prefix[:cut])
+            if ancestor is None:
+                continue
+            if not ancestor[1]:
+                # Truncated list; longer prefixes may match products it left out
+                return None
+            suggestions = [s for s in ancestor[2] if s["name"].lower().startswith(prefix)]
+            self.put(prefix, suggestions, complete=True)
+            return suggestions
+        return None
+
+    def put(self, prefix: str, suggestions: list[dict], complete: bool):
+        self._entries[prefix] = (time.monotonic(), complete, suggestions)
+        self._entries.move_to_end(prefix)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _fresh(self, prefix: str):
+        entry = self._entries.get(prefix)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > self.ttl:
+            del self._entries[prefix]
+            return None
+        self._entries.move_to_end(prefix)
+        return entry
+
+    async def _check_generation(self):
+        try:
+            generation = await self.generation.current()
+        except RedisError:
+            # Keep serving; TTL still bounds staleness
+            return
+        if generation != self._entries_generation:
+            self._entries.clear()
+            self._entries_generation = generation
+
+
+def _percentiles(samples) -> dict:
+    if not samples:
+        return {"count": 0, "p50": None, "p99": None}
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "p50": round(ordered[int(0.50 * (len(ordered) - 1))], 3),
+        "p99": round(ordered[int(0.99 * (len(ordered) - 1))], 3),
+    }
+
+
+search_cache = SearchCache()
+prefix_cache = PrefixCache()
@@ -1,17 +1,22 @@
 import os
-from elasticsearch import Elasticsearch
+import re
+import sys
+import time
+from elasticsearch import AsyncElasticsearch, Elasticsearch
+from shared.config.elasticsearch import (
+    PRODUCTS_ALIAS,
+    PRODUCTS_INDEX_VERSION,
+    PRODUCTS_INDEX_SETTINGS,
+    PRODUCTS_MAPPING,
+    BULK_INDEX_SETTINGS,
+    restore_bulk_settings_if_idle,
+    set_dual_write_target,
+)
 
 # Retrieve host and port from environment variables; fallback to localhost:9200 if not set
 ES_HOST = os.getenv("ES_HOST", "localhost")
 ES_PORT = int(os.getenv("ES_PORT", "9200"))
 
-# Initialize the Elasticsearch client
-import os
-from elasticsearch import Elasticsearch
-
-ES_HOST = os.getenv("ES_HOST", "localhost")
-ES_PORT = int(os.getenv("ES_PORT", "9200"))
-
 # Note the "scheme" key explicitly set to "http"
 es_client = Elasticsearch(
     [
@@ -23,6 +28,23 @@ es_client = Elasticsearch(
     ]
 )
 
+# Used by the request handlers; httpx keeps it on the dependencies we already ship
+async_es_client = AsyncElasticsearch(
+    [
+        {
+            "host": ES_HOST,
+            "port": ES_PORT,
+            "scheme": "http"
+        }
+    ],
+    node_class="httpxasync",
+)
+
+_VERSION_IN_NAME = re.compile(r"_v(\d+)_")
+# Seconds between announcing a rebuild to the loaders and starting the copy, so bulk
+# requests sent before they noticed it are in the old index when the copy starts
+DUAL_WRITE_GRACE = 10
+
 
 def ping_elasticsearch() -> bool:
     """
@@ -33,13 +55,157 @@ def ping_elasticsearch() -> bool:
 def create_index(index_name: str):
     """
     Creates an index in Elasticsearch if it doesn't already exist.
+    The "products" index is managed: see ensure_products_index.
     """
+    if index_name == PRODUCTS_ALIAS:
+        ensure_products_index()
+        return
     if not es_client.indices.exists(index=index_name):
         es_client.indices.create(index=index_name)
         print(f"Index '{index_name}' created.")
     else:
         print(f"Index '{index_name}' already exists.")
 
+def products_index_name(version: int = PRODUCTS_INDEX_VERSION) -> str:
+    """
+    Physical index name for a mapping version, e.g. products_v1_20250101120000.
+    The timestamp lets the same version be rebuilt next to the live index.
+    """
+    return f"{PRODUCTS_ALIAS}_v{version}_{time.strftime('%Y%m%d%H%M%S', time.gmtime())}"
+
+def products_indices(es=es_client) -> list[str]:
+    """
+    Physical indexes currently behind the products alias.
+    """
+    if not es.indices.exists_alias(name=PRODUCTS_ALIAS):
+        return []
+    return sorted(es.indices.get_alias(name=PRODUCTS_ALIAS).body)
+
+def ensure_products_index(es=es_client) -> str:
+    """
+    Make sure the products alias points at an index with the managed mapping.
+    - Alias exists: keep it, warn if its mapping version is older than the code's, and
+      restore its refresh/replicas if a dead bulk load left them switched off.
+    - A plain "products" index exists (dynamic mapping from older deployments):
+      copy it into a managed index, then replace it with the alias in one atomic step.
+    - Nothing exists: create a managed index with the alias.
+    Returns the physical index name behind the alias.
+    """
+    current = products_indices(es)
+    if current:
+        index = current[-1]
+        match = _VERSION_IN_NAME.search(index + "_")
+        if match and int(match.group(1)) < PRODUCTS_INDEX_VERSION:
+            print(f"Index '{index}' uses mapping v{match.group(1)}; "
+                  f"run 'python -m services.search.app.utils.elasticsearch reindex' to upgrade.")
+        else:
+            print(f"Index '{index}' already exists behind alias '{PRODUCTS_ALIAS}'.")
+        if restore_bulk_settings_if_idle(es):
+            print(f"Restored refresh/replica settings on '{index}' left by an interrupted bulk load.")
+        return index
+
+    if es.indices.exists(index=PRODUCTS_ALIAS):
+        index = _build_products_index(es, source=PRODUCTS_ALIAS)
+        es.indices.update_aliases(actions=[
+            {"add": {"index": index, "alias": PRODUCTS_ALIAS, "is_write_index": True}},
+            {"remove_index": {"index": PRODUCTS_ALIAS}},
+        ])
+        print(f"Migrated legacy index '{PRODUCTS_ALIAS}' to '{index}'.")
+        return index
+
+    index = products_index_name()
+    es.indices.create(
+        index=index,
+        settings=PRODUCTS_INDEX_SETTINGS,
+        mappings=PRODUCTS_MAPPING,
+        aliases={PRODUCTS_ALIAS: {"is_write_index": True}},
+    )
+    print(f"Index '{index}' created behind alias '{PRODUCTS_ALIAS}'.")
+    return index
+
+def reindex_products(es=es_client, delete_old: bool = True) -> str:
+    """
+    Rebuild the products index with the current mapping and swap the alias to it
+    atomically; searches never see a missing or half-built index.
+
+    Ingestion keeps running. While the copy runs, loaders write every document to the
+    new index as well (shared.config.elasticsearch.dual_write_target), and the copy
+    only creates documents the new index doesn't have yet, so a product written during
+    the rebuild keeps its newest version.
+    Returns the new physical index name.
+    """
+    old = products_indices(es)
+    if not old:
+        return ensure_products_index(es)
+
+    index = _create_bulk_index(es)
+    set_dual_write_target(PRODUCTS_ALIAS, index)
+    try:
+        time.sleep(DUAL_WRITE_GRACE)
+        _copy_into(es, PRODUCTS_ALIAS, index, op_type="create")
+        actions = [{"remove": {"index": name, "alias": PRODUCTS_ALIAS}} for name in old]
+        actions.append({"add": {"index": index, "alias": PRODUCTS_ALIAS, "is_write_index": True}})
+        es.indices.update_aliases(actions=actions)
+    except Exception:
+        set_dual_write_target(PRODUCTS_ALIAS, None)
+        es.indices.delete(index=index)
+        raise
+    # Writes through the alias now land in the new index
+    set_dual_write_target(PRODUCTS_ALIAS, None)
+    print(f"Alias '{PRODUCTS_ALIAS}' now points at '{index}' (was {', '.join(old)}).")
+
+    if delete_old:
+        es.indices.delete(index=",".join(old))
+    return index
+
+def _build_products_index(es, source: str) -> str:
+    """
+    Create a managed index and copy 'source' into it at bulk speed: refresh and
+    replicas stay off during the copy and are restored before it goes live.
+    """
+    index = _create_bulk_index(es)
+    try:
+        _copy_into(es, source, index)
+    except Exception:
+        es.indices.delete(index=index)
+        raise
+    return index
+
+def _create_bulk_index(es) -> str:
+    """A new managed index, with refresh and replicas off until _copy_into finishes."""
+    index = products_index_name()
+    es.indices.create(
+        index=index,
+        settings={**PRODUCTS_INDEX_SETTINGS, **BULK_INDEX_SETTINGS},
+        mappings=PRODUCTS_MAPPING,
+    )
+    return index
+
+def _copy_into(es, source: str, index: str, op_type: str = "index"):
+    """
+    Copy every document of 'source' into 'index', then restore the index's managed
+    refresh/replica settings. With op_type="create", documents already in 'index'
+    are left as they are.
+    """
+    # Loads may have refreshes switched off; the copy only sees refreshed documents
+    es.indices.refresh(index=source)
+    result = es.options(request_timeout=3600).reindex(
+        source={"index": source},
+        dest={"index": index, "op_type": op_type},
+        conflicts="proceed" if op_type == "create" else None,
+        slices="auto",
+        wait_for_completion=True,
+    )
+    if result.get("failures"):
+        raise RuntimeError(f"Reindex into '{index}' failed: {result['failures'][:5]}")
+
+    es.indices.put_settings(index=index, settings={"index": {
+        "refresh_interval": PRODUCTS_INDEX_SETTINGS["refresh_interval"],
+        "number_of_replicas": PRODUCTS_INDEX_SETTINGS["number_of_replicas"],
+    }})
+    es.indices.refresh(index=index)
+    print(f"Copied {result.get('created', 0) + result.get('updated', 0)} documents from '{source}' into '{index}'.")
+
 def index_document(index_name: str, doc_id: str, body: dict):
     """
     Index (insert or update) a single document in Elasticsearch.
@@ -53,3 +219,12 @@ def search_documents(index_name: str, query: dict) -> dict:
     """
     response = es_client.search(index=index_name, body=query)
     return response
+
+
+if __name__ == "__main__":
+    # python -m services.search.app.utils.elasticsearch [ensure|reindex]
+    command = sys.argv[1] if len(sys.argv) > 1 else "ensure"
+    if command == "reindex":
+        reindex_products()
+    else:
+        ensure_products_index()
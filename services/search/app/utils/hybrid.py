@@ -0,0 +1,44 @@
+# services/search/app/utils/hybrid.py
+"""
+Helpers for hybrid (lexical + vector) search: running each backend under its own time
+budget, and merging their ranked lists with reciprocal rank fusion.
+"""
+
+import asyncio
+import time
+
+
+async def run_with_budget(coro, timeout: float) -> dict:
+    """
+    Await 'coro' for at most 'timeout' seconds without ever raising.
+    Returns {"status": "ok" | "timeout" | "error", "took_ms", "hits": list, "error"?}.
+    """
+    started = time.perf_counter()
+    try:
+        hits = await asyncio.wait_for(coro, timeout)
+        outcome = {"status": "ok", "hits": hits}
+    except asyncio.TimeoutError:
+        outcome = {"status": "timeout", "hits": []}
+    except Exception as e:
+        outcome = {"status": "error", "hits": [], "error": str(e)}
+    outcome["took_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return outcome
+
+
+def reciprocal_rank_fusion(ranked: dict[str, list[dict]], k: int = 60, weights: dict | None = None) -> list[dict]:
+    """
+    Merge ranked hit lists (dicts with an "id") from several backends:
+    score(doc) = sum over backends of weight / (k + rank), ranks starting at 1.
+    Returns one dict per distinct id, best first, with "score" set to the fused score
+    and "<backend>_rank" set for every backend that returned it.
+    """
+    fused = {}
+    for backend, hits in ranked.items():
+        weight = (weights or {}).get(backend, 1.0)
+        for rank, hit in enumerate(hits, start=1):
+            entry = fused.get(hit["id"])
+            if entry is None:
+                entry = fused[hit["id"]] = {**hit, "score": 0.0}
+            entry["score"] += weight / (k + rank)
+            entry[f"{backend}_rank"] = rank
+    return sorted(fused.values(), key=lambda hit: (-hit["score"], hit["id"]))
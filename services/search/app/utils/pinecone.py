@@ -0,0 +1,107 @@
+# services/search/app/utils/pinecone.py
+"""
+Vector index backends behind one Pinecone-shaped interface.
+
+get_vector_index() returns either a real Pinecone Index (VECTOR_BACKEND=pinecone) or a
+LocalVectorIndex over the in-process IVF index from the recommendation service. Callers
+only use the subset both support: upsert, query, fetch, delete and describe_index_stats,
+with string ids, and dict-style access to the responses (response["matches"], ...).
+
+The local backend stores no metadata, so query(filter=...) is rejected there.
+"""
+
+import numpy as np
+from shared.config.settings import settings
+from services.recommendation.app.utils.semantic_search import IVFIndex, SharedIndex
+
+
+class LocalVectorIndex:
+    def __init__(self, shared: SharedIndex | None = None, dim: int | None = None):
+        self.shared = shared or SharedIndex(settings.vector_index_path)
+        self.dim = dim or settings.embedding_dim
+        self._empty = None
+
+    @property
+    def index(self) -> IVFIndex:
+        index = self.shared.get()
+        if index is None:
+            # Nothing published yet: accept writes into an empty in-memory index
+            if self._empty is None:
+                self._empty = IVFIndex(self.dim, nprobe=settings.vector_nprobe)
+            index = self._empty
+        return index
+
+    def upsert(self, vectors, namespace: str | None = None) -> dict:
+        """vectors: (id, values[, metadata]) tuples or {"id", "values"} dicts."""
+        ids, values = [], []
+        for item in vectors:
+            if isinstance(item, dict):
+                item_id, item_values = item["id"], item["values"]
+            else:
+                item_id, item_values = item[0], item[1]
+            ids.append(int(item_id))
+            values.append(item_values)
+        if ids:
+            self.index.add(ids, np.asarray(values, dtype=np.float32))
+        return {"upserted_count": len(ids)}
+
+    def query(self, vector=None, id: str | None = None, top_k: int = 10, include_values: bool = False,
+              include_metadata: bool = False, filter: dict | None = None, namespace: str | None = None) -> dict:
+        if filter:
+            raise ValueError("The local vector index does not support metadata filters")
+        index = self.index
+        exclude = ()
+        if vector is None:
+            if id is None:
+                raise ValueError("query() needs a vector or an id")
+            vector = index.get(int(id))
+            if vector is None:
+                return {"matches": [], "namespace": namespace or ""}
+            exclude = (int(id),)
+
+        ids, scores = index.search(np.asarray(vector, dtype=np.float32), k=top_k, exclude=exclude)
+        matches = []
+        for product_id, score in zip(ids.tolist(), scores.tolist()):
+            match = {"id": str(product_id), "score": score}
+            if include_values:
+                match["values"] = index.get(product_id).tolist()
+            if include_metadata:
+                match["metadata"] = {}
+            matches.append(match)
+        return {"matches": matches, "namespace": namespace or ""}
+
+    def fetch(self, ids: list[str], namespace: str | None = None) -> dict:
+        vectors = {}
+        for item_id in ids:
+            vector = self.index.get(int(item_id))
+            if vector is not None:
+                vectors[item_id] = {"id": item_id, "values": vector.tolist()}
+        return {"vectors": vectors, "namespace": namespace or ""}
+
+    def delete(self, ids: list[str] | None = None, delete_all: bool = False, namespace: str | None = None) -> dict:
+        if delete_all:
+            self.index.clear()
+        elif ids:
+            self.index.delete([int(item_id) for item_id in ids])
+        return {}
+
+    def describe_index_stats(self) -> dict:
+        count = len(self.index)
+        return {"dimension": self.dim, "total_vector_count": count, "namespaces": {"": {"vector_count": count}}}
+
+
+_vector_index = None
+
+
+def get_vector_index():
+    """The configured vector backend (process-wide singleton)."""
+    global _vector_index
+    if _vector_index is None:
+        if settings.vector_backend == "pinecone":
+            from pinecone import Pinecone
+            _vector_index = Pinecone(api_key=settings.pinecone_api_key).Index(settings.pinecone_index)
+        elif settings.vector_backend == "local":
+            _vector_index = LocalVectorIndex()
+        else:
+            raise ValueError(f"Unknown vector backend '{settings.vector_backend}', expected 'local' or 'pinecone'")
+    return _vector_index
@@ -1,11 +1,18 @@
 # shared/config/cache.py
 import os
 import redis
+import redis.asyncio
 
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
 
 redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
+# Binary-safe async client for compact cached payloads
+async_redis_client = redis.asyncio.Redis(host=REDIS_HOST, port=REDIS_PORT)
+
+# Bumped by ingestion after every load that changes the products index;
+# cached search results embed it in their keys, so a bump invalidates them all at once
+PRODUCTS_GENERATION_KEY = "products:index_generation"
 
 def ping_cache():
     try:
@@ -13,3 +20,14 @@ def ping_cache():
     except Exception as e:
         print(f"Redis connection error: {e}")
         return False
+
+def bump_products_generation() -> int | None:
+    """
+    Invalidate cached search results after the products index changed.
+    Returns the new generation, or None if Redis is unavailable.
+    """
+    try:
+        return redis_client.incr(PRODUCTS_GENERATION_KEY)
+    except Exception as e:
+        print(f"Redis connection error: {e}")
+        return None
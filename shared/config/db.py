@@ -1,30 +1,58 @@
 # shared/config/db.py
-import os
-from sqlalchemy import create_engine, text, event
+"""
+Database engines and sessions shared by every service, configured from settings.
+
+Each process gets one sync engine (psycopg2), for Celery tasks and scripts, and one
+async engine (asyncpg), for FastAPI routes that await their queries instead of holding a
+threadpool slot. Engines connect lazily, so importing this module opens no connection.
+A SQLite DATABASE_URL (tests, benchmarks) gets aiosqlite as its async driver.
+Pool sizes apply per engine per process; a service can get its own pool size through
+db_service_pool_sizes[service_name].
+"""
+
+from sqlalchemy import URL, create_engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.pool import NullPool
-from urllib.parse import quote_plus
-
-# Database connection settings
-DB_USER = os.getenv("DB_USER", "thumbsy_user")
-DB_PASSWORD = os.getenv("DB_PASSWORD", "Matt.4483")
-DB_HOST = os.getenv("DB_HOST", "localhost")
-DB_PORT = os.getenv("DB_PORT", "5432")
-DB_NAME = os.getenv("DB_NAME", "thumbsy_db")
-
-# Include options in the connection URLs
-DATABASE_URL = (
-    f"postgresql://{DB_USER}:{quote_plus(DB_PASSWORD)}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-)
+from .settings import settings
 
-print(f"Attempting to connect to database: {DATABASE_URL}")
+_ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def database_url(asynchronous: bool = False) -> URL:
+    if settings.database_url:
+        url = make_url(settings.database_url)
+    else:
+        url = URL.create(
+            "postgresql",
+            username=settings.db_user,
+            password=settings.db_password,
+            host=settings.db_host,
+            port=settings.db_port,
+            database=settings.db_name,
+        )
+    if asynchronous:
+        url = url.set(drivername=_ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+        if url.drivername == "postgresql+asyncpg":
+            url = url.update_query_dict({"prepared_statement_cache_size": str(settings.db_statement_cache_size)})
+    return url
+
+
+def _engine_options(url: URL) -> dict:
+    options = {"echo": settings.db_echo, "pool_pre_ping": True}
+    if url.get_backend_name() != "sqlite":
+        options.update(
+            pool_size=settings.db_service_pool_sizes.get(settings.service_name, settings.db_pool_size),
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+        )
+    if url.drivername == "postgresql+asyncpg":
+        options["connect_args"] = {"statement_cache_size": settings.db_statement_cache_size}
+    return options
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,
-    echo=True,
-)
+
+_url = database_url()
+engine = create_engine(_url, **_engine_options(_url))
 
 # Create session factory
 SessionLocal = sessionmaker(
@@ -32,6 +60,15 @@ SessionLocal = sessionmaker(
     expire_on_commit=False
 )
 
+_async_url = database_url(asynchronous=True)
+async_engine = create_async_engine(_async_url, **_engine_options(_async_url))
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+)
+
 # Database dependency
 def get_db():
     db = SessionLocal()
@@ -39,3 +76,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Async database dependency: one session per request, closed (connection returned) after it
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
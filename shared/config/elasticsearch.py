@@ -1,7 +1,11 @@
 # shared/config/elasticsearch.py
 
 import os
+import uuid
+from contextlib import contextmanager
 from elasticsearch import Elasticsearch
+from .cache import redis_client
+from .settings import settings
 
 # Environment variables, with defaults for local development
 ES_HOST = os.getenv("ES_HOST", "localhost")
@@ -27,3 +31,172 @@ def ping_elasticsearch() -> bool:
         return es_client.ping()
     except Exception:
         return False
+
+
+# ---------------------
+# Managed "products" index
+# ---------------------
+# Readers and writers always go through the alias; physical indexes are named
+# products_v<version>_<timestamp> so a new mapping can be built next to the old one
+# and swapped in atomically (see services/search/app/utils/elasticsearch.py).
+PRODUCTS_ALIAS = "products"
+PRODUCTS_INDEX_VERSION = 3
+
+PRODUCTS_INDEX_SETTINGS = {
+    "number_of_shards": settings.es_products_shards,
+    "number_of_replicas": settings.es_products_replicas,
+    "refresh_interval": "1s",
+    "analysis": {
+        "analyzer": {
+            # Whole name, lower-cased: completion prefixes then behave exactly like
+            # name.lower().startswith(prefix), which the autocomplete cache relies on
+            "name_prefix": {"type": "custom", "tokenizer": "keyword", "filter": ["lowercase"]},
+        },
+    },
+}
+
+# Settings applied for the duration of a large load (see bulk_indexing)
+BULK_INDEX_SETTINGS = {"refresh_interval": "-1", "number_of_replicas": 0}
+
+PRODUCTS_MAPPING = {
+    # Unknown fields are kept in _source but not indexed
+    "dynamic": False,
+    "properties": {
+        "id": {"type": "integer"},  # database id; unique sort tiebreaker
+        "asin": {"type": "keyword", "doc_values": False},
+        "name": {
+            "type": "text",
+            "fields": {"suggest": {"type": "completion", "analyzer": "name_prefix"}},
+        },
+        "description": {"type": "text"},
+        "price": {"type": "scaled_float", "scaling_factor": 100},
+        "category": {"type": "keyword"},
+        "rating": {"type": "half_float"},
+        "total_reviews": {"type": "integer"},
+        # BulkLoader.popularity_score; sorts and boosts by popularity (added in v3)
+        "popularity_score": {"type": "float"},
+        "content_hash": {"type": "keyword", "index": False, "doc_values": False},
+    },
+}
+
+
+# While reindex_products rebuilds the index behind an alias: the new physical index,
+# which loaders write to as well (see dual_write_target)
+DUAL_WRITE_KEY = "es:dual_write:{alias}"
+
+# Loads currently holding the bulk settings: sorted set of token -> lease deadline
+BULK_HOLDERS_KEY = "es:bulk_indexing:{alias}"
+
+# ARGV: token ('' to only count), lease seconds (0 drops the token).
+# Drops expired leases first; returns the number of live ones.
+_HOLDERS = redis_client.register_script("""
+local now = tonumber(redis.call('TIME')[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+local lease = tonumber(ARGV[2])
+if ARGV[1] ~= '' then
+    if lease > 0 then
+        redis.call('ZADD', KEYS[1], now + lease, ARGV[1])
+        redis.call('EXPIRE', KEYS[1], lease)
+    else
+        redis.call('ZREM', KEYS[1], ARGV[1])
+    end
+end
+return redis.call('ZCARD', KEYS[1])
+""")
+
+
+@contextmanager
+def bulk_indexing(es=es_client, alias: str = PRODUCTS_ALIAS):
+    """
+    Switch the index behind 'alias' to bulk-friendly settings (no refresh, no replicas)
+    for the duration of the block, then restore the managed settings and refresh.
+
+    Each load holds a lease in Redis (BULK_HOLDERS_KEY) that expires after
+    es_bulk_lease_seconds unless renewed with the callable this yields; the settings
+    are restored when the last live lease is released. A worker that dies mid-load
+    leaves only an expiring lease, and restore_bulk_settings_if_idle() (beat schedule,
+    ensure_products_index) restores the settings once no lease is live.
+    Without Redis each block manages the settings itself.
+    """
+    key = BULK_HOLDERS_KEY.format(alias=alias)
+    token = uuid.uuid4().hex
+    lease = settings.es_bulk_lease_seconds
+    try:
+        holders = _HOLDERS(keys=[key], args=[token, lease])
+    except Exception as e:
+        print(f"Redis connection error: {e}")
+        holders = None
+
+    def renew():
+        if holders is None:
+            return
+        try:
+            _HOLDERS(keys=[key], args=[token, lease])
+        except Exception as e:
+            print(f"Redis connection error: {e}")
+
+    if holders in (None, 1):
+        es.indices.put_settings(index=alias, settings={"index": BULK_INDEX_SETTINGS})
+    try:
+        yield renew
+    finally:
+        try:
+            remaining = _HOLDERS(keys=[key], args=[token, 0]) if holders is not None else 0
+        except Exception as e:
+            print(f"Redis connection error: {e}")
+            remaining = 0
+        if remaining <= 0:
+            _restore_index_settings(es, alias)
+
+
+def restore_bulk_settings_if_idle(es=es_client, alias: str = PRODUCTS_ALIAS) -> bool:
+    """
+    Restore the managed refresh/replica settings if the index behind 'alias' still
+    has bulk settings but no load holds a live lease (its worker died mid-load).
+    Returns True if the settings were restored.
+    """
+    try:
+        holders = _HOLDERS(keys=[BULK_HOLDERS_KEY.format(alias=alias)], args=["", 0])
+    except Exception as e:
+        print(f"Redis connection error: {e}")
+        return False
+    if holders:
+        return False
+    current = es.indices.get_settings(index=alias, name="index.refresh_interval").body
+    if not any(
+        body["settings"].get("index", {}).get("refresh_interval") == BULK_INDEX_SETTINGS["refresh_interval"]
+        for body in current.values()
+    ):
+        return False
+    _restore_index_settings(es, alias)
+    return True
+
+
+def dual_write_target(alias: str = PRODUCTS_ALIAS) -> str | None:
+    """The index being rebuilt behind 'alias', which writes must also go to, if any."""
+    try:
+        return redis_client.get(DUAL_WRITE_KEY.format(alias=alias))
+    except Exception as e:
+        print(f"Redis connection error: {e}")
+        return None
+
+
+def set_dual_write_target(alias: str, index: str | None):
+    """Start (index) or stop (None) sending writes for 'alias' to 'index' too."""
+    key = DUAL_WRITE_KEY.format(alias=alias)
+    if index is None:
+        redis_client.delete(key)
+    else:
+        # Outlives the reindex request (1 h timeout); a crashed rebuild stops the extra writes
+        redis_client.set(key, index, ex=2 * 60 * 60)
+
+
+def _restore_index_settings(es, alias: str):
+    es.indices.put_settings(
+        index=alias,
+        settings={"index": {
+            "refresh_interval": PRODUCTS_INDEX_SETTINGS["refresh_interval"],
+            "number_of_replicas": PRODUCTS_INDEX_SETTINGS["number_of_replicas"],
+        }},
+    )
+    es.indices.refresh(index=alias)
@@ -0,0 +1,152 @@
+# shared/config/settings.py
+import os
+import tempfile
+from pydantic_settings import BaseSettings
+
+
+class Settings(BaseSettings):
+    """
+    Runtime configuration shared by every service.
+    Each field can be overridden with an environment variable of the same name
+    (case-insensitive), e.g. SCRAPER_CONCURRENCY=20.
+    """
+
+    # Database (Postgres)
+    db_user: str = "thumbsy_user"
+    db_password: str = "Matt.4483"
+    db_host: str = "localhost"
+    db_port: int = 5432
+    db_name: str = "thumbsy_db"
+    database_url: str | None = None         # full DSN; overrides the db_* parts above
+    db_echo: bool = False                   # log every SQL statement
+    db_pool_size: int = 5                   # connections kept open per engine (per process)
+    db_max_overflow: int = 10               # extra connections allowed under load
+    db_pool_timeout: float = 30.0           # seconds to wait for a free connection
+    db_pool_recycle: int = 1800             # seconds before a connection is replaced
+    db_statement_cache_size: int = 100      # asyncpg prepared statements per connection; 0 behind pgbouncer
+    service_name: str = ""                  # which entry of db_service_pool_sizes applies
+    db_service_pool_sizes: dict[str, int] = {}  # per-service pool_size, e.g. {"ingestion": 20}
+
+    # Web scraping
+    scraper_concurrency: int = 10           # requests in flight per scrape call
+    scraper_per_host_concurrency: int = 4   # requests in flight per host
+    scraper_timeout: float = 10.0           # seconds, per request
+    scraper_parser_backend: str = "lxml"    # see services/ingestion/app/etl/extractors.py
+    scraper_amazon_base_url: str = "https://www.amazon.com"  # e.g. a local fixture server in benchmarks
+
+    # Partner API feeds (APIFetcher)
+    api_fetch_page_size: int = 100          # for offset pagination
+    api_fetch_prefetch: int = 4             # pages fetched ahead of the consumer
+    api_fetch_retries: int = 3              # per page, on transport errors, 429 and 5xx
+
+    # Streamed batch ingestion (claim-check chunks)
+    ingest_chunk_size: int = 1000           # records per spooled chunk / load task
+    ingest_spool_backend: str = "redis"     # "redis" or "local" (directory shared with workers)
+    ingest_spool_path: str = os.path.join(tempfile.gettempdir(), "thumbsy", "ingest-spool")
+    ingest_spool_ttl: int = 24 * 60 * 60    # seconds a Redis chunk waits for its task
+    ingest_max_line_bytes: int = 1024 * 1024
+
+    # Cluster-wide scrape rate limit (Redis token bucket per host and proxy, AIMD)
+    scraper_rate_limit_enabled: bool = True
+    scraper_rate_initial: float = 2.0           # requests/s for a host not seen in the last hour
+    scraper_rate_min: float = 0.2
+    scraper_rate_max: float = 50.0
+    scraper_rate_burst: float = 5.0             # tokens a bucket can save up
+    scraper_rate_increase: float = 0.2          # requests/s gained per second of clean responses
+    scraper_rate_decrease: float = 0.7          # rate multiplier on a block page, 429 or 503
+    scraper_rate_backoff_interval: float = 5.0  # seconds; blocks within it count once
+    scraper_proxy: str | None = None            # outbound proxy URL for this worker
+
+    # Pooled HTTP client (one per worker process)
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0     # seconds an idle connection is kept open
+    http_http2: bool = False                # requires the h2 package
+
+    # Celery ingestion pipeline
+    celery_broker_url: str = "redis://localhost:6379/0"
+    celery_result_backend: str = "redis://localhost:6379/0"
+    ingest_asin_chunk_size: int = 20        # ASINs per scrape task in the fan-out
+    # "scrape" workers: I/O-bound, many slots, each task also fetches concurrently
+    celery_scrape_pool: str = "threads"
+    celery_scrape_concurrency: int = 8
+    celery_scrape_prefetch: int = 4         # tasks reserved per slot
+    # "load" workers: DB/ES-bound, few slots so loads don't contend for locks/connections
+    celery_load_pool: str = "prefork"
+    celery_load_concurrency: int = 2
+    celery_load_prefetch: int = 1
+    # "celery" (default queue) workers: periodic jobs such as the similar-products refresh
+    celery_default_pool: str = "prefork"
+    celery_default_concurrency: int = 1
+    celery_default_prefetch: int = 1
+
+    # On-disk cache for scraped pages
+    scraper_cache_enabled: bool = False
+    scraper_cache_path: str = os.path.join(tempfile.gettempdir(), "thumbsy", "http-cache.sqlite3")
+    scraper_cache_max_bytes: int = 512 * 1024 * 1024
+    scraper_cache_ttl: float = 6 * 60 * 60  # seconds before an entry is revalidated
+
+    # Search result cache (Redis)
+    search_cache_enabled: bool = True
+    search_cache_ttl: int = 300             # seconds
+    search_cache_generation_refresh: float = 1.0  # seconds between index generation checks
+
+    # Search pagination
+    search_pit_keep_alive: str = "1m"  # point-in-time lifetime between cursor pages
+
+    # Hybrid search
+    hybrid_lexical_timeout: float = 0.3  # seconds
+    hybrid_vector_timeout: float = 0.2   # seconds, including the ES lookup of the hits
+    hybrid_candidates: int = 50          # hits taken from each backend before fusion
+    hybrid_filter_overfetch: int = 4     # extra vector hits fetched when filters apply
+    hybrid_rrf_k: int = 60
+
+    # Autocomplete (in-process prefix cache)
+    autocomplete_fetch_size: int = 50      # suggestions fetched and cached per prefix
+    autocomplete_cache_size: int = 10_000  # prefixes kept per process
+    autocomplete_cache_ttl: float = 60.0   # seconds
+
+    # Elasticsearch products index
+    es_products_shards: int = 1
+    es_products_replicas: int = 1
+    es_bulk_settings_threshold: int = 5000  # loads at least this big disable refresh/replicas
+    es_bulk_lease_seconds: int = 10 * 60    # a load's hold on those settings; renewed every chunk
+
+
+    # Recommendation embeddings
+    embedding_model: str = "hashing"
+    embedding_dim: int = 256
+    embedding_batch_size: int = 4096
+    embedding_store_path: str = os.path.join(tempfile.gettempdir(), "thumbsy", "embeddings")
+
+
+    # Vector index
+    vector_backend: str = "local"  # "local" (in-process IVF) or "pinecone"
+    vector_index_path: str = os.path.join(tempfile.gettempdir(), "thumbsy", "vector-index")
+    vector_nprobe: int = 16        # IVF lists scanned per query
+    pinecone_api_key: str | None = None
+    pinecone_index: str = "products"
+
+
+    # Similar-products job
+    recommend_top_k: int = 20
+    recommend_refresh_interval: float = 15 * 60  # seconds between incremental runs
+    recommend_query_block: int = 1024            # products per neighbour computation tile
+    recommend_corpus_block: int = 32_768         # (1024 x 32768 float32 tile = 128 MB)
+    recommend_neighbours_path: str = os.path.join(tempfile.gettempdir(), "thumbsy", "neighbours")
+
+
+    # Auth password hashing
+    auth_bcrypt_rounds: int = 12
+    auth_hash_workers: int = 0        # hashing processes; 0 means one per CPU
+    auth_hash_max_pending: int = 64   # hashes queued or running before logins get 503
+
+    # Access token verification
+    auth_token_cache_size: int = 10_000         # verified tokens kept per process
+    auth_token_cache_ttl: float = 300.0         # seconds; entries also never outlive the token's exp
+    auth_revocation_capacity: int = 100_000     # revoked tokens the local bloom filter is sized for
+    auth_revocation_error_rate: float = 0.001   # bloom false positives (each costs a Redis lookup)
+    auth_revocation_refresh: float = 1.0        # seconds between revocation list version checks
+
+
+settings = Settings()
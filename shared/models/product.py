@@ -1,12 +1,41 @@
 # shared/models/product.py
-from sqlalchemy import Column, Integer, String, Float
+# The table is created and changed by the Alembic migrations in migrations/versions;
+# keep this model in step with them (alembic revision --autogenerate shows any drift).
+from sqlalchemy import Column, DateTime, Float, Index, Integer, String, func
 from .base import Base
 
 class Product(Base):
     __tablename__ = "products"
 
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True, nullable=False)
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
     description = Column(String, nullable=True)
     price = Column(Float, nullable=True)
     category = Column(String, nullable=True)
+    rating = Column(Float, nullable=True)
+    total_reviews = Column(Integer, nullable=True)
+    # rating weighted by the review count (BulkLoader.popularity_score), for "most popular" sorts
+    popularity_score = Column(Float, nullable=True)
+    # Natural key from the source (Amazon ASIN); NULL for feeds that don't provide one
+    asin = Column(String, nullable=True)
+    # sha256 of the cleaned fields, used to skip writes when a product hasn't changed
+    content_hash = Column(String(64), nullable=True)
+    # Last insert or content change (unchanged re-scrapes don't touch it)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        # Upsert key (ON CONFLICT (asin)); NULLs don't collide
+        Index("ix_products_asin", asin, unique=True),
+        # Category browsing, filtered or sorted by price, rating or popularity
+        # (B-trees scan both ways, so these also serve the DESC sorts)
+        Index("ix_products_category_price", category, price),
+        Index("ix_products_category_rating", category, rating),
+        Index("ix_products_category_popularity", category, popularity_score),
+        # "Most popular" across every category
+        Index("ix_products_popularity", popularity_score),
+        # Name lookups: ILIKE '%...%', similarity() and equality (needs the pg_trgm extension)
+        Index(
+            "ix_products_name_trgm", name,
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
@@ -1,5 +1,6 @@
 # shared/security/jwt.py
 import os
+import uuid
 import jwt
 from datetime import datetime, timedelta
 
@@ -9,6 +10,7 @@ ALGORITHM = "HS256"
 def create_access_token(data: dict, expires_delta: timedelta = timedelta(minutes=15)):
     to_encode = data.copy()
     expire = datetime.utcnow() + expires_delta
-    to_encode.update({"exp": expire})
+    # jti identifies the token in the revocation list
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
@@ -1,13 +1,56 @@
 # shared/security/oauth2.py
+import time
 import jwt
-from fastapi import HTTPException, status
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from redis.exceptions import RedisError
+from shared.config.settings import settings
 from .jwt import SECRET_KEY, ALGORITHM
+from .revocation import RevocationList
+from .token_cache import TokenCache, token_digest
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+
+token_cache = TokenCache()
+revocations = RevocationList()
 
 def verify_access_token(token: str):
+    """
+    Decoded claims of a valid token. Verified tokens are cached until their exp, so
+    repeat calls skip the signature check; treat the returned dict as read-only.
+    Does not check revocation, use get_current_claims for that.
+    """
+    digest = token_digest(token)
+    payload = token_cache.get(digest)
+    if payload is not None:
+        return payload
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload  # e.g., user_id
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    token_cache.put(digest, payload)
+    return payload  # e.g., user_id
+
+def _revocation_id(token: str, payload: dict) -> str:
+    # Tokens issued before jti was added are revoked by digest
+    return payload.get("jti") or token_digest(token).hex()
+
+async def get_current_claims(token: str = Depends(oauth2_scheme)) -> dict:
+    """FastAPI dependency: claims of the request's bearer token, if valid and not revoked."""
+    payload = verify_access_token(token)
+    try:
+        revoked = await revocations.is_revoked(_revocation_id(token, payload))
+    except RedisError:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Cannot check token revocation")
+    if revoked:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked")
+    return payload
+
+async def revoke_access_token(token: str):
+    """Reject 'token' in every service from now on (within auth_revocation_refresh)."""
+    payload = verify_access_token(token)
+    expires_at = payload.get("exp", time.time() + settings.auth_token_cache_ttl)
+    await revocations.revoke(_revocation_id(token, payload), expires_at)
+    token_cache.discard(token_digest(token))
@@ -0,0 +1,90 @@
+# shared/security/revocation.py
+import hashlib
+import logging
+import math
+import time
+from redis.exceptions import RedisError
+from shared.config.cache import async_redis_client
+from shared.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Sorted set of revoked token ids (jti), scored by the token's exp
+REVOKED_KEY = "auth:revoked"
+# Bumped on every revocation so processes know to reload their bloom filter
+REVOKED_VERSION_KEY = "auth:revoked:version"
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationList:
+    """
+    Revoked tokens, shared through Redis, with a local bloom filter in front.
+
+    Almost every token is not revoked, and the bloom filter answers that without a
+    round trip; only its (rare) positives are confirmed with Redis. The filter is rebuilt
+    from Redis when the revocation version changes, checked at most every
+    auth_revocation_refresh seconds, which bounds how long another process's revocation
+    can go unnoticed. Expired tokens are pruned from the set on every revocation.
+    """
+
+    def __init__(self, redis=async_redis_client):
+        self.redis = redis
+        self._bloom = BloomFilter(settings.auth_revocation_capacity, settings.auth_revocation_error_rate)
+        self._version = None
+        self._checked_at = 0.0
+
+    async def revoke(self, jti: str, expires_at: float):
+        self._bloom.add(jti)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zadd(REVOKED_KEY, {jti: expires_at})
+        pipe.zremrangebyscore(REVOKED_KEY, "-inf", time.time())
+        pipe.incr(REVOKED_VERSION_KEY)
+        await pipe.execute()
+
+    async def is_revoked(self, jti: str) -> bool:
+        """Raises RedisError when a bloom filter hit can't be confirmed."""
+        await self._refresh()
+        if jti not in self._bloom:
+            return False
+        expires_at = await self.redis.zscore(REVOKED_KEY, jti)
+        return expires_at is not None and expires_at > time.time()
+
+    async def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked_at < settings.auth_revocation_refresh:
+            return
+        self._checked_at = now
+        try:
+            version = await self.redis.get(REVOKED_VERSION_KEY)
+            if version == self._version:
+                return
+            revoked = await self.redis.zrangebyscore(REVOKED_KEY, time.time(), "+inf")
+        except RedisError as e:
+            # Keep the current filter; revocations made since are missed until Redis is back
+            logger.warning(f"Could not refresh the token revocation list: {e}")
+            return
+
+        bloom = BloomFilter(max(settings.auth_revocation_capacity, 2 * len(revoked)),
+                            settings.auth_revocation_error_rate)
+        for jti in revoked:
+            bloom.add(jti.decode() if isinstance(jti, bytes) else jti)
+        self._bloom, self._version = bloom, version
@@ -0,0 +1,72 @@
+# shared/security/token_cache.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from shared.config.settings import settings
+
+
+def token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+class TokenCache:
+    """
+    LRU of verified JWT claims keyed by the SHA-256 of the token, so a token seen
+    before skips decoding and the HMAC check. An entry is dropped once the token's
+    'exp' passes (or after 'ttl' seconds, whichever comes first), so a cached token is
+    never accepted past its expiry. When full, expired entries are evicted before
+    least recently used ones.
+    """
+
+    def __init__(self, max_entries: int | None = None, ttl: float | None = None):
+        self.max_entries = max_entries or settings.auth_token_cache_size
+        self.ttl = ttl or settings.auth_token_cache_ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # digest -> (expires_at, claims)
+        self._lock = threading.Lock()
+        self._swept_at = 0.0
+
+    def get(self, digest: bytes) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None and entry[0] > time.time():
+                self._entries.move_to_end(digest)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[digest]
+            self.misses += 1
+            return None
+
+    def put(self, digest: bytes, claims: dict):
+        expires_at = time.time() + self.ttl
+        if "exp" in claims:
+            expires_at = min(expires_at, float(claims["exp"]))
+        with self._lock:
+            self._entries[digest] = (expires_at, claims)
+            self._entries.move_to_end(digest)
+            if len(self._entries) > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        now = time.time()
+        # A full scan, so at most once a second
+        if now - self._swept_at >= 1.0:
+            self._swept_at = now
+            for digest in [d for d, (expires_at, _) in self._entries.items() if expires_at <= now]:
+                del self._entries[digest]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, digest: bytes):
+        with self._lock:
+            self._entries.pop(digest, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
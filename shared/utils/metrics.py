@@ -0,0 +1,333 @@
+# shared/utils/metrics.py
+"""
+In-process counters, histograms and stage timers, rendered in the Prometheus text
+format.
+
+Each process keeps its own registry. API services expose it on GET /metrics
+(instrument(app, service) adds that route and the per-route request middleware).
+Celery workers aren't scraped. Instead, each task result carries a "stages"
+breakdown of the ETL stages that ran inside it (see collect_stages()).
+
+ETL code marks its stages with:
+    with stage("fetch"):
+        ...
+or by decorating a function with @timed("transform"). Each stage is observed in
+etl_stage_seconds{stage} and, inside collect_stages(), added to the current task's
+breakdown. Stage time is summed over every call, so stages that run concurrently
+(e.g. fetches) can add up to more than the wall time.
+
+Recording is a perf_counter() pair, a bisect and a short lock, so it is cheap enough
+for per-request and per-chunk use. Don't put unbounded values (ids, URLs) in labels.
+"""
+
+import bisect
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans sub-millisecond parsing up to slow bulk loads
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """The child for these label values (in labelnames order), created on first use."""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _label_text(self, key: tuple, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(self._render_child(key, child))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def _render_child(self, key: tuple, child: _CounterChild) -> list[str]:
+        return [f"{self.name}{self._label_text(key)} {_number(child.value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _render_child(self, key: tuple, child: _HistogramChild) -> list[str]:
+        with child._lock:
+            counts, total = list(child.counts), child.sum
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = 'le="+Inf"' if bound == float("inf") else f'le="{_number(bound)}"'
+            lines.append(f"{self.name}_bucket{self._label_text(key, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{self._label_text(key)} {_number(total)}")
+        lines.append(f"{self.name}_count{self._label_text(key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, documentation: str, labelnames: tuple[str, ...], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered as a different {metric.kind}")
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._get(Counter, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                  buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+registry = Registry()
+counter = registry.counter
+histogram = registry.histogram
+
+STAGE_SECONDS = histogram("etl_stage_seconds", "Time spent in each ETL stage", ("stage",))
+
+
+# ---------------------
+# ETL stages
+# ---------------------
+# The breakdown of the task being run, if any: {stage: [seconds, calls, samples]}, and
+# whether to keep every call's duration in 'samples' (otherwise None)
+_breakdown: contextvars.ContextVar[tuple[dict, bool] | None] = contextvars.ContextVar(
+    "etl_stage_breakdown", default=None,
+)
+
+
+@contextmanager
+def stage(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(name).observe(elapsed)
+        current = _breakdown.get()
+        if current is not None:
+            breakdown, keep_samples = current
+            totals = breakdown.get(name) or breakdown.setdefault(name, [0.0, 0, [] if keep_samples else None])
+            totals[0] += elapsed
+            totals[1] += 1
+            if totals[2] is not None:
+                totals[2].append(elapsed)
+
+
+def timed(name: str):
+    """Decorator: run the (synchronous) function as stage 'name'."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def collect_stages(samples: bool = False):
+    """
+    Collect the stages run inside the block (including coroutines handed to another
+    loop with bind()). Yields the breakdown; summarize it with stage_summary().
+    With samples=True every call's duration is kept too (for percentiles).
+    """
+    breakdown = {}
+    token = _breakdown.set((breakdown, samples))
+    try:
+        yield breakdown
+    finally:
+        _breakdown.reset(token)
+
+
+def bind(coro):
+    """
+    Wrap a coroutine that will run on another thread's event loop so its stages
+    still count towards the caller's breakdown.
+    """
+    return _bound(coro, _breakdown.get())
+
+
+async def _bound(coro, breakdown: dict | None):
+    _breakdown.set(breakdown)
+    return await coro
+
+
+def stage_summary(breakdown: dict, *others: dict) -> dict:
+    """
+    {stage: {"seconds", "calls"}} for a breakdown, plus any summaries already
+    reported by upstream tasks (e.g. the scrape chunks of a chord).
+    """
+    summary = {}
+    for other in others:
+        for name, totals in (other or {}).items():
+            merged = summary.setdefault(name, {"seconds": 0.0, "calls": 0})
+            merged["seconds"] += totals["seconds"]
+            merged["calls"] += totals["calls"]
+    for name, (seconds, calls, _) in breakdown.items():
+        merged = summary.setdefault(name, {"seconds": 0.0, "calls": 0})
+        merged["seconds"] += seconds
+        merged["calls"] += calls
+    for totals in summary.values():
+        totals["seconds"] = round(totals["seconds"], 4)
+    return summary
+
+
+# ---------------------
+# HTTP services
+# ---------------------
+HTTP_REQUESTS = counter(
+    "http_requests_total", "HTTP requests by route and status", ("service", "method", "route", "status"),
+)
+HTTP_SECONDS = histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("service", "method", "route"),
+)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting requests and timing them per route template
+    ("/ingest/tasks/{task_id}", not the concrete path). Requests that match no
+    route are reported as route="unmatched". Streaming responses are timed until
+    their last chunk is sent.
+    """
+
+    def __init__(self, app, service: str):
+        self.app = app
+        self.service = service
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router records the matched route in the (shared) scope
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            HTTP_REQUESTS.labels(self.service, method, route, status).inc()
+            HTTP_SECONDS.labels(self.service, method, route).observe(time.perf_counter() - start)
+
+
+def instrument(app, service: str):
+    """Add request metrics and GET /metrics to a FastAPI app."""
+    # Imported here: Celery workers use this module too and don't need FastAPI
+    from fastapi import Response
+
+    app.add_middleware(MetricsMiddleware, service=service)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')